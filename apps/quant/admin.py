@@ -5,7 +5,7 @@ from apps.quant.admin_filters import DateListFilter, FirstSeenListFilter, HasEdg
 
 
 class SAStockAdmin(admin.ModelAdmin):
-    list_display = ["symbol", "name", "external_id", "stock"]
+    list_display = ["symbol", "name", "external_id", "first_seen_date", "stock"]
     list_filter = [HasEdgarIdFilter, FirstSeenListFilter]
     search_fields = ["symbol", "name", "external_id"]
 
@@ -1,7 +1,6 @@
 from django.contrib.admin import SimpleListFilter
-from django.db.models import Min
 
-from apps.quant.models import SARating
+from apps.quant.rating_dates import rating_months
 
 
 class DateListFilter(SimpleListFilter):
@@ -9,8 +8,7 @@ class DateListFilter(SimpleListFilter):
     parameter_name = 'date'
 
     def lookups(self, request, model_admin):
-        dates = SARating.objects.order_by("-date").values_list('date', flat=True).distinct()
-        return [(date, date) for date in dates]
+        return [(date, date) for date in reversed(rating_months())]
 
     def queryset(self, request, queryset):
         if self.value():
@@ -44,11 +42,10 @@ class FirstSeenListFilter(SimpleListFilter):
     parameter_name = "first_seen"
 
     def lookups(self, request, model_admin):
-        dates = SARating.objects.order_by("-date").values_list("date", flat=True).distinct()
-        return [(date, f"On/after {date}") for date in dates]
+        return [(date, f"On/after {date}") for date in reversed(rating_months())]
 
     def queryset(self, request, queryset):
         if self.value():
-            # A stock's "first seen" date is the date of its earliest rating
-            return queryset.annotate(first_seen=Min("sarating__date")).filter(first_seen__gte=self.value())
+            # A stock's "first seen" date is the date of its earliest rating, stored by the importer
+            return queryset.filter(first_seen_date__gte=self.value())
         return queryset
@@ -0,0 +1,112 @@
+"""
+Risk and cost analytics of monthly equity curves, for the backtest reports.
+
+analyze() takes every curve of a run at once ({name: (values, traded)}) and a
+benchmark index curve (e.g. SPY over the same months). The benchmark's returns
+are computed once, and each curve goes through a single loop that keeps the
+running sums every statistic needs, so a sweep of thousands of curves stays
+cheap. Plain Python on purpose: the curves are a few dozen months long, and
+the project doesn't depend on NumPy.
+
+Transaction costs: `traded` is the dollar value bought + sold on each point of
+the curve, and `cost` the fraction of it lost to fees/spread (0.001 = 10 bps).
+The costs are taken out of the curve as they're paid (not compounded), and
+every ratio is computed on that net curve.
+"""
+from collections import namedtuple
+from math import sqrt
+
+# Returns and drawdown in %, ratios annualized from monthly returns. None when it can't be computed
+# (no benchmark, flat curve, too few months).
+RiskStats = namedtuple("RiskStats", [
+    "total_return", "net_return", "volatility", "sharpe", "sortino",
+    "beta", "tracking_error", "information_ratio", "max_drawdown", "cost_paid",
+])
+
+PERIODS_PER_YEAR = 12
+
+
+def _returns(values):
+    return [b / a - 1 if a else 0.0 for a, b in zip(values, values[1:])]
+
+
+def curve_stats(values, benchmark_returns=None, traded=None, cost: float = 0.0, risk_free: float = 0.0) -> RiskStats:
+    """Stats of one equity curve. benchmark_returns = the benchmark's returns over the same months
+    (one fewer than values); risk_free = annual rate (0.04 = 4%)."""
+    net = list(values)
+    cost_paid = 0.0
+    if traded and cost:
+        for t, amount in enumerate(traded):
+            cost_paid += amount * cost
+            net[t] -= cost_paid
+
+    rf = (1 + risk_free) ** (1 / PERIODS_PER_YEAR) - 1
+    n = 0
+    sum_excess = sum_excess2 = sum_down2 = 0.0
+    sum_r = sum_b = sum_b2 = sum_rb = sum_active = sum_active2 = 0.0
+    peak = net[0]
+    worst = 0.0
+    benchmark_returns = benchmark_returns or []
+    with_benchmark = len(benchmark_returns) == len(net) - 1
+    for t in range(1, len(net)):
+        r = net[t] / net[t - 1] - 1 if net[t - 1] else 0.0
+        excess = r - rf
+        n += 1
+        sum_excess += excess
+        sum_excess2 += excess * excess
+        if excess < 0:
+            sum_down2 += excess * excess
+        if with_benchmark:
+            b = benchmark_returns[t - 1]
+            sum_r += r
+            sum_b += b
+            sum_b2 += b * b
+            sum_rb += r * b
+            sum_active += r - b
+            sum_active2 += (r - b) * (r - b)
+        peak = max(peak, net[t])
+        worst = min(worst, net[t] / peak - 1)
+
+    def stdev(total, total2):
+        # Sample standard deviation from the running sums
+        if n < 2:
+            return None
+        return sqrt(max(0.0, (total2 - total * total / n) / (n - 1)))
+
+    annual = sqrt(PERIODS_PER_YEAR)
+    volatility = stdev(sum_excess, sum_excess2)
+    downside = sqrt(sum_down2 / n) if n else None
+    sharpe = sortino = beta = tracking_error = information_ratio = None
+    if volatility:
+        sharpe = sum_excess / n / volatility * annual
+    if downside:
+        sortino = sum_excess / n / downside * annual
+    if with_benchmark and n >= 2:
+        benchmark_var = (sum_b2 - sum_b * sum_b / n) / (n - 1)
+        if benchmark_var > 0:
+            beta = (sum_rb - sum_r * sum_b / n) / (n - 1) / benchmark_var
+        active = stdev(sum_active, sum_active2)
+        if active:
+            tracking_error = active * annual * 100
+            information_ratio = sum_active / n / active * annual
+
+    return RiskStats(
+        total_return=(values[-1] / values[0] - 1) * 100 if values[0] else None,
+        net_return=(net[-1] / values[0] - 1) * 100 if values[0] else None,
+        volatility=None if volatility is None else volatility * annual * 100,
+        sharpe=sharpe,
+        sortino=sortino,
+        beta=beta,
+        tracking_error=tracking_error,
+        information_ratio=information_ratio,
+        max_drawdown=worst * 100,
+        cost_paid=cost_paid,
+    )
+
+
+def analyze(curves: dict, benchmark=None, cost: float = 0.0, risk_free: float = 0.0) -> dict:
+    """{name: RiskStats} for curves = {name: (values, traded)}, all over the same months as the
+    benchmark index values (or benchmark None: no beta / tracking error)."""
+    benchmark_returns = _returns(benchmark) if benchmark else None
+    return {name: curve_stats(values, benchmark_returns, traded, cost, risk_free)
+            for name, (values, traded) in curves.items()}
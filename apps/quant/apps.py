@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class QuantConfig(AppConfig):
+    name = "apps.quant"
+
+    # Connects the signal receivers that drop the rank matrices and month snapshots
+    # of ratings and SA stocks edited one by one (admin), and refresh their rating
+    # months and first seen dates, whatever process is running
+    def ready(self):
+        from apps.quant import month_snapshots, rank_matrix, rating_dates  # noqa: F401
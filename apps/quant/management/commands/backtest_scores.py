@@ -20,24 +20,70 @@ Mechanics (all approaches):
   - Final mark-to-market: first trading day of VALUATION_MONTH (default 2026-05).
 
 Point-in-time: scores for month M only use ratings dated <= M (no look-ahead).
-Prices = Yahoo adjusted close, cached to quant_simulations/_backtest_price_cache.json.
+Prices = Yahoo adjusted close, downloaded on a few threads and cached to
+quant_simulations/_backtest_price_cache.jsonl (one line per symbol, appended as each
+one comes in, so an interrupted fetch resumes where it stopped on the next run).
+With --local-prices, symbols the watcher already tracks (SAStock linked to a
+Stock) reuse its stored monthly prices (MonthlyPrice) when they cover the whole
+simulation, instead of being downloaded again. Off by default: those closes are
+adjusted as of the day they were fetched and never re-adjusted, so a split or
+dividend since then shows up as a fake monthly return next to Yahoo's fully
+adjusted closes. Only use it when the watched stocks had none since their
+prices were fetched.
 
 Usage:
   python manage.py backtest_scores              # uses cache; fast
-  python manage.py backtest_scores --refetch    # forces a fresh fetch (slow; needed
-                                                # after extending SIM_END / PRICE_END)
+  python manage.py backtest_scores --refetch    # forces a fresh fetch (needed after extending
+                                                # SIM_END / PRICE_END); if interrupted, run again
+                                                # WITHOUT --refetch to resume it
+  python manage.py backtest_scores --jobs 8     # simulates approach x category pairs on 8 processes
+  python manage.py backtest_scores --local-prices
+                                                # reuses the watcher's MonthlyPrice closes (see above)
+  python manage.py backtest_scores --sweep --jobs 8 --windows 2,3,4,5 --decay-bases 0.25,0.5,0.75,1 \
+      --momentum-weights 0,1,2,3 --rank-bands 15,20,25,30
+                                                # grid search instead of the live approaches, ranked
+                                                # into quant_simulations/backtest_sweep.txt
+  python manage.py backtest_scores --rolling --horizons 6,12,24 --jobs 8
+                                                # every approach from every start month (each
+                                                # horizon, or until VALUATION_MONTH without
+                                                # --horizons): return/drawdown/turnover distributions
+                                                # in quant_simulations/backtest_rolling.txt
+  python manage.py backtest_scores --strategies alltime,decay_curve,momentum
+                                                # registered apps/quant/strategies.py strategies
+                                                # side by side, in quant_simulations/backtest_strategies.txt
 """
 import json
+import multiprocessing
 import os
-import time
+from bisect import bisect_left, bisect_right
 from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import date, datetime, timezone
 
 import requests
-from django.core.management.base import BaseCommand
+from requests.adapters import HTTPAdapter
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from urllib3.util.retry import Retry
 
+from apps.quant.analytics import analyze
 from apps.quant.models import SARating, SAStock
-from apps.quant.scoring import get_distance_in_months, rewind_months
+from apps.quant.scoring import rewind_months
+from apps.quant.strategies import (
+    STRATEGIES,
+    AllTimeScore,
+    CurrentRankScore,
+    DecayedScore,
+    GatedAllTimeScore,
+    MomentumScore,
+    Rating,
+    get_strategy,
+    load_settings_strategies,
+    top_n,
+)
+from apps.watcher.models import MonthlyPrice
+from apps.watcher.price_store import PriceSeries
+from apps.watcher.resampling import MONTH, resample
 
 CATEGORIES = [
     "top_rated_overall", "top_quant", "top_growth", "top_value",
@@ -84,13 +130,25 @@ PERIOD_LABEL = (f"{SIM_START[0]}-{SIM_START[1]:02d} -> {VALUATION_MONTH[0]}-{VAL
                 f"({len(SIM_MONTHS)} monthly rebalances)")
 
 RESOURCES_DIR = "quant_simulations"
-PRICE_CACHE_PATH = f"{RESOURCES_DIR}/_backtest_price_cache.json"
+PRICE_CACHE_PATH = f"{RESOURCES_DIR}/_backtest_price_cache.jsonl"
+# The cache used to be one JSON object for every symbol, only written at the end of a fetch.
+# Converted to PRICE_CACHE_PATH the first time it's found.
+LEGACY_PRICE_CACHE_PATH = f"{RESOURCES_DIR}/_backtest_price_cache.json"
+
+# Index the reports measure beta / tracking error against, fetched and cached like the stocks
+BENCHMARK_SYMBOL = "SPY"
+# Transaction cost per dollar traded (fees + spread), in basis points
+COST_BPS = 10.0
+# Key of the all-categories-combined portfolio in the risk stats
+AGGREGATE = "aggregate"
 
 YAHOO_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{symbol}"
 YAHOO_HEADERS = {"User-Agent": "Mozilla/5.0 (backtest research script)"}
+FETCH_WORKERS = 8
 
-Approach = namedtuple("Approach", ["key", "label", "kind", "policy", "param"])
-SimpleRating = namedtuple("SimpleRating", ["sa_stock_id", "date", "rank"])
+# strategy = an apps/quant/strategies.py Strategy (the scoring, shared with the compile commands);
+# band = the exit rank of the "rank_band" policy, None for the others
+Approach = namedtuple("Approach", ["key", "label", "strategy", "policy", "band"], defaults=[None])
 
 
 def month_key(y, m):
@@ -101,45 +159,6 @@ def exit_month_key():
     return f"{month_key(*VALUATION_MONTH)} (exit)"
 
 
-# ---------------------------------------------------------------------------
-# Point-in-time scoring (mirrors apps/quant/views/cron.py, restricted to <= as_of)
-# ---------------------------------------------------------------------------
-def score_decayed(ratings, as_of, window=3, decay_factors=None):
-    if decay_factors is None:
-        decay_factors = [1.0 - (i / window) for i in range(window)]  # production linear curve
-    scores = defaultdict(float)
-    for r in ratings:
-        scores[r.sa_stock_id] += int((101 - r.rank) * decay_factors[get_distance_in_months(r.date, as_of)])
-    return scores
-
-
-def score_momentum(ratings, as_of, window=4, momentum_weight=2.0):
-    pos_decay = [(window - i) / window for i in range(window)]
-    pos_sum = sum(pos_decay)
-    slope_decay = [(window - 1 - i) / (window - 1) for i in range(window - 1)]
-    slope_sum = sum(slope_decay)
-
-    values = {}
-    for r in ratings:
-        values.setdefault(r.sa_stock_id, [0] * window)[get_distance_in_months(r.date, as_of)] = max(0, 101 - r.rank)
-
-    scores = {}
-    for sid, vals in values.items():
-        base = sum(v * w for v, w in zip(vals, pos_decay)) / pos_sum
-        slopes = [vals[i] - vals[i + 1] for i in range(window - 1)]
-        momentum = sum(s * w for s, w in zip(slopes, slope_decay)) / slope_sum
-        scores[sid] = base + momentum_weight * momentum
-    return scores
-
-
-def score_alltime(ratings):
-    # Mirrors the production CompiledSAScore: sum of (101 - rank) over all months, no decay.
-    scores = defaultdict(float)
-    for r in ratings:
-        scores[r.sa_stock_id] += (101 - r.rank)
-    return scores
-
-
 def _median(values):
     s = sorted(values)
     n = len(s)
@@ -149,6 +168,17 @@ def _median(values):
     return s[mid] if n % 2 else (s[mid - 1] + s[mid]) / 2
 
 
+def _percentile(values, pct):
+    """Linear-interpolated percentile (0-100) of a list of numbers."""
+    s = sorted(values)
+    if not s:
+        return 0.0
+    pos = (len(s) - 1) * pct / 100
+    low = int(pos)
+    high = min(low + 1, len(s) - 1)
+    return s[low] + (s[high] - s[low]) * (pos - low)
+
+
 def _max_drawdown(curve):
     """Largest peak-to-trough decline (%) on an equity series."""
     peak = curve[0]
@@ -159,8 +189,160 @@ def _max_drawdown(curve):
     return worst * 100
 
 
-def top_n(scores, n=PORTFOLIO_SIZE):
-    return sorted(scores, key=lambda k: (-scores[k], k))[:n]
+def _fmt(value, spec, suffix=""):
+    """Formats a stat that may be None (not computable) as n/a, padded like the formatted value."""
+    if value is None:
+        return "n/a".rjust(len(format(0.0, spec) + suffix))
+    return format(value, spec) + suffix
+
+
+def _comma_list(cast):
+    """argparse type for a comma-separated list, e.g. --windows 2,3,4"""
+    return lambda value: [cast(v) for v in value.split(",") if v.strip()]
+
+
+# ---------------------------------------------------------------------------
+# Portfolio engine
+# ---------------------------------------------------------------------------
+class PriceMatrix:
+    """Dense symbol x month view of the price map, over SIM_MONTHS + VALUATION_MONTH (column t = month t).
+    exact[i][t] = symbol i's price of month t, or None if that month is missing.
+    carry[i][t] = its latest price at or before month t (forward-filled, also from months before
+    SIM_START), or None if it has no price yet. Symbol i = symbols[i]; index = symbol -> i."""
+
+    def __init__(self, price_map):
+        self.months = [month_key(y, m) for (y, m) in SIM_MONTHS + [VALUATION_MONTH]]
+        self.symbols = sorted(price_map)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.exact = []
+        self.carry = []
+        for symbol in self.symbols:
+            series = price_map[symbol]
+            keys = sorted(series)
+            exact, carry = [], []
+            k, last = 0, None
+            for month in self.months:
+                while k < len(keys) and keys[k] <= month:
+                    last = series[keys[k]]
+                    k += 1
+                exact.append(series.get(month))
+                carry.append(last)
+            self.exact.append(exact)
+            self.carry.append(carry)
+
+
+def simulate_portfolio(prices, select, sells, start=0, end=None):
+    """Rolling top-N portfolio bought at month `start`, rebalanced up to month `end` (excluded), then
+    marked at month `end`. Defaults to the whole SIM_MONTHS, marked at VALUATION_MONTH.
+    select(t) -> symbol indices picked at month t (best first).
+    sells(t, held, top) -> which of the held indices to sell at month t (top = select(t)).
+    Holdings are two parallel lists (symbol index, shares) kept in buying order: marks and sells add up
+    values in that order, so the floats come out exactly as the per-symbol dict version did.
+    traded[k] = dollars bought + sold at equity_curve[k] (for transaction costs)."""
+    held, shares = [], []
+    cash = 0.0
+    equity_curve = []
+    traded = []
+    # Dollars bought + sold in the current month
+    month_traded = 0.0
+    holdings_log = {}
+    carried = set()
+    selected = set()
+    total_sells = 0
+
+    def buy(buys, available, t):
+        """Allocate `available` equally across intended buys. Unpriceable buys leave their share as cash.
+        Returns the leftover cash."""
+        nonlocal month_traded
+        if not buys:
+            return available
+        per = available / len(buys)
+        leftover = 0.0
+        for i in buys:
+            px = prices.exact[i][t]
+            if px:
+                held.append(i)
+                shares.append(per / px)
+                month_traded += per
+            else:
+                leftover += per
+        return leftover
+
+    def mark(t):
+        total = cash
+        holdings = []
+        for i, n in zip(held, shares):
+            px = prices.carry[i][t]
+            if px is None:
+                continue
+            if prices.exact[i][t] is None:
+                carried.add(i)
+            v = n * px
+            total += v
+            holdings.append((prices.symbols[i], v))
+        if cash > 0.01:
+            holdings.append(("(cash)", cash))
+        return total, holdings
+
+    if end is None:
+        end = len(SIM_MONTHS)
+    for t in range(start, end):
+        month = prices.months[t]
+        top = select(t)
+        selected.update(top)
+        month_traded = 0.0
+
+        if t == start:
+            cash += buy(top, PORTFOLIO_SIZE * DOLLARS_PER_STOCK, t)
+        else:
+            sold = set(sells(t, held, top))
+            total_sells += len(sold)
+            proceeds = cash
+            cash = 0.0
+            kept_held, kept_shares = [], []
+            for i, n in zip(held, shares):
+                if i not in sold:
+                    kept_held.append(i)
+                    kept_shares.append(n)
+                    continue
+                px = prices.carry[i][t]
+                if px is not None:
+                    if prices.exact[i][t] is None:
+                        carried.add(i)
+                    proceeds += n * px
+                    month_traded += n * px
+            held[:], shares[:] = kept_held, kept_shares
+
+            open_slots = PORTFOLIO_SIZE - len(held)
+            entrants = [i for i in top if i not in held][:open_slots]
+            cash += buy(entrants, proceeds, t)
+
+        value, holdings = mark(t)
+        equity_curve.append((month, value))
+        traded.append(month_traded)
+        holdings_log[month] = holdings
+
+    value, holdings = mark(end)
+    exit_key = f"{prices.months[end]} (exit)"
+    equity_curve.append((exit_key, value))
+    traded.append(0.0)
+    holdings_log[exit_key] = holdings
+
+    distinct_held = {s for hl in holdings_log.values() for s, _ in hl if s != "(cash)"}
+    return {"equity_curve": equity_curve, "traded": traded, "holdings_log": holdings_log,
+            "final_value": value, "carried": {prices.symbols[i] for i in carried},
+            "selected_symbols": {prices.symbols[i] for i in selected},
+            "total_sells": total_sells, "distinct_held": len(distinct_held)}
+
+
+# (command, PriceMatrix) of the running backtest, set right before the --jobs workers are forked.
+# They inherit it copy-on-write (ratings, memoized selections, prices) instead of each getting a pickled copy.
+_worker_state = None
+
+
+def _simulate_job(key, cat, start, end):
+    command, prices = _worker_state
+    return command._simulate(command.approaches[key], cat, prices, start, end)
 
 
 class Command(BaseCommand):
@@ -168,148 +350,320 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("--refetch", action="store_true",
-                            help="Ignore the price cache and refetch every symbol (slow; needed after extending the timeline)")
+                            help="Start a new price cache and refetch every symbol (needed after extending the timeline)")
+        parser.add_argument("--local-prices", action="store_true",
+                            help="Reuse the watcher's MonthlyPrice closes of watched stocks instead of fetching them "
+                                 "(not re-adjusted for splits/dividends since they were fetched)")
+        parser.add_argument("--fetch-workers", type=int, default=FETCH_WORKERS,
+                            help="Symbols downloaded at the same time")
         parser.add_argument("--decay-window", type=int, default=3)
         parser.add_argument("--momentum-window", type=int, default=4)
         parser.add_argument("--momentum-weight", type=float, default=2.0)
+        parser.add_argument("--jobs", type=int, default=1,
+                            help="Processes simulating approach x category pairs in parallel (needs fork, so not on Windows)")
+        # Risk report / ranked reports
+        parser.add_argument("--benchmark", default=BENCHMARK_SYMBOL, help="Index for beta and tracking error")
+        parser.add_argument("--cost-bps", type=float, default=COST_BPS,
+                            help="Transaction cost per dollar bought or sold, in basis points")
+        parser.add_argument("--risk-free", type=float, default=0.0,
+                            help="Annual risk-free rate in %% for Sharpe / Sortino")
+        # Sweep mode: every combination of the lists below replaces the live approaches
+        parser.add_argument("--sweep", action="store_true",
+                            help="Grid-search decay curves / momentum weights / rank-band exits instead of the live approaches")
+        parser.add_argument("--windows", type=_comma_list(int), default=[2, 3, 4, 5],
+                            help="Sweep: score windows in months (max 12)")
+        parser.add_argument("--decay-bases", type=_comma_list(float), default=[0.25, 0.5, 0.75, 1.0],
+                            help="Sweep: decay curves base ** i (1 = no decay)")
+        parser.add_argument("--momentum-weights", type=_comma_list(float), default=[0.0, 1.0, 2.0, 3.0],
+                            help="Sweep: momentum weights (momentum needs a window of 2+)")
+        parser.add_argument("--rank-bands", type=_comma_list(int), default=[15, 20, 25, 30],
+                            help="Sweep: rank-band exits, each also tried with the strict exit")
+        # Strategies mode: registered strategies (built-in or from settings.QUANT_STRATEGIES) side by side
+        parser.add_argument("--strategies", type=_comma_list(str), default=[],
+                            help="Simulate these registered strategies (default parameters, strict exit) instead of "
+                                 "the live approaches, ranked like a sweep")
+        # Rolling mode: the same approaches from every start month instead of only SIM_START
+        parser.add_argument("--rolling", action="store_true",
+                            help="Simulate every approach from every start month and report the distributions")
+        parser.add_argument("--horizons", type=_comma_list(int), default=[],
+                            help="Rolling: holding periods in months (default: each start until VALUATION_MONTH)")
 
     def handle(self, *args, **opts):
         self.decay_window = opts["decay_window"]
         self.momentum_window = opts["momentum_window"]
         self.momentum_weight = opts["momentum_weight"]
+        self.cost = opts["cost_bps"] / 10000
+        self.risk_free = opts["risk_free"] / 100
 
         self.id_to_symbol = {s.pk: s.symbol for s in SAStock.objects.all()}
 
+        self.approaches = self._live_approaches()
+        if opts["sweep"]:
+            self.approaches = self._sweep_approaches(opts)
+            self.stdout.write(f"Sweep: {len(self.approaches)} configurations x {len(CATEGORIES)} categories")
+        elif opts["strategies"]:
+            self.approaches = self._registered_approaches(opts["strategies"])
+
+        self.stdout.write("Phase A: loading ratings + computing point-in-time selections + symbol universe...")
+        self._load_ratings()
+        # (strategy, cat, as_of) -> selected symbols; Phase A fills it, Phase C reuses it.
+        # Approaches differing only by their exit rule (or equal strategies) share the same selections.
+        self.selections = {}
+        universe = self._symbol_universe()
+        self.stdout.write(f"  {len(universe)} distinct symbols need prices.")
+
+        self.stdout.write("Phase B: fetching/caching Yahoo prices...")
+        price_map, missing = self._get_prices(universe, refetch=opts["refetch"], workers=opts["fetch_workers"],
+                                              local_prices=opts["local_prices"])
+        self.stdout.write(f"  priced {len(universe) - len(missing)}/{len(universe)}; missing {len(missing)}")
+        self.benchmark_symbol = opts["benchmark"]
+        benchmark_map, _ = self._get_prices([self.benchmark_symbol], workers=1)
+        self.benchmark = self._benchmark_curve(benchmark_map[self.benchmark_symbol])
+        if self.benchmark is None:
+            self.stderr.write(f"  no {self.benchmark_symbol} prices for every month, reports without beta / tracking error")
+
+        self.stdout.write("Phase C: simulating all approaches...")
+        if opts["rolling"]:
+            rolling = self._simulate_rolling(PriceMatrix(price_map), opts["horizons"], opts["jobs"])
+            self.stdout.write("Phase D: writing reports...")
+            self._write_rolling_report(rolling, missing)
+            self.stdout.write(self.style.SUCCESS(f"Done. See {RESOURCES_DIR}/backtest_rolling.txt"))
+            return
+        results = self._simulate_all(PriceMatrix(price_map), opts["jobs"])
+
+        self.stdout.write("Phase D: writing reports...")
+        if opts["sweep"]:
+            self._write_ranked_report(results, missing, "PARAMETER SWEEP", [
+                "Decay curve = base ** i over the window; momentum = base + weight x momentum over the window.",
+                "bandN = sell when rank > N (otherwise strict: sell when out of the top 7).",
+            ], f"{RESOURCES_DIR}/backtest_sweep.txt")
+            self.stdout.write(self.style.SUCCESS(f"Done. See {RESOURCES_DIR}/backtest_sweep.txt"))
+            return
+        if opts["strategies"]:
+            self._write_ranked_report(results, missing, "STRATEGIES", [
+                "Registered strategies with their default parameters, strict exit (sell when out of the top 7).",
+            ], f"{RESOURCES_DIR}/backtest_strategies.txt")
+            self.stdout.write(self.style.SUCCESS(f"Done. See {RESOURCES_DIR}/backtest_strategies.txt"))
+            return
+        self._write_reports(results, missing)
+        self.stdout.write(self.style.SUCCESS(f"Done. See {RESOURCES_DIR}/backtest_*.txt"))
+
+    def _live_approaches(self):
         # Live approaches only. Approaches dropped after backtesting proved them dead-end (see
         # SIMULATIONS_GUIDE.md / memory): naive momentum, momentum-minhold, hysteresis, reweight,
         # blend, hybrid (#1 satellite), decay_x3/x4 (too steep), decayed2 (too short window).
-        self.approaches = {
+        return {
             # Decayed score family (production = decay_x2; old kept only as reference)
-            "decayed": Approach("decayed", "Decayed-old linear [1,.667,.333]", "decayed", "strict", None),
+            "decayed": Approach("decayed", "Decayed-old linear [1,.667,.333]",
+                                DecayedScore.linear(self.decay_window), "strict"),
             "decay_x2": Approach("decay_x2", "Decayed-new [1.0, 0.5, 0.25] (production)",
-                                 "decay_curve", "strict", [1.0, 0.5, 0.25]),
+                                 DecayedScore((1.0, 0.5, 0.25)), "strict"),
             # Momentum (best-of-momentum variant only)
             "momentum_rankband25": Approach("momentum_rankband25", "Momentum + rank-band exit (<=25)",
-                                            "momentum", "rank_band", 25),
+                                            MomentumScore(self.momentum_window, self.momentum_weight), "rank_band", 25),
             # Simple baseline (essential "is anything beating dead-simple?")
-            "current": Approach("current", "Current top-7 (raw rank, monthly refresh)", "current", "strict", None),
+            "current": Approach("current", "Current top-7 (raw rank, monthly refresh)", CurrentRankScore(), "strict"),
             # All-time score family
             "score_alltime": Approach("score_alltime", "All-time score (cumulative, no decay)",
-                                      "alltime", "strict", None),
+                                      AllTimeScore(), "strict"),
             "alltime_gated": Approach("alltime_gated", "All-time score, gated to currently-ranked",
-                                      "alltime_gated", "strict", None),
+                                      GatedAllTimeScore(), "strict"),
         }
 
-        self.stdout.write("Phase A: computing point-in-time selections + symbol universe...")
-        universe = self._symbol_universe()
-        self.stdout.write(f"  {len(universe)} distinct symbols need prices.")
-
-        self.stdout.write("Phase B: fetching/caching Yahoo prices...")
-        price_map, missing = self._get_prices(universe, refetch=opts["refetch"])
-        self.stdout.write(f"  priced {len(universe) - len(missing)}/{len(universe)}; missing {len(missing)}")
-
-        self.stdout.write("Phase C: simulating all approaches...")
-        results = {}  # approach_key -> {cat -> result}
-        for key, approach in self.approaches.items():
-            results[key] = {cat: self._simulate(approach, cat, price_map) for cat in CATEGORIES}
-
-        self.stdout.write("Phase D: writing reports...")
+    # The reports of a normal run (live approaches from SIM_START)
+    def _write_reports(self, results, missing):
         self._write_master(results, missing)
+        self._write_risk_report(results, self._risk_stats(results))
         self._write_regime_report(results)
         self._write_weighted_report(results)
         self._write_subset_report(results)
         self._write_by_category_report(results)
         self._write_detail_report(results)
-        self.stdout.write(self.style.SUCCESS(f"Done. See {RESOURCES_DIR}/backtest_*.txt"))
+
+    def _sweep_approaches(self, opts):
+        """One approach per combination: decay curve (window x base) or momentum (window x weight),
+        each with the strict exit and every rank-band exit."""
+        if not opts["windows"] or not all(1 <= w <= 12 for w in opts["windows"]):
+            # rewind_months() only goes back up to 11 months
+            raise CommandError("--windows must be between 1 and 12 months")
+        strategies = []
+        for window in opts["windows"]:
+            for base in opts["decay_bases"]:
+                strategies.append((f"decay w{window} b{base:g}", DecayedScore.exponential(base, window)))
+            if window >= 2:
+                for weight in opts["momentum_weights"]:
+                    strategies.append((f"momentum w{window} x{weight:g}", MomentumScore(window, weight)))
+
+        exits = [("strict", None)] + [("rank_band", band) for band in opts["rank_bands"]]
+        approaches = {}
+        for name, strategy in strategies:
+            for policy, band in exits:
+                key = name if band is None else f"{name} band{band}"
+                approaches[key] = Approach(key, key, strategy, policy, band)
+        return approaches
+
+    @staticmethod
+    def _registered_approaches(keys):
+        load_settings_strategies()
+        unknown = [key for key in keys if key not in STRATEGIES]
+        if unknown:
+            raise CommandError(f"Unknown strategies: {', '.join(unknown)}. Registered: {', '.join(sorted(STRATEGIES))}")
+        return {key: Approach(key, STRATEGIES[key].label, get_strategy(key), "strict") for key in keys}
 
     # ----- selections -----
+    def _load_ratings(self):
+        """Every category's whole rating history in one query, grouped per month (oldest first), with the
+        previous month's ratings carried forward into MISSING_MONTHS. Windows are then slices of it."""
+        by_month = {cat: defaultdict(list) for cat in CATEGORIES}
+        for (cat, sid, d, rk) in (SARating.objects.filter(type__in=CATEGORIES, date__isnull=False)
+                                  .values_list("type", "sa_stock_id", "date", "rank")):
+            by_month[cat][d].append(Rating(sid, d, rk))
+        for cat in CATEGORIES:
+            for (my, mm) in MISSING_MONTHS:
+                miss = date(my, mm, 1)
+                if not by_month[cat].get(miss):
+                    prev = rewind_months(miss, 1)
+                    by_month[cat][miss] = [Rating(r.sa_stock_id, miss, r.rank) for r in by_month[cat].get(prev, [])]
+
+        # cat -> sorted month dates, and cat -> that month's ratings (same index)
+        self.rating_months = {cat: sorted(by_month[cat]) for cat in CATEGORIES}
+        self.ratings_by_month = {cat: [by_month[cat][d] for d in self.rating_months[cat]] for cat in CATEGORIES}
+
     def _get_ratings(self, cat, earliest, as_of):
         """Ratings rows in [earliest, as_of] for a category, with carry-forward for missing months."""
-        rows = [SimpleRating(sid, d, rk) for (sid, d, rk) in
-                SARating.objects.filter(type=cat, date__gte=earliest, date__lte=as_of)
-                .values_list("sa_stock_id", "date", "rank")]
-        for (my, mm) in MISSING_MONTHS:
-            miss = date(my, mm, 1)
-            if earliest <= miss <= as_of and not any(r.date == miss for r in rows):
-                prev = rewind_months(miss, 1)
-                rows.extend(SimpleRating(sid, miss, rk) for (sid, rk) in
-                            SARating.objects.filter(type=cat, date=prev).values_list("sa_stock_id", "rank"))
-        return rows
+        months = self.rating_months[cat]
+        window = self.ratings_by_month[cat][bisect_left(months, earliest):bisect_right(months, as_of)]
+        return [r for month_ratings in window for r in month_ratings]
 
     def _approach_select(self, approach, cat, as_of):
-        kind = approach.kind
-        if kind == "decayed":
-            # param = the decayed window if an approach overrides it; fallback to self.decay_window.
-            window = approach.param if approach.param else self.decay_window
-            ratings = self._get_ratings(cat, rewind_months(as_of, window - 1), as_of)
-            ids = top_n(score_decayed(ratings, as_of, window))
-        elif kind == "momentum":
-            ratings = self._get_ratings(cat, rewind_months(as_of, self.momentum_window - 1), as_of)
-            ids = top_n(score_momentum(ratings, as_of, self.momentum_window, self.momentum_weight))
-        elif kind == "current":
-            ratings = self._get_ratings(cat, as_of, as_of)
-            ids = top_n({r.sa_stock_id: -r.rank for r in ratings})
-        elif kind == "alltime":
-            ratings = self._get_ratings(cat, date(2000, 1, 1), as_of)  # all history up to as_of
-            ids = top_n(score_alltime(ratings))
-        elif kind == "alltime_gated":
-            ratings = self._get_ratings(cat, date(2000, 1, 1), as_of)
-            scores = score_alltime(ratings)
-            current_ids = {r.sa_stock_id for r in self._get_ratings(cat, as_of, as_of)}
-            ids = top_n({i: s for i, s in scores.items() if i in current_ids})  # only stocks still ranked now
-        elif kind == "decay_curve":
-            factors = approach.param
-            ratings = self._get_ratings(cat, rewind_months(as_of, len(factors) - 1), as_of)
-            ids = top_n(score_decayed(ratings, as_of, decay_factors=factors))
-        else:
-            raise ValueError(kind)
-        return [self.id_to_symbol[i] for i in ids]
+        key = (approach.strategy, cat, as_of)
+        if key not in self.selections:
+            ratings = self._get_ratings(cat, approach.strategy.earliest(as_of), as_of)
+            ids = approach.strategy.select(ratings, as_of, PORTFOLIO_SIZE)
+            self.selections[key] = [self.id_to_symbol[i] for i in ids]
+        return self.selections[key]
 
     def _month_ranks(self, cat, as_of):
         return {self.id_to_symbol[r.sa_stock_id]: r.rank for r in self._get_ratings(cat, as_of, as_of)}
 
     def _symbol_universe(self):
+        """Selects every month of every (strategy, cat) up front, each strategy scoring all the months
+        of a category in one batch, and returns the symbols that were ever picked."""
+        as_of_months = [date(y, m, 1) for (y, m) in SIM_MONTHS]
+        strategies = list(dict.fromkeys(approach.strategy for approach in self.approaches.values()))
         universe = set()
         for cat in CATEGORIES:
-            for (y, m) in SIM_MONTHS:
-                as_of = date(y, m, 1)
-                for approach in self.approaches.values():
-                    universe.update(self._approach_select(approach, cat, as_of))
+            for strategy in strategies:
+                month_scores = strategy.score_months(as_of_months, self.rating_months[cat], self.ratings_by_month[cat])
+                for as_of, scores in zip(as_of_months, month_scores):
+                    symbols = [self.id_to_symbol[i] for i in top_n(scores, PORTFOLIO_SIZE)]
+                    self.selections[(strategy, cat, as_of)] = symbols
+                    universe.update(symbols)
         return sorted(universe)
 
     # ----- prices -----
-    def _get_prices(self, symbols, refetch=False):
-        cache = {}
-        if not refetch:
-            try:
-                with open(PRICE_CACHE_PATH) as f:
-                    cache = json.load(f)
-            except FileNotFoundError:
-                cache = {}
+    def _get_prices(self, symbols, refetch=False, workers=FETCH_WORKERS, local_prices=False):
+        self._migrate_legacy_price_cache()
+        if refetch:
+            # Start over; what gets fetched below is appended to the new file as it comes in
+            open(PRICE_CACHE_PATH, "w").close()
+        cache = self._load_price_cache()
 
-        p1 = int(datetime(2023, 9, 1, tzinfo=timezone.utc).timestamp())
-        p2 = int(datetime(2026, 5, 31, tzinfo=timezone.utc).timestamp())
-        to_fetch = [s for s in symbols if s not in cache]
-        for idx, symbol in enumerate(to_fetch, 1):
-            cache[symbol] = self._fetch_symbol_monthly(symbol, p1, p2)
-            if idx % 20 == 0:
-                self.stdout.write(f"    fetched {idx}/{len(to_fetch)}...")
-            time.sleep(0.3)
+        # Symbols not cached yet may already have their monthly prices stored by the watcher
+        local = self._local_monthly_prices([s for s in symbols if s not in cache]) if local_prices else {}
+
+        to_fetch = [s for s in symbols if s not in cache and s not in local]
         if to_fetch:
-            with open(PRICE_CACHE_PATH, "w") as f:
-                json.dump(cache, f)
+            self._fetch_prices(to_fetch, cache, workers)
 
-        price_map = {s: cache.get(s, {}) for s in symbols}
+        price_map = {s: cache.get(s) or local.get(s, {}) for s in symbols}
         missing = {s for s in symbols if not price_map[s]}
         return price_map, missing
 
-    def _fetch_symbol_monthly(self, symbol, p1, p2):
+    @staticmethod
+    def _local_monthly_prices(symbols):
+        """First-trading-day closes from the watcher's MonthlyPrice table, for symbols whose
+        SAStock is linked to a watched Stock. Only symbols covering every simulated month
+        are returned (a watched stock may have a shorter history); the others get fetched.
+        The closes are adjusted as of their fetch, not for later splits/dividends (--local-prices)."""
+        stock_to_symbol = {stock_id: symbol for symbol, stock_id in
+                           SAStock.objects.filter(symbol__in=symbols, stock__isnull=False)
+                           .values_list("symbol", "stock_id")}
+        series = defaultdict(dict)
+        for stock_id, month, first_close in (MonthlyPrice.objects.filter(stock_id__in=stock_to_symbol)
+                                             .values_list("stock_id", "month", "first_close")):
+            series[stock_to_symbol[stock_id]][month_key(month.year, month.month)] = round(float(first_close), 4)
+        needed = {month_key(y, m) for (y, m) in SIM_MONTHS + [VALUATION_MONTH]}
+        return {symbol: monthly for symbol, monthly in series.items() if needed <= monthly.keys()}
+
+    @staticmethod
+    def _migrate_legacy_price_cache():
+        if os.path.exists(PRICE_CACHE_PATH) or not os.path.exists(LEGACY_PRICE_CACHE_PATH):
+            return
+        with open(LEGACY_PRICE_CACHE_PATH) as f:
+            legacy = json.load(f)
+        with open(PRICE_CACHE_PATH, "w") as f:
+            for symbol, monthly in legacy.items():
+                f.write(json.dumps({"symbol": symbol, "prices": monthly}) + "\n")
+        os.remove(LEGACY_PRICE_CACHE_PATH)
+
+    @staticmethod
+    def _load_price_cache():
+        """{symbol: {"YYYY-MM": price}} from the cache file. A symbol fetched twice keeps its last line;
+        symbols whose fetch failed are cached as {} so they aren't retried every run."""
+        cache = {}
+        line = "\n"
+        try:
+            with open(PRICE_CACHE_PATH) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # line cut short by an interrupted run: that symbol is fetched again
+                    cache[entry["symbol"]] = entry["prices"]
+        except FileNotFoundError:
+            return cache
+        if not line.endswith("\n"):
+            # End the cut-short line, so the next symbol appended doesn't get glued to it
+            with open(PRICE_CACHE_PATH, "a") as f:
+                f.write("\n")
+        return cache
+
+    def _fetch_prices(self, symbols, cache, workers):
+        """Downloads `symbols` into `cache`, `workers` at a time over one shared session (rate limits
+        and server errors are retried with backoff). Each symbol is appended to the cache file as soon
+        as it's in, so an interrupted run loses nothing already fetched."""
+        p1 = int(datetime(2023, 9, 1, tzinfo=timezone.utc).timestamp())
+        p2 = int(datetime(2026, 5, 31, tzinfo=timezone.utc).timestamp())
+        session = requests.Session()
+        session.headers.update(YAHOO_HEADERS)
+        retry = Retry(total=4, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+        session.mount("https://", HTTPAdapter(max_retries=retry, pool_maxsize=workers))
+
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = {pool.submit(self._fetch_symbol_monthly, session, symbol, p1, p2): symbol for symbol in symbols}
+            with open(PRICE_CACHE_PATH, "a") as f:
+                for idx, future in enumerate(as_completed(futures), 1):
+                    symbol = futures[future]
+                    cache[symbol] = future.result()
+                    f.write(json.dumps({"symbol": symbol, "prices": cache[symbol]}) + "\n")
+                    f.flush()
+                    if idx % 20 == 0:
+                        self.stdout.write(f"    fetched {idx}/{len(symbols)}...")
+        finally:
+            # On Ctrl-C, don't wait for the symbols that haven't started yet
+            pool.shutdown(cancel_futures=True)
+            session.close()
+
+    @staticmethod
+    def _fetch_symbol_monthly(session, symbol, p1, p2):
         for candidate in (symbol, symbol.replace(".", "-")):
             try:
-                resp = requests.get(
+                resp = session.get(
                     YAHOO_URL.format(symbol=candidate),
                     params={"period1": p1, "period2": p2, "interval": "1d", "includeAdjustedClose": "true"},
-                    headers=YAHOO_HEADERS, timeout=20,
+                    timeout=20,
                 )
                 if resp.status_code != 200:
                     continue
@@ -318,124 +672,111 @@ class Command(BaseCommand):
                     continue
                 adj = result["indicators"].get("adjclose", [{}])[0].get("adjclose")
                 closes = result["indicators"]["quote"][0].get("close")
-                series = adj if adj else closes
-                monthly = {}
-                for ts, px in zip(result["timestamp"], series):
-                    if px is None:
-                        continue
-                    d = datetime.fromtimestamp(ts, tz=timezone.utc).date()
-                    mk = month_key(d.year, d.month)
-                    if mk not in monthly:
-                        monthly[mk] = round(float(px), 4)
-                if monthly:
-                    return monthly
+                days = [(datetime.fromtimestamp(ts, tz=timezone.utc).date().toordinal(), float(px))
+                        for ts, px in zip(result["timestamp"], adj if adj else closes) if px is not None]
+                if not days:
+                    continue
+                # Same monthly resampling as the watcher's MonthlyPrice; only the closes matter here
+                dates = [d for d, _ in days]
+                prices = [px for _, px in days]
+                daily = PriceSeries(dates, prices, prices, prices, prices, [0] * len(days))
+                return {month_key(bar.period.year, bar.period.month): round(bar.first_close, 4)
+                        for bar in resample(daily, MONTH)}
             except (requests.RequestException, ValueError, KeyError, IndexError):
                 continue
         return {}
 
-    @staticmethod
-    def _price(price_map, symbol, y, m):
-        return price_map.get(symbol, {}).get(month_key(y, m))
-
-    @staticmethod
-    def _price_carry(price_map, symbol, y, m):
-        series = price_map.get(symbol, {})
-        target = month_key(y, m)
-        if target in series:
-            return series[target]
-        earlier = [k for k in series if k <= target]
-        return series[max(earlier)] if earlier else None
-
     # ----- simulation -----
-    def _simulate(self, approach, cat, price_map):
-        positions = {}   # symbol -> {"shares": float, "age": int}
-        cash = 0.0
-        equity_curve = []
-        holdings_log = {}
-        carried = set()
-        selected_symbols = set()
-        total_sells = 0
-
-        for idx, (y, m) in enumerate(SIM_MONTHS):
-            as_of = date(y, m, 1)
-            top7 = self._approach_select(approach, cat, as_of)
-            selected_symbols.update(top7)
-
-            if idx == 0:
-                available = PORTFOLIO_SIZE * DOLLARS_PER_STOCK
-                cash += self._buy(positions, top7, available, price_map, y, m)
-            else:
-                for p in positions.values():
-                    p["age"] += 1
-
-                sells = self._sells(approach, positions, top7, cat, as_of)
-                total_sells += len(sells)
-                proceeds = cash
-                cash = 0.0
-                for sym in sells:
-                    px = self._price_carry(price_map, sym, y, m)
-                    if px is not None:
-                        if month_key(y, m) not in price_map.get(sym, {}):
-                            carried.add(sym)
-                        proceeds += positions[sym]["shares"] * px
-                    del positions[sym]
-
-                open_slots = PORTFOLIO_SIZE - len(positions)
-                entrants = [s for s in top7 if s not in positions][:open_slots]
-                cash += self._buy(positions, entrants, proceeds, price_map, y, m)
-
-            value, holdings = self._mark(positions, cash, y, m, price_map, carried)
-            equity_curve.append((month_key(y, m), value))
-            holdings_log[month_key(y, m)] = holdings
-
-        vy, vm = VALUATION_MONTH
-        value, holdings = self._mark(positions, cash, vy, vm, price_map, carried)
-        equity_curve.append((exit_month_key(), value))
-        holdings_log[exit_month_key()] = holdings
-
-        distinct_held = {s for hl in holdings_log.values() for s, _ in hl if s != "(cash)"}
-        return {"equity_curve": equity_curve, "holdings_log": holdings_log,
-                "final_value": value, "carried": carried, "selected_symbols": selected_symbols,
-                "total_sells": total_sells, "distinct_held": len(distinct_held)}
-
-    def _sells(self, approach, positions, top7, cat, as_of):
+    def _simulate_all(self, prices, jobs=1):
+        """approach_key -> {cat -> result}, over the whole SIM_MONTHS."""
+        pairs = [(key, cat) for key in self.approaches for cat in CATEGORIES]
+        simulated = self._run_simulations(prices, [(key, cat, 0, None) for key, cat in pairs], jobs)
+
+        results = {key: {} for key in self.approaches}
+        for (key, cat), result in zip(pairs, simulated):
+            results[key][cat] = result
+        return results
+
+    def _simulate_rolling(self, prices, horizons, jobs=1):
+        """{horizon: {approach_key: [result of every (cat, start month)]}}, horizon None = until VALUATION_MONTH."""
+        if not all(1 <= h <= len(SIM_MONTHS) for h in horizons):
+            raise CommandError(f"--horizons must be between 1 and {len(SIM_MONTHS)} months")
+        periods = {None: [(start, len(SIM_MONTHS)) for start in range(len(SIM_MONTHS))]} if not horizons else {
+            h: [(start, start + h) for start in range(len(SIM_MONTHS) - h + 1)] for h in horizons
+        }
+        tasks = [(key, cat, start, end, h) for h, spans in periods.items() for key in self.approaches
+                 for cat in CATEGORIES for start, end in spans]
+        self.stdout.write(f"  {len(tasks)} simulations")
+        simulated = self._run_simulations(prices, [task[:4] for task in tasks], jobs)
+
+        rolling = {h: {key: [] for key in self.approaches} for h in periods}
+        for (key, _, _, _, h), result in zip(tasks, simulated):
+            rolling[h][key].append(result)
+        return rolling
+
+    def _run_simulations(self, prices, tasks, jobs=1):
+        """Results of (approach_key, cat, start, end) simulations, in order. Every selection is memoized
+        by Phase A, so the simulations don't touch the database and can run in forked worker processes."""
+        global _worker_state
+        if jobs > 1 and "fork" not in multiprocessing.get_all_start_methods():
+            self.stderr.write("--jobs needs the fork start method, simulating serially")
+            jobs = 1
+
+        if jobs > 1:
+            # Forked children must not share the parent's database connections
+            connections.close_all()
+            _worker_state = (self, prices)
+            try:
+                with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork")) as pool:
+                    # Large chunks: thousands of small tasks otherwise spend their time in IPC
+                    chunksize = max(1, len(tasks) // (jobs * 4))
+                    return list(pool.map(_simulate_job, *zip(*tasks), chunksize=chunksize))
+            finally:
+                _worker_state = None
+        return [self._simulate(self.approaches[key], cat, prices, start, end) for key, cat, start, end in tasks]
+
+    def _simulate(self, approach, cat, prices, start=0, end=None):
+        """An approach plugged into simulate_portfolio(): its memoized selections, and its exit rule."""
+        def select(t):
+            y, m = SIM_MONTHS[t]
+            return [prices.index[s] for s in self._approach_select(approach, cat, date(y, m, 1))]
+
         if approach.policy == "strict":
-            return [s for s in positions if s not in top7]
-        if approach.policy == "rank_band":
-            ranks = self._month_ranks(cat, as_of)
-            return [s for s in positions if ranks.get(s) is None or ranks[s] > approach.param]
-        raise ValueError(approach.policy)
+            def sells(t, held, top):
+                return [i for i in held if i not in top]
+        elif approach.policy == "rank_band":
+            def sells(t, held, top):
+                y, m = SIM_MONTHS[t]
+                ranks = self._month_ranks(cat, date(y, m, 1))
+                return [i for i in held if ranks.get(prices.symbols[i]) is None
+                        or ranks[prices.symbols[i]] > approach.band]
+        else:
+            raise ValueError(approach.policy)
 
-    def _buy(self, positions, buys, available, price_map, y, m):
-        """Allocate `available` equally across intended buys. Unpriceable buys leave their share as cash.
-        Returns the leftover cash."""
-        if not buys:
-            return available
-        per = available / len(buys)
-        leftover = 0.0
-        for sym in buys:
-            px = self._price(price_map, sym, y, m)
-            if px:
-                positions[sym] = {"shares": per / px, "age": 0}
-            else:
-                leftover += per
-        return leftover
+        return simulate_portfolio(prices, select, sells, start, end)
 
-    def _mark(self, positions, cash, y, m, price_map, carried):
-        total = cash
-        holdings = []
-        for sym, pos in positions.items():
-            px = self._price_carry(price_map, sym, y, m)
-            if px is None:
-                continue
-            if month_key(y, m) not in price_map.get(sym, {}):
-                carried.add(sym)
-            v = pos["shares"] * px
-            total += v
-            holdings.append((sym, v))
-        if cash > 0.01:
-            holdings.append(("(cash)", cash))
-        return total, holdings
+    @staticmethod
+    def _benchmark_curve(series):
+        """The benchmark's price on each month of SIM_MONTHS + VALUATION_MONTH, None if it lacks any."""
+        curve = PriceMatrix({"benchmark": series}).carry[0]
+        return None if None in curve else curve
+
+    def _risk_stats(self, results):
+        """{approach_key: {cat: RiskStats, AGGREGATE: RiskStats}}, every curve analyzed in one pass.
+        AGGREGATE = all categories combined."""
+        curves = {}
+        for key, by_cat in results.items():
+            for cat in CATEGORIES:
+                curves[(key, cat)] = ([v for _, v in by_cat[cat]["equity_curve"]], by_cat[cat]["traded"])
+            curve_len = len(by_cat[CATEGORIES[0]]["equity_curve"])
+            curves[(key, AGGREGATE)] = (
+                [sum(by_cat[cat]["equity_curve"][i][1] for cat in CATEGORIES) for i in range(curve_len)],
+                [sum(by_cat[cat]["traded"][i] for cat in CATEGORIES) for i in range(curve_len)],
+            )
+        risk = {key: {} for key in results}
+        for (key, cat), stats in analyze(curves, self.benchmark, self.cost, self.risk_free).items():
+            risk[key][cat] = stats
+        return risk
 
     # ----- reporting -----
     def _ret(self, value):
@@ -482,6 +823,106 @@ class Command(BaseCommand):
         with open(f"{RESOURCES_DIR}/backtest_comparison.txt", "w") as f:
             f.write("\n".join(lines) + "\n")
 
+    def _write_risk_report(self, results, risk):
+        """Risk-adjusted returns, benchmark tracking and transaction costs, aggregate portfolio first,
+        then the Sharpe ratio per category."""
+        width = 132
+        header = (f"{'Approach':<34} | {'Return':>9} | {'Net ret':>9} | {'Costs':>8} | {'Vol':>7} | {'Sharpe':>6} | "
+                  f"{'Sortino':>7} | {'Beta':>5} | {'TE':>7} | {'IR':>5} | {'Max DD':>7}")
+        lines = [f"RISK & COSTS - {PERIOD_LABEL}",
+                 f"Monthly returns, annualized. Risk-free rate {self.risk_free * 100:g}%. "
+                 f"Costs = {self.cost * 10000:g} bps of every dollar bought or sold (initial buy included), "
+                 "taken out of the portfolio when paid.",
+                 "Net ret and every ratio are after costs. Beta / TE (tracking error) / IR (information ratio) are "
+                 f"against {self.benchmark_symbol}" + (" (no prices, so n/a)." if self.benchmark is None else "."),
+                 "",
+                 "=" * width, f"AGGREGATE PORTFOLIO (all {len(CATEGORIES)} categories combined)", "=" * width,
+                 header, "-" * width]
+        for key in results:
+            stats = risk[key][AGGREGATE]
+            lines.append(f"{key:<34} | {_fmt(stats.total_return, '>+8.1f', '%')} | {_fmt(stats.net_return, '>+8.1f', '%')} | "
+                         f"{stats.cost_paid:>8,.0f} | {_fmt(stats.volatility, '>6.1f', '%')} | {_fmt(stats.sharpe, '>6.2f')} | "
+                         f"{_fmt(stats.sortino, '>7.2f')} | {_fmt(stats.beta, '>5.2f')} | "
+                         f"{_fmt(stats.tracking_error, '>6.1f', '%')} | {_fmt(stats.information_ratio, '>5.2f')} | "
+                         f"{stats.max_drawdown:>+6.1f}%")
+
+        lines += ["", "=" * width, "SHARPE PER CATEGORY", "=" * width,
+                  f"{'Approach':<34} | " + " | ".join(f"{SARating.TYPES[cat][:11]:>11}" for cat in CATEGORIES)
+                  + f" | {'Median':>6}",
+                  "-" * width]
+        for key in results:
+            sharpes = [risk[key][cat].sharpe for cat in CATEGORIES]
+            known = [sharpe for sharpe in sharpes if sharpe is not None]
+            lines.append(f"{key:<34} | " + " | ".join(_fmt(sharpe, '>11.2f') for sharpe in sharpes)
+                         + f" | {_fmt(_median(known) if known else None, '>6.2f')}")
+        with open(f"{RESOURCES_DIR}/backtest_risk.txt", "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _write_ranked_report(self, results, missing, title, notes, path):
+        """Every approach (sweep configuration / registered strategy), best median category return first."""
+        n = len(CATEGORIES)
+        risk = self._risk_stats(results)
+        rows = []
+        for key, by_cat in results.items():
+            rets = [self._ret(by_cat[cat]["final_value"]) for cat in CATEGORIES]
+            sells = sum(by_cat[cat]["total_sells"] for cat in CATEGORIES) / n / (len(SIM_MONTHS) - 1)
+            rows.append((_median(rets), sum(rets) / n, risk[key][AGGREGATE], sells, key))
+        rows.sort(key=lambda row: (-row[0], -row[1], row[4]))
+
+        width = 124
+        lines = [f"{title} - {len(rows)} configurations, {PERIOD_LABEL}",
+                 *notes,
+                 "Median/Average = over the categories; drawdown, net return (after "
+                 f"{self.cost * 10000:g} bps per dollar traded) and Sharpe = aggregate portfolio of all categories.",
+                 "=" * width, "",
+                 f"{'#':>4} | {'Configuration':<34} | {'Median ret':>11} | {'Avg ret':>10} | {'Net agg ret':>11} | "
+                 f"{'Sharpe':>6} | {'Max DD':>8} | {'Sells/mo':>8}",
+                 "-" * width]
+        for rank, (median_ret, avg_ret, stats, sells, key) in enumerate(rows, 1):
+            lines.append(f"{rank:>4} | {key:<34} | {median_ret:>+10.1f}% | {avg_ret:>+9.1f}% | "
+                         f"{_fmt(stats.net_return, '>+10.1f', '%')} | {_fmt(stats.sharpe, '>6.2f')} | "
+                         f"{stats.max_drawdown:>+7.1f}% | {sells:>8.1f}")
+        if missing:
+            lines += ["", f"Symbols with no price data ({len(missing)}), held as cash when selected:",
+                      "  " + ", ".join(sorted(missing))]
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _write_rolling_report(self, rolling, missing):
+        """Per horizon, each approach's distribution over every (category, start month) run."""
+        initial = PORTFOLIO_SIZE * DOLLARS_PER_STOCK
+        width = 124
+        lines = [f"ROLLING-START ROBUSTNESS - start months {month_key(*SIM_MONTHS[0])} -> {month_key(*SIM_MONTHS[-1])}, "
+                 f"{len(CATEGORIES)} categories",
+                 "Each run = one category portfolio bought on a start month, marked after the horizon.",
+                 "Returns and annualized returns are % of the starting capital; p10/p90 = 10th/90th percentile.",
+                 "Drawdown = that run's own equity curve; Sells/mo = median over runs.",
+                 ""]
+        for h, by_key in rolling.items():
+            title = "UNTIL " + exit_month_key() if h is None else f"{h}-MONTH HORIZON"
+            lines += ["=" * width, title, "=" * width,
+                      f"{'Approach':<34} | {'Runs':>5} | {'Ret p10':>8} | {'Median':>8} | {'Ret p90':>8} | "
+                      f"{'Positive':>8} | {'Annual med':>10} | {'DD median':>9} | {'DD worst':>8} | {'Sells/mo':>8}",
+                      "-" * width]
+            for key, runs in by_key.items():
+                rets, annual, drawdowns, sells = [], [], [], []
+                for r in runs:
+                    months = len(r["equity_curve"]) - 1
+                    rets.append(self._ret(r["final_value"]))
+                    annual.append(((r["final_value"] / initial) ** (12 / months) - 1) * 100)
+                    drawdowns.append(_max_drawdown([v for _, v in r["equity_curve"]]))
+                    sells.append(r["total_sells"] / (months - 1) if months > 1 else 0.0)
+                positive = sum(1 for ret in rets if ret > 0) / len(rets) * 100
+                lines.append(f"{key:<34} | {len(runs):>5} | {_percentile(rets, 10):>+7.1f}% | {_median(rets):>+7.1f}% | "
+                             f"{_percentile(rets, 90):>+7.1f}% | {positive:>7.0f}% | {_median(annual):>+9.1f}% | "
+                             f"{_median(drawdowns):>+8.1f}% | {min(drawdowns):>+7.1f}% | {_median(sells):>8.1f}")
+            lines.append("")
+        if missing:
+            lines += [f"Symbols with no price data ({len(missing)}), held as cash when selected:",
+                      "  " + ", ".join(sorted(missing))]
+        with open(f"{RESOURCES_DIR}/backtest_rolling.txt", "w") as f:
+            f.write("\n".join(lines) + "\n")
+
     def _write_regime_report(self, results):
         """Turnover + downturn behaviour on the aggregate (all 8 categories combined) portfolio."""
         keys = ["decayed", "decay_x2", "momentum_rankband25", "current", "score_alltime", "alltime_gated"]
@@ -0,0 +1,189 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.quant.models import SAStock
+from apps.quant.management.commands.backtest_scores import (
+    CATEGORIES,
+    COST_BPS,
+    FETCH_WORKERS,
+    MISSING_MONTHS,
+    RESOURCES_DIR,
+    SIM_MONTHS,
+    VALUATION_MONTH,
+    Command as BacktestCommand,
+    PriceMatrix,
+)
+from apps.quant.synthetic import create_dataset, month_range
+
+try:
+    import resource
+except ImportError:  # Windows: no peak memory
+    resource = None
+
+# Benchmark command: times backtest_scores phases A-D (selections, prices, simulation, reports)
+# on a synthetic dataset, so a slower change shows up before it slows the research down.
+# Everything runs in a throwaway test database and a temporary folder: the real ratings,
+# prices, price cache and reports are never touched.
+# Each run is appended to --history. A phase slower (or using more queries / memory) than
+# the median of the previous runs of the same size by more than --threshold fails the command.
+# Usage
+# python manage.py benchmark_backtest                          (300 stocks, top 100 of the 8 backtest categories)
+# python manage.py benchmark_backtest --stocks 3000 --jobs 8   (10x the stocks, simulated on 8 processes)
+# python manage.py benchmark_backtest --no-save                (don't add this run to the history)
+
+HISTORY_PATH = f"{RESOURCES_DIR}/benchmark_history.json"
+PHASES = ["A: selections", "B: prices", "C: simulation", "D: reports"]
+# Runs compared against: the last ones of the same size
+BASELINE_RUNS = 5
+# Timing differences smaller than this are noise, not regressions
+MIN_SECONDS_DIFF = 0.05
+
+
+# Peak resident memory of this process and its finished children (forked simulation workers), in MB
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+class Command(BaseCommand):
+    help = "Time the backtest_scores phases on a synthetic dataset and fail on regressions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stocks", type=int, default=300, help="Synthetic SA stocks")
+        parser.add_argument("--ranks", type=int, default=100, help="Stocks ranked per type per month")
+        parser.add_argument("--months", type=int, default=len(SIM_MONTHS) + 4,
+                            help="Months of ratings, ending with the valuation month (at least the simulated ones)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--jobs", type=int, default=1, help="Simulation processes (backtest_scores --jobs)")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Allowed slowdown (or query / memory increase) per phase, 0.25 = 25%%")
+        parser.add_argument("--history", default=HISTORY_PATH)
+        parser.add_argument("--no-save", action="store_true", help="Compare only, don't add this run to the history")
+
+    def handle(self, *args, **opts):
+        if opts["months"] < len(SIM_MONTHS) + 1:
+            raise CommandError(f"--months must cover the {len(SIM_MONTHS) + 1} simulated months")
+        history_path = os.path.abspath(opts["history"])
+        params = {key: opts[key] for key in ("stocks", "ranks", "months", "seed", "jobs")}
+
+        old_database_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(f"Building the synthetic dataset ({opts['stocks']} stocks)...")
+            months = month_range(date(*VALUATION_MONTH, 1), opts["months"])
+            create_dataset(opts["stocks"], months, ranks=opts["ranks"], types=CATEGORIES,
+                           skip_months={date(y, m, 1) for (y, m) in MISSING_MONTHS},
+                           # A stock split by a ticker change wouldn't have local prices for every month
+                           seed=opts["seed"], ticker_changes=0, write=self.stdout.write)
+            phases = self._run_phases(opts["jobs"])
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+
+        history = []
+        if os.path.exists(history_path):
+            with open(history_path) as f:
+                history = json.load(f)
+        previous = [run for run in history if run["params"] == params][-BASELINE_RUNS:]
+        regressions = self._compare(phases, previous, opts["threshold"])
+
+        if not opts["no_save"]:
+            history.append({
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "params": params,
+                "phases": phases,
+            })
+            os.makedirs(os.path.dirname(history_path), exist_ok=True)
+            with open(history_path, "w") as f:
+                json.dump(history, f, indent=1)
+
+        if regressions:
+            raise CommandError("Regressions:\n" + "\n".join(regressions))
+        if previous:
+            self.stdout.write(self.style.SUCCESS(f"No regression against the last {len(previous)} runs"))
+        else:
+            self.stdout.write(self.style.SUCCESS("First run of this size, nothing to compare against"))
+
+    def _run_phases(self, jobs):
+        """Runs the backtest's phases like backtest_scores does, each one timed with its query count and
+        the peak memory so far. Reports are written to a temporary folder."""
+        backtest = BacktestCommand(stdout=self.stdout, stderr=self.stderr)
+        backtest.decay_window, backtest.momentum_window, backtest.momentum_weight = 3, 4, 2.0
+        backtest.cost, backtest.risk_free = COST_BPS / 10000, 0.0
+        state = {}
+
+        def selections():
+            backtest.id_to_symbol = dict(SAStock.objects.values_list("pk", "symbol"))
+            backtest.approaches = backtest._live_approaches()
+            backtest._load_ratings()
+            backtest.selections = {}
+            state["universe"] = backtest._symbol_universe()
+
+        def prices():
+            state["price_map"], state["missing"] = backtest._get_prices(state["universe"], workers=FETCH_WORKERS)
+            if state["missing"]:
+                raise CommandError(f"Synthetic symbols without prices: {sorted(state['missing'])[:5]}")
+            # No index in the synthetic data: any stock stands in for it
+            backtest.benchmark_symbol = state["universe"][0]
+            backtest.benchmark = backtest._benchmark_curve(state["price_map"][backtest.benchmark_symbol])
+
+        def simulation():
+            state["results"] = backtest._simulate_all(PriceMatrix(state["price_map"]), jobs)
+
+        def reports():
+            backtest._write_reports(state["results"], state["missing"])
+
+        phases = {}
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as folder:
+            # The price cache and the reports are relative to RESOURCES_DIR
+            os.makedirs(os.path.join(folder, RESOURCES_DIR))
+            os.chdir(folder)
+            try:
+                for name, run in zip(PHASES, [selections, prices, simulation, reports]):
+                    with CaptureQueriesContext(connection) as queries:
+                        start = time.perf_counter()
+                        run()
+                        seconds = time.perf_counter() - start
+                    phases[name] = {"seconds": round(seconds, 3), "queries": len(queries), "peak_rss_mb": _peak_rss_mb()}
+                    self.stdout.write(f"{name:<15} {seconds:>8.3f}s {len(queries):>6} queries"
+                                      f"{'' if resource is None else f'  {_peak_rss_mb():>8.1f} MB peak'}")
+            finally:
+                os.chdir(cwd)
+        return phases
+
+    @staticmethod
+    def _compare(phases, previous, threshold):
+        """Lines describing each phase measure above the median of the previous runs by more than threshold."""
+        regressions = []
+        if not previous:
+            return regressions
+        for name, measures in phases.items():
+            for measure, value in measures.items():
+                past = sorted(run["phases"][name][measure] for run in previous
+                              if run["phases"].get(name, {}).get(measure) is not None)
+                if value is None or not past:
+                    continue
+                baseline = past[len(past) // 2]
+                if value > baseline * (1 + threshold) and (measure != "seconds" or value - baseline > MIN_SECONDS_DIFF):
+                    regressions.append(f"  {name} {measure}: {value} (median of the last runs: {baseline})")
+        return regressions
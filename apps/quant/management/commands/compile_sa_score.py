@@ -1,12 +1,16 @@
 from django.core.management.base import BaseCommand
-from django.db.models import Count, F, Max, Sum
+from django.db.models import Max
 
-from apps.quant.models import CompiledSAScore, SARating, SAStock
+from apps.quant import month_snapshots
+from apps.quant.models import CompiledSAScore, SARating
 from apps.quant.scoring import MAX_SA_RATING_TYPES_PER_RUN, get_types_pending_compilation
+from apps.quant.strategies import all_time_scores
 
 
 # Cronjob command: compile the all-time cumulative SA score for each stock.
-# Score = sum(101 - rank) over every month a stock was ranked, no decay.
+# Score = sum(101 - rank) over every month a stock was ranked, no decay
+# (AllTimeScore in apps/quant/strategies.py, the same one backtest_scores simulates,
+# summed in SQL by all_time_scores()).
 # Only rating types not already compiled for the latest dump are processed,
 # capped at --limit per run.
 # Usage
@@ -39,23 +43,16 @@ class Command(BaseCommand):
             CompiledSAScore, latest_quant_dump_date, max_quant_types, write=self.stdout.write
         )
 
-        # For each SA score type, get ALL the rating rows and compile the score.
+        # For each SA score type, sum ALL its rating rows into the score, in the database.
         for current_type in types_to_update:
-            compiled_type = (
-                SARating.objects
-                .filter(type=current_type)
-                .values("sa_stock", "type")  # Grouping fields
-                .annotate(count=Count("pk"), score=Sum(101 - F("rank")))
-            )
-
             # Convert the query results to a list of CompiledSAScore objects for model insert.
             compiled_type_instances = []
-            for entry in compiled_type:
+            for sa_stock_id, score, count in all_time_scores(current_type):
                 compiled_type_instances.append(CompiledSAScore(
-                    sa_stock=SAStock.objects.get(pk=entry["sa_stock"]),
-                    type=entry["type"],
-                    score=entry["score"],
-                    count=entry["count"],
+                    sa_stock_id=sa_stock_id,
+                    type=current_type,
+                    score=score,
+                    count=count,
                     latest_sa_ratings_date=latest_quant_dump_date
                 ))
 
@@ -66,6 +63,10 @@ class Command(BaseCommand):
                 update_fields=["count", "score", "latest_sa_ratings_date"],
                 unique_fields=["sa_stock", "type"],  # Fields to match existing rows that need updating
             )
-            self.stdout.write(f"Compiled type: {SARating.TYPES[current_type]} ({compiled_type.count()} stock symbols)")
+            self.stdout.write(f"Compiled type: {SARating.TYPES[current_type]} ({len(compiled_type_instances)} stock symbols)")
+
+        if types_to_update:
+            # The month page shows these counts, from its precomputed snapshots
+            month_snapshots.rebuild()
 
         self.stdout.write(self.style.SUCCESS(f"Compiled {len(types_to_update)} Seeking Alpha score types"))
\ No newline at end of file
@@ -1,18 +1,17 @@
+from collections import Counter
+
 from django.core.management.base import BaseCommand
 from django.db.models import Max
 
 from apps.quant.models import CompiledSAScoreDecayed, SARating
-from apps.quant.scoring import (
-    MAX_SA_RATING_TYPES_PER_RUN,
-    get_distance_in_months,
-    get_types_pending_compilation,
-    rewind_months,
-)
+from apps.quant.scoring import MAX_SA_RATING_TYPES_PER_RUN, get_types_pending_compilation
+from apps.quant.strategies import DecayedScore, load_ratings
 
 
 # Cronjob command: compile the recency-decayed SA score for each stock.
 # Only the last --decay-months months count, each weighted by --decay-base ** i
 # (month 0 = newest). For example base 0.5 over 3 months -> [1.0, 0.5, 0.25].
+# The score is DecayedScore in apps/quant/strategies.py, the same one backtest_scores simulates.
 # Only rating types not already compiled for the latest dump are processed,
 # capped at --limit per run.
 # Usage
@@ -53,8 +52,8 @@ class Command(BaseCommand):
         # Exponential recency curve: weight for month i back = decay_base ** i. For example:
         # decay_base 0.5, decay_months 3 => [1.0, 0.5, 0.25]
         # decay_base 0.5, decay_months 1 => [1.0]
-        decay_factors = [decay_base ** i for i in range(decay_months)]
-        self.stdout.write(f"Decay factors: {decay_factors}")
+        strategy = DecayedScore.exponential(decay_base, decay_months)
+        self.stdout.write(f"Decay factors: {list(strategy.factors)}")
 
         latest_quant_dump_date = SARating.objects.aggregate(latest_date=Max("date"))["latest_date"]
         self.stdout.write(f"Latest Seeking Alpha ratings date: {latest_quant_dump_date}")
@@ -62,7 +61,7 @@ class Command(BaseCommand):
             self.stdout.write("No ratings data found")
             return
 
-        earliest_quant_date = rewind_months(latest_quant_dump_date, decay_months - 1)
+        earliest_quant_date = strategy.earliest(latest_quant_dump_date)
 
         types_to_update = get_types_pending_compilation(
             CompiledSAScoreDecayed, latest_quant_dump_date, max_quant_types, write=self.stdout.write
@@ -74,26 +73,22 @@ class Command(BaseCommand):
             # Clear old values.
             CompiledSAScoreDecayed.objects.filter(type=current_type).delete()
 
-            compiled_quants_with_decay = {}
             # Get all SA ratings data with given type & date >= earliest month in the window.
-            for rating in (SARating.objects.filter(type=current_type, date__gte=earliest_quant_date).order_by("date")):
-                decay_factor = decay_factors[get_distance_in_months(rating.date, latest_quant_dump_date)]
-
-                # Add sa_stock to the dictionary if it doesn't exist yet.
-                if rating.sa_stock not in compiled_quants_with_decay:
-                    compiled_quants_with_decay[rating.sa_stock] = CompiledSAScoreDecayed(
-                        sa_stock=rating.sa_stock,
-                        type=current_type,
-                        score=0,
-                        count=0,
-                        latest_sa_ratings_date=latest_quant_dump_date
-                    )
-
-                # Calculate the new decayed score and append values.
-                compiled_quants_with_decay[rating.sa_stock].count += 1
-                compiled_quants_with_decay[rating.sa_stock].score += int((101 - rating.rank) * decay_factor)
-
+            ratings = load_ratings(current_type, earliest_quant_date)
+            scores = strategy.scores(ratings, latest_quant_dump_date)
+            counts = Counter(rating.sa_stock_id for rating in ratings)
+
+            compiled_quants_with_decay = [
+                CompiledSAScoreDecayed(
+                    sa_stock_id=sa_stock_id,
+                    type=current_type,
+                    score=int(score),
+                    count=counts[sa_stock_id],
+                    latest_sa_ratings_date=latest_quant_dump_date
+                )
+                for sa_stock_id, score in scores.items()
+            ]
             if compiled_quants_with_decay:
-                CompiledSAScoreDecayed.objects.bulk_create(compiled_quants_with_decay.values())
+                CompiledSAScoreDecayed.objects.bulk_create(compiled_quants_with_decay)
 
         self.stdout.write(self.style.SUCCESS(f"Compiled {len(types_to_update)} Seeking Alpha score types"))
\ No newline at end of file
@@ -1,19 +1,18 @@
+from collections import Counter
+
 from django.core.management.base import BaseCommand
 from django.db.models import Max
 
 from apps.quant.models import CompiledSAScoreMomentum, SARating
-from apps.quant.scoring import (
-    MAX_SA_RATING_TYPES_PER_RUN,
-    get_distance_in_months,
-    get_types_pending_compilation,
-    rewind_months,
-)
+from apps.quant.scoring import MAX_SA_RATING_TYPES_PER_RUN, get_types_pending_compilation
+from apps.quant.strategies import MomentumScore, load_ratings
 
 
 # Cronjob command: compile the "rising stars" momentum SA score for each stock.
 # Combines current rank quality (base) with rank-change velocity (momentum):
 # final = base + --momentum-weight * momentum, over a --window-months window.
-# See quant_simulations/README.md for the algorithm and worked examples.
+# See quant_simulations/README.md for the algorithm and worked examples; the score is
+# MomentumScore in apps/quant/strategies.py, the same one backtest_scores simulates.
 # Only rating types not already compiled for the latest dump are processed,
 # capped at --limit per run.
 # Usage
@@ -51,17 +50,7 @@ class Command(BaseCommand):
         momentum_weight = options["momentum_weight"]
         self.stdout.write(f"Window months: {window_months}, momentum weight: {momentum_weight}")
 
-        # Position decay weights for the base score -- recent months count more.
-        # window=5 => [1.0, 0.8, 0.6, 0.4, 0.2]
-        pos_decay = [(window_months - i) / window_months for i in range(window_months)]
-        pos_decay_sum = sum(pos_decay)
-
-        # Slope decay weights for momentum -- recent slope counts more.
-        # window=5 => [1.0, 0.75, 0.5, 0.25]
-        slope_decay = [(window_months - 1 - i) / (window_months - 1) for i in range(window_months - 1)]
-        slope_decay_sum = sum(slope_decay)
-        self.stdout.write(f"Position decay: {pos_decay}")
-        self.stdout.write(f"Slope decay:    {slope_decay}")
+        strategy = MomentumScore(window_months, momentum_weight)
 
         latest_quant_dump_date = SARating.objects.aggregate(latest_date=Max("date"))["latest_date"]
         self.stdout.write(f"Latest Seeking Alpha ratings date: {latest_quant_dump_date}")
@@ -69,7 +58,7 @@ class Command(BaseCommand):
             self.stdout.write("No ratings data found")
             return
 
-        earliest_quant_date = rewind_months(latest_quant_dump_date, window_months - 1)
+        earliest_quant_date = strategy.earliest(latest_quant_dump_date)
 
         types_to_update = get_types_pending_compilation(
             CompiledSAScoreMomentum, latest_quant_dump_date, max_quant_types, write=self.stdout.write
@@ -81,34 +70,17 @@ class Command(BaseCommand):
             # Clear old values.
             CompiledSAScoreMomentum.objects.filter(type=current_type).delete()
 
-            # Per-stock buckets: an array of length window_months, indexed by months-back-from-latest.
-            # index 0 = newest month, index window_months-1 = oldest. Missing months stay at 0
-            # (which is exactly what "not in the top 100" should produce).
-            stock_values = {}
-            stock_counts = {}
-            for rating in SARating.objects.filter(type=current_type, date__gte=earliest_quant_date):
-                distance = get_distance_in_months(rating.date, latest_quant_dump_date)
-                value = max(0, 101 - rating.rank)
-
-                if rating.sa_stock_id not in stock_values:
-                    stock_values[rating.sa_stock_id] = [0] * window_months
-                    stock_counts[rating.sa_stock_id] = 0
-
-                stock_values[rating.sa_stock_id][distance] = value
-                stock_counts[rating.sa_stock_id] += 1
+            ratings = load_ratings(current_type, earliest_quant_date)
+            scores = strategy.scores(ratings, latest_quant_dump_date)
+            counts = Counter(rating.sa_stock_id for rating in ratings)
 
             instances = []
-            for sa_stock_id, values in stock_values.items():
-                base = sum(v * w for v, w in zip(values, pos_decay)) / pos_decay_sum
-                slopes = [values[i] - values[i + 1] for i in range(window_months - 1)]
-                momentum = sum(s * w for s, w in zip(slopes, slope_decay)) / slope_decay_sum
-                final = base + momentum_weight * momentum
-
+            for sa_stock_id, score in scores.items():
                 instances.append(CompiledSAScoreMomentum(
                     sa_stock_id=sa_stock_id,
                     type=current_type,
-                    score=int(round(final)),
-                    count=stock_counts[sa_stock_id],
+                    score=int(round(score)),
+                    count=counts[sa_stock_id],
                     latest_sa_ratings_date=latest_quant_dump_date,
                 ))
 
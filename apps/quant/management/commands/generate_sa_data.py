@@ -0,0 +1,88 @@
+import random
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from apps.quant.models import SARating
+from apps.quant.synthetic import TICKER_CHANGES, create_dataset, month_range, write_dumps
+
+MAX_RANK = 32767
+
+# Generates a synthetic Seeking Alpha dataset (apps/quant/synthetic.py) to load-test the
+# importer, the compile crons, the views and the backtest at 10x or 100x the real size.
+# --csv writes monthly dumps that import_sa_ratings reads (plus a _prices.csv), --db writes
+# straight into the database (SAStocks, SARatings, and linked watched Stocks with prices).
+# Same arguments = same dataset, in both outputs.
+# Usage
+# python manage.py generate_sa_data --csv data_dumps/synthetic --stocks 3000
+# python manage.py import_sa_ratings "data_dumps/synthetic/*.csv"
+# python manage.py generate_sa_data --db --stocks 30000 --months 60 --no-prices   (use a scratch database!)
+
+
+def _month(value):
+    try:
+        year, month = value.split("-")
+        return date(int(year), int(month), 1)
+    except ValueError:
+        raise CommandError(f"Invalid month: {value} (expected YYYY-MM)")
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic SA stocks, monthly ratings and prices, as dump CSVs or into the database"
+
+    def add_arguments(self, parser):
+        output = parser.add_mutually_exclusive_group(required=True)
+        output.add_argument("--csv", metavar="FOLDER", help="Write monthly dump CSVs into this folder")
+        output.add_argument("--db", action="store_true", help="Write into the database")
+        parser.add_argument("--stocks", type=int, default=1000)
+        parser.add_argument("--months", type=int, default=36)
+        parser.add_argument("--end", type=_month, default=date.today().replace(day=1),
+                            help="Last month (YYYY-MM, default: this month)")
+        parser.add_argument("--ranks", type=int, default=100, help="Stocks ranked per type per month")
+        parser.add_argument("--types", default=",".join(SARating.TYPES),
+                            help="Comma-separated rating types (default: all of them)")
+        parser.add_argument("--missing-months", type=int, default=1,
+                            help="Months without any dump, picked at random (never the first or last one)")
+        parser.add_argument("--ticker-changes", type=float, default=TICKER_CHANGES,
+                            help="Share of the stocks changing ticker once")
+        parser.add_argument("--no-prices", action="store_true")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        types = [rating_type for rating_type in options["types"].split(",") if rating_type]
+        unknown = [rating_type for rating_type in types if rating_type not in SARating.TYPES]
+        if unknown:
+            raise CommandError(f"Unknown rating types: {', '.join(unknown)}")
+        # Ranks are stored in SARating.rank, a PositiveSmallIntegerField
+        if not 1 <= options["ranks"] <= MAX_RANK:
+            raise CommandError(f"--ranks must be between 1 and {MAX_RANK}")
+        months = month_range(options["end"], options["months"])
+        if not 0 <= options["missing_months"] <= len(months) - 2:
+            raise CommandError("--missing-months must leave the first and last months")
+        skip_months = set(random.Random(options["seed"]).sample(months[1:-1], options["missing_months"]))
+
+        arguments = dict(
+            stocks=options["stocks"],
+            months=months,
+            ranks=options["ranks"],
+            types=types,
+            skip_months=skip_months,
+            with_prices=not options["no_prices"],
+            seed=options["seed"],
+            ticker_changes=options["ticker_changes"],
+            write=self.stdout.write,
+        )
+        self.stdout.write(f"{options['stocks']} stocks, {months[0]:%Y-%m} -> {months[-1]:%Y-%m}, {len(types)} types, "
+                          f"missing months: {', '.join(f'{month:%Y-%m}' for month in sorted(skip_months)) or 'none'}")
+        if options["csv"]:
+            write_dumps(options["csv"], **arguments)
+            self.stdout.write(self.style.SUCCESS(f"Done. Import with: python manage.py import_sa_ratings "
+                                                 f"\"{options['csv']}/*.csv\""))
+        else:
+            try:
+                create_dataset(**arguments)
+            except IntegrityError:
+                # The SAStocks are inserted first, so nothing was written
+                raise CommandError("This database already has synthetic stocks, use a fresh one")
+            self.stdout.write(self.style.SUCCESS("Done."))
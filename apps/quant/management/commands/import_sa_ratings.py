@@ -8,6 +8,8 @@ from django.core.management.base import BaseCommand
 
 from utils.quant import find_matching_value, Columns, COLUMN_NAME_VARIANTS
 from apps.quant.models import SAStock, SARating
+from apps.quant import month_snapshots, rank_matrix
+from apps.quant.rating_dates import update_first_seen_dates
 from apps.quant.symbols.edgar import load_ticker_to_cik, normalize_ticker
 from apps.quant.symbols.matching import is_share_class_pair
 
@@ -94,12 +96,14 @@ class Command(BaseCommand):
         self.cik_mismatch_warned = set()
 
         files_imported = 0
+        imported_stock_ids = set()
         for csv_file in files_to_import:
             try:
                 with open(csv_file, 'r', encoding='utf-8') as file:
                     csv_reader = csv.DictReader(file)
 
                     sa_ratings_list = []
+                    sa_stock_ids = set()
                     error = False
                     for row in csv_reader:
                         sa_rating = SARating()
@@ -110,6 +114,7 @@ class Command(BaseCommand):
                             new_row[col_name] = find_matching_value(row, possible_names)
 
                         sa_rating.sa_stock = self.find_or_update_stock(new_row, ticker_to_cik)
+                        sa_stock_ids.add(sa_rating.sa_stock.pk)
 
                         # If no date in column, use current date
                         sa_rating.date = new_row[Columns.DATE] if new_row[Columns.DATE] else datetime.today()
@@ -155,6 +160,8 @@ class Command(BaseCommand):
 
                     if BULK_INSERTION:
                         SARating.objects.bulk_create(sa_ratings_list, ignore_conflicts=True)
+                    update_first_seen_dates(sa_stock_ids)
+                    imported_stock_ids |= sa_stock_ids
 
                     if not error:
                         files_imported += 1
@@ -163,6 +170,11 @@ class Command(BaseCommand):
             except FileNotFoundError:
                 self.stderr.write(self.style.ERROR(f"File not found: {csv_file}"))
 
+        # Once for all the files, not once per monthly dump
+        rank_matrix.rebuild(imported_stock_ids)
+        # Every month: a renamed stock has its new symbol in the older months too
+        month_snapshots.rebuild()
+
         if files_imported == 0:
             self.stderr.write(self.style.ERROR("No files imported."))
         else:
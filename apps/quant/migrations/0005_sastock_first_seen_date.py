@@ -0,0 +1,29 @@
+# Generated by Django 6.0.5 on 2026-10-19 21:24
+
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+
+
+# Earliest rating date of every existing stock, in one UPDATE
+def fill_first_seen_dates(apps, schema_editor):
+    SAStock = apps.get_model("quant", "SAStock")
+    SARating = apps.get_model("quant", "SARating")
+    first_dates = SARating.objects.filter(sa_stock=OuterRef("pk")).order_by().values("sa_stock") \
+        .annotate(first_date=Min("date")).values("first_date")
+    SAStock.objects.update(first_seen_date=Subquery(first_dates))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quant', '0004_remove_sastock_needs_review_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sastock',
+            name='first_seen_date',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(fill_first_seen_dates, migrations.RunPython.noop),
+    ]
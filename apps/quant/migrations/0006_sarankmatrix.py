@@ -0,0 +1,22 @@
+# Generated by Django 6.0.5 on 2026-10-19 21:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quant', '0005_sastock_first_seen_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SARankMatrix',
+            fields=[
+                ('sa_stock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rank_matrix', serialize=False, to='quant.sastock')),
+                ('types', models.TextField(verbose_name='Rating types of the columns, comma-separated')),
+                ('data', models.BinaryField()),
+            ],
+        ),
+    ]
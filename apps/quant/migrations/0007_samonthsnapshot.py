@@ -0,0 +1,21 @@
+# Generated by Django 6.0.5 on 2026-10-19 22:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quant', '0006_sarankmatrix'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SAMonthSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('data', models.JSONField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.5 on 2026-10-19 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quant', '0007_samonthsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sarankmatrix',
+            name='version',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
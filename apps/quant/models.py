@@ -13,6 +13,8 @@ class SAStock(models.Model):
     # SEC CIK: a company id that stays the same even when the ticker/name changes.
     # Stocks without one are foreign/OTC names that EDGAR does not list.
     external_id = models.CharField(max_length=20, blank=True, default="", db_index=True)
+    # Date of its earliest rating, see apps/quant/rating_dates.py
+    first_seen_date = models.DateField(blank=True, null=True, db_index=True)
 
 
 class SARating(models.Model):
@@ -88,6 +90,15 @@ class SARating(models.Model):
 
         raise Exception(f"Invalid Seeking Alpha rating type requested: {key}")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stock and month as loaded, so editing them also refreshes the rank matrix, month snapshot and
+        # first seen date they leave
+        loaded = dict(zip(field_names, values))
+        instance._loaded_stock_month = (loaded.get("sa_stock_id"), loaded.get("date"))
+        return instance
+
 
 class CompiledSAScoreBase(models.Model):
     sa_stock = models.ForeignKey(SAStock, on_delete=models.CASCADE, db_index=True)
@@ -134,3 +145,27 @@ class CompiledSAScoreMomentum(CompiledSAScoreBase):
         ]
 
 
+# A SA stock's whole rating history packed as a months x types matrix of ranks, so its
+# history page doesn't pivot every rating on each request. SARating stays the source of
+# truth; see apps/quant/rank_matrix.py for the format and the API.
+class SARankMatrix(models.Model):
+    sa_stock = models.OneToOneField(SAStock, on_delete=models.CASCADE, primary_key=True, related_name="rank_matrix")
+    types = models.TextField(verbose_name="Rating types of the columns, comma-separated")
+    # Blob layout version, rank_matrix.FORMAT_VERSION when it was packed
+    version = models.PositiveSmallIntegerField(default=1)
+    data = models.BinaryField()
+
+    def __str__(self):
+        return f"{self.sa_stock.symbol} rank matrix"
+
+
+# One month of SA ratings already pivoted for the month page (ranks.month_view): a row per
+# stock with its rank and all-time count in each type. Rebuilt after each import and each
+# compile_sa_score run, dropped when one of its ratings or stocks is edited; see
+# apps/quant/month_snapshots.py.
+class SAMonthSnapshot(models.Model):
+    date = models.DateField(unique=True)
+    data = models.JSONField()
+
+    def __str__(self):
+        return f"{self.date:%Y-%m} month snapshot"
@@ -0,0 +1,93 @@
+"""
+Per-month snapshots of the SA ratings, already pivoted for the month page
+(ranks.month_view), so it doesn't load a month of ratings and look up their
+counts with a huge IN (...) on every request.
+
+A SAMonthSnapshot's data is columnar JSON:
+    {"types": [type slugs, column order],
+     "rows": [[symbol, name, [rank per type], [count per type]], ...]}
+with rank 0 where the stock isn't in that type's list that month, and count
+its all-time number of months in that type (CompiledSAScore.count).
+
+The ranks change with imports and the counts with compile_sa_score, so both
+rebuild every snapshot when they're done: a stock renamed by an import shows
+its new symbol in the older months too, as the page always did. A rating or SA
+stock saved or deleted one by one (admin) drops the snapshots of its months,
+and load() builds a missing (or outdated) snapshot on the fly.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.quant.models import CompiledSAScore, SAMonthSnapshot, SARating, SAStock
+from apps.quant.rating_dates import rating_months
+
+
+def rebuild(months=None) -> int:
+    """Rebuild the snapshots of these months (all of them if None). Returns the number written."""
+    types = list(SARating.TYPES)
+    column_of = {rating_type: column for column, rating_type in enumerate(types)}
+    ratings = SARating.objects.filter(date__isnull=False).order_by("date", "type", "sa_stock_id")
+    compiled = CompiledSAScore.objects.all()
+    if months is not None:
+        ratings = ratings.filter(date__in=months)
+        # Only the counts of the stocks rated in these months, not the whole table
+        compiled = compiled.filter(sa_stock_id__in=ratings.order_by().values("sa_stock_id"))
+    counts = {(sa_stock_id, rating_type): count for sa_stock_id, rating_type, count
+              in compiled.values_list("sa_stock_id", "type", "count")}
+
+    # month -> {sa_stock_id: row}, rows in the order the month's ratings come in
+    rows = defaultdict(dict)
+    for month, rating_type, sa_stock_id, rank, symbol, name in ratings.values_list(
+            "date", "type", "sa_stock_id", "rank", "sa_stock__symbol", "sa_stock__name").iterator():
+        row = rows[month].get(sa_stock_id)
+        if row is None:
+            row = rows[month][sa_stock_id] = [symbol, name, [0] * len(types), [0] * len(types)]
+        row[2][column_of[rating_type]] = rank
+        row[3][column_of[rating_type]] = counts.get((sa_stock_id, rating_type), 0)
+
+    snapshots = [SAMonthSnapshot(date=month, data={"types": types, "rows": list(month_rows.values())})
+                 for month, month_rows in rows.items()]
+    with transaction.atomic():
+        # Months without ratings anymore lose their snapshot
+        stale = SAMonthSnapshot.objects.exclude(date__in=rows.keys())
+        if months is not None:
+            stale = stale.filter(date__in=months)
+        stale.delete()
+        SAMonthSnapshot.objects.bulk_create(
+            snapshots,
+            update_conflicts=True,
+            update_fields=["data"],
+            unique_fields=["date"],
+        )
+    return len(snapshots)
+
+
+def load(month) -> dict | None:
+    """A month's snapshot data, built first if missing (or built for other types than SARating.TYPES).
+    None if the month has no ratings."""
+    # Checked against the cached months, so a month without ratings doesn't try a rebuild on every request
+    if month not in rating_months():
+        return None
+    data = SAMonthSnapshot.objects.filter(date=month).values_list("data", flat=True).first()
+    if (data is None or data["types"] != list(SARating.TYPES)) and rebuild([month]):
+        data = SAMonthSnapshot.objects.filter(date=month).values_list("data", flat=True).first()
+    return data
+
+
+# Connected at startup (QuantConfig.ready). Bulk imports don't send it and rebuild the snapshots themselves
+@receiver([post_save, post_delete], sender=SARating)
+def rating_changed(sender, instance, **kwargs):
+    _, loaded_month = getattr(instance, "_loaded_stock_month", (None, None))
+    SAMonthSnapshot.objects.filter(date__in={instance.date, loaded_month} - {None}).delete()
+
+
+# A renamed stock shows its new symbol and name in every month it's in. Deleting a stock
+# deletes its ratings, which drop their months through rating_changed()
+@receiver(post_save, sender=SAStock)
+def sa_stock_saved(sender, instance, created, **kwargs):
+    # A new stock has no ratings yet
+    if not created:
+        SAMonthSnapshot.objects.filter(date__in=SARating.objects.filter(sa_stock=instance).values("date")).delete()
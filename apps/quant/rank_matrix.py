@@ -0,0 +1,118 @@
+"""
+A SA stock's rating history as a months x types rank matrix, for its history
+page (ranks.stock view).
+
+Each SARankMatrix packs three arrays one after the other in a single blob: the
+months the stock was rated (date ordinals, oldest first), then the ranks and
+the quant ratings of every (month, type) cell, row by row in the column order
+of `types`. Ranks are unsigned 16 bits (SARating.rank is a small integer, up to
+32767) with NOT_RANKED for a month the stock wasn't in that type's list, quants
+are hundredths in 16 bits. A type's ranks over time are then the slice
+ranks[column::len(types)].
+
+SARating stays the source of truth. import_sa_ratings rebuilds the matrices of
+the stocks it imported, a rating saved or deleted one by one (admin) drops its
+stock's matrix, and load() builds a missing one (or one packed with other types
+than SARating.TYPES, or in an older FORMAT_VERSION) on the fly.
+"""
+from array import array
+from collections import defaultdict, namedtuple
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.quant.models import SARankMatrix, SARating
+
+# Version 1 packed the ranks in 8 bits, too small for ranks above 255
+FORMAT_VERSION = 2
+RANK_TYPECODE = "H"
+QUANT_TYPECODE = "h"
+NOT_RANKED = 0
+NO_QUANT = -1
+# Stocks rebuilt per query, under SQLite's limit of variables in the IN (...)
+BATCH_SIZE = 500
+
+RankMatrix = namedtuple("RankMatrix", ["months", "types", "ranks", "quants"])
+
+
+def pack(months: list[date], types: list[str], cells: dict) -> bytes:
+    """cells = {(month, type): (rank, quant)} -> blob"""
+    months_column, ranks, quants = array("i"), array(RANK_TYPECODE), array(QUANT_TYPECODE)
+    for month in months:
+        months_column.append(month.toordinal())
+        for rating_type in types:
+            rank, quant = cells.get((month, rating_type), (NOT_RANKED, None))
+            ranks.append(rank)
+            quants.append(NO_QUANT if quant is None else int(quant * 100))
+    return months_column.tobytes() + ranks.tobytes() + quants.tobytes()
+
+
+def unpack(blob: bytes, types: list[str]) -> RankMatrix:
+    months_column, ranks, quants = array("i"), array(RANK_TYPECODE), array(QUANT_TYPECODE)
+    month_size = months_column.itemsize + len(types) * (ranks.itemsize + quants.itemsize)
+    count = len(blob) // month_size
+    months_column.frombytes(blob[:count * months_column.itemsize])
+    offset = count * months_column.itemsize
+    ranks.frombytes(blob[offset:offset + count * len(types) * ranks.itemsize])
+    quants.frombytes(blob[offset + count * len(types) * ranks.itemsize:])
+    return RankMatrix([date.fromordinal(ordinal) for ordinal in months_column], types, ranks, quants)
+
+
+def quant_value(hundredths: int) -> Decimal | None:
+    return None if hundredths == NO_QUANT else Decimal(hundredths).scaleb(-2)
+
+
+def load(sa_stock_id: int) -> RankMatrix:
+    """A stock's rank matrix, built first if it doesn't have one yet (or an outdated one)."""
+    types = list(SARating.TYPES)
+    stored = SARankMatrix.objects.filter(sa_stock_id=sa_stock_id).values_list("types", "version", "data").first()
+    if stored is None or stored[0].split(",") != types or stored[1] != FORMAT_VERSION:
+        rebuild([sa_stock_id])
+        stored = SARankMatrix.objects.filter(sa_stock_id=sa_stock_id).values_list("types", "version", "data").first()
+    if stored is None:
+        return RankMatrix([], types, array(RANK_TYPECODE), array(QUANT_TYPECODE))
+    return unpack(bytes(stored[2]), types)
+
+
+def rebuild(sa_stock_ids) -> int:
+    """Rebuild the matrices of these stocks from their ratings, one query per BATCH_SIZE stocks.
+    Returns the number written."""
+    sa_stock_ids = list(sa_stock_ids)
+    return sum(_rebuild_batch(sa_stock_ids[i:i + BATCH_SIZE]) for i in range(0, len(sa_stock_ids), BATCH_SIZE))
+
+
+def _rebuild_batch(sa_stock_ids) -> int:
+    types = list(SARating.TYPES)
+    cells = defaultdict(dict)
+    months = defaultdict(set)
+    ratings = SARating.objects.filter(sa_stock_id__in=sa_stock_ids, date__isnull=False) \
+        .values_list("sa_stock_id", "date", "type", "rank", "quant")
+    for sa_stock_id, month, rating_type, rank, quant in ratings.iterator():
+        cells[sa_stock_id][(month, rating_type)] = (rank, quant)
+        months[sa_stock_id].add(month)
+
+    matrices = [
+        SARankMatrix(sa_stock_id=sa_stock_id, types=",".join(types), version=FORMAT_VERSION,
+                     data=pack(sorted(months[sa_stock_id]), types, stock_cells))
+        for sa_stock_id, stock_cells in cells.items()
+    ]
+    with transaction.atomic():
+        # Stocks left without ratings lose their matrix
+        SARankMatrix.objects.filter(sa_stock_id__in=sa_stock_ids).exclude(sa_stock_id__in=cells.keys()).delete()
+        SARankMatrix.objects.bulk_create(
+            matrices,
+            update_conflicts=True,
+            update_fields=["types", "version", "data"],
+            unique_fields=["sa_stock"],
+        )
+    return len(matrices)
+
+
+# Connected at startup (QuantConfig.ready). Bulk imports don't send it and rebuild the matrices themselves
+@receiver([post_save, post_delete], sender=SARating)
+def rating_changed(sender, instance, **kwargs):
+    loaded_sa_stock_id, _ = getattr(instance, "_loaded_stock_month", (None, None))
+    SARankMatrix.objects.filter(sa_stock_id__in={instance.sa_stock_id, loaded_sa_stock_id} - {None}).delete()
@@ -0,0 +1,58 @@
+"""
+Dates of the Seeking Alpha ratings, kept off the DISTINCT scans of SARating.
+
+rating_months() lists the months that have ratings. It's kept in memory and
+checked against MAX(SARating.id), a single index lookup, so an import done by
+another process (the cron) shows up on the next call without having to
+invalidate anything. Editing or deleting a rating doesn't change that id, so a
+rating saved or deleted one by one (admin) calls forget_rating_months(). That
+only resets the cache of the process doing it: after deleting ratings from
+another process (shell, a command), restart the site.
+
+SAStock.first_seen_date is the date of a stock's earliest rating. The importer
+keeps it up to date with update_first_seen_dates() for the stocks of each dump,
+and a rating saved or deleted one by one updates its stock's.
+"""
+from django.db.models import Max, Min, OuterRef, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.quant.models import SARating, SAStock
+
+_months = {"last_id": None, "months": []}
+
+
+def rating_months() -> list:
+    """Every month with ratings, oldest first."""
+    last_id = SARating.objects.aggregate(last_id=Max("pk"))["last_id"]
+    if last_id != _months["last_id"]:
+        _months["months"] = list(SARating.objects.order_by("date").values_list("date", flat=True).distinct())
+        _months["last_id"] = last_id
+    return _months["months"]
+
+
+def forget_rating_months():
+    _months["last_id"] = None
+
+
+def first_seen_subquery():
+    """Earliest rating date of the stock of the outer query."""
+    first_dates = SARating.objects.filter(sa_stock=OuterRef("pk")).order_by().values("sa_stock") \
+        .annotate(first_date=Min("date")).values("first_date")
+    return Subquery(first_dates)
+
+
+def update_first_seen_dates(sa_stock_ids=None):
+    """Sets first_seen_date of these stocks (all of them if None) in one UPDATE."""
+    sa_stocks = SAStock.objects.all()
+    if sa_stock_ids is not None:
+        sa_stocks = sa_stocks.filter(pk__in=sa_stock_ids)
+    sa_stocks.update(first_seen_date=first_seen_subquery())
+
+
+# Connected at startup (QuantConfig.ready). Bulk imports don't send it and update the dates themselves
+@receiver([post_save, post_delete], sender=SARating)
+def rating_changed(sender, instance, **kwargs):
+    forget_rating_months()
+    loaded_sa_stock_id, _ = getattr(instance, "_loaded_stock_month", (None, None))
+    update_first_seen_dates({instance.sa_stock_id, loaded_sa_stock_id} - {None})
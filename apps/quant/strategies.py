@@ -0,0 +1,250 @@
+"""
+Seeking Alpha scoring strategies, shared by the compile_sa_score* commands
+(production) and the backtest_scores research command, so each score is
+written once and whatever is measured in the backtest is what runs in prod.
+
+A strategy scores one rating type as of a month: scores(ratings, as_of) gets
+the ratings of the `window` months up to as_of (every month if window is None)
+and returns {sa_stock_id: score}. select() keeps the best n. Ratings are
+anything with sa_stock_id, date and rank (Rating tuples from load_ratings(),
+or SARating rows).
+
+score_months() scores many months in one go from the ratings grouped per month
+(the backtest's in-memory ratings). By default it scores each month's window
+separately; a strategy whose score carries from one month to the next (the
+all-time sum) overrides it to do a single pass.
+
+Strategies are frozen dataclasses, so two with the same parameters are equal
+and callers can memoize on them. The built-in ones are registered below. Other
+ones are added by listing them in settings.QUANT_STRATEGIES: dotted paths of
+Strategy classes, or of modules that decorate their classes with @register.
+"""
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
+from dataclasses import dataclass
+from datetime import date
+from importlib import import_module
+from inspect import isabstract
+
+from django.conf import settings
+from django.db.models import Count, F, Sum
+from django.utils.module_loading import import_string
+
+from apps.quant.models import SARating
+from apps.quant.scoring import get_distance_in_months, rewind_months
+
+Rating = namedtuple("Rating", ["sa_stock_id", "date", "rank"])
+
+# key -> Strategy class
+STRATEGIES = {}
+
+
+# Class decorator. An incomplete strategy (scores() not implemented) is refused here, when its module
+# is imported, instead of failing in the middle of a backtest
+def register(cls):
+    if isabstract(cls):
+        raise TypeError(f"Strategy {cls.__name__} doesn't implement {', '.join(sorted(cls.__abstractmethods__))}")
+    STRATEGIES[cls.key] = cls
+    return cls
+
+
+# Imports the strategies listed in settings.QUANT_STRATEGIES, once
+def load_settings_strategies():
+    if load_settings_strategies.done:
+        return
+    for path in getattr(settings, "QUANT_STRATEGIES", []):
+        try:
+            import_module(path)  # a module registering its strategies itself
+        except ImportError as e:
+            # Not a module, so the path of a class. An import failing inside the module is raised
+            if e.name != path:
+                raise
+            register(import_string(path))
+    load_settings_strategies.done = True
+
+
+load_settings_strategies.done = False
+
+
+def get_strategy(key, **params):
+    load_settings_strategies()
+    return STRATEGIES[key](**params)
+
+
+# Best n stock ids by score; ties go to the lowest id so results are repeatable
+def top_n(scores, n):
+    return sorted(scores, key=lambda k: (-scores[k], k))[:n]
+
+
+# Ratings of one type from `earliest` (all of them if not passed), as Rating tuples
+def load_ratings(rating_type, earliest: date = None) -> list[Rating]:
+    ratings = SARating.objects.filter(type=rating_type)
+    if earliest:
+        ratings = ratings.filter(date__gte=earliest)
+    return [Rating(*row) for row in ratings.values_list("sa_stock_id", "date", "rank")]
+
+
+# AllTimeScore over the whole history of one type, summed by the database instead of loading every
+# rating: (sa_stock_id, score, number of months ranked) rows
+def all_time_scores(rating_type):
+    return (SARating.objects.filter(type=rating_type).order_by().values("sa_stock_id")
+            .annotate(score=Sum(101 - F("rank")), count=Count("pk"))
+            .values_list("sa_stock_id", "score", "count"))
+
+
+@dataclass(frozen=True)
+class Strategy(ABC):
+    key = None
+    label = ""
+    # Months of history read up to as_of, as_of included (None = all of it)
+    window = None
+
+    @abstractmethod
+    def scores(self, ratings, as_of: date) -> dict:
+        """{sa_stock_id: score} of the ratings as of that month"""
+
+    def select(self, ratings, as_of: date, n: int) -> list:
+        return top_n(self.scores(ratings, as_of), n)
+
+    # First month of the ratings scores() needs for as_of
+    def earliest(self, as_of: date) -> date:
+        return date(1900, 1, 1) if self.window is None else rewind_months(as_of, self.window - 1)
+
+    def score_months(self, as_of_months, months, ratings_by_month) -> list[dict]:
+        """Scores as of each of `as_of_months`. months = sorted month dates, ratings_by_month = each one's
+        ratings (same index)."""
+        results = []
+        for as_of in as_of_months:
+            window = ratings_by_month[bisect_left(months, self.earliest(as_of)):bisect_right(months, as_of)]
+            results.append(self.scores([r for month_ratings in window for r in month_ratings], as_of))
+        return results
+
+
+@register
+@dataclass(frozen=True)
+class AllTimeScore(Strategy):
+    """Cumulative sum(101 - rank) over every month a stock was ranked, no decay."""
+    key = "alltime"
+    label = "All-time score"
+
+    def scores(self, ratings, as_of=None):
+        scores = defaultdict(float)
+        for r in ratings:
+            scores[r.sa_stock_id] += (101 - r.rank)
+        return scores
+
+    def score_months(self, as_of_months, months, ratings_by_month):
+        # Running totals: each month only adds its own ratings instead of summing the whole history again
+        totals = defaultdict(float)
+        results = []
+        index = 0
+        for as_of in as_of_months:
+            while index < len(months) and months[index] <= as_of:
+                for r in ratings_by_month[index]:
+                    totals[r.sa_stock_id] += (101 - r.rank)
+                index += 1
+            results.append(self._only_current(dict(totals), months, ratings_by_month, as_of))
+        return results
+
+    # Hook for the gated variant
+    def _only_current(self, scores, months, ratings_by_month, as_of):
+        return scores
+
+
+@register
+@dataclass(frozen=True)
+class GatedAllTimeScore(AllTimeScore):
+    """All-time score, but only for the stocks still ranked on the as_of month."""
+    key = "alltime_gated"
+    label = "All-time score, gated to currently-ranked"
+
+    def scores(self, ratings, as_of=None):
+        scores = super().scores(ratings, as_of)
+        current_ids = {r.sa_stock_id for r in ratings if r.date == as_of}
+        return {i: s for i, s in scores.items() if i in current_ids}
+
+    def _only_current(self, scores, months, ratings_by_month, as_of):
+        index = bisect_left(months, as_of)
+        current_ids = set()
+        if index < len(months) and months[index] == as_of:
+            current_ids = {r.sa_stock_id for r in ratings_by_month[index]}
+        return {i: s for i, s in scores.items() if i in current_ids}
+
+
+@register
+@dataclass(frozen=True)
+class CurrentRankScore(Strategy):
+    """This month's rank only (lower rank = higher score)."""
+    key = "current"
+    label = "Current rank"
+    window = 1
+
+    def scores(self, ratings, as_of):
+        return {r.sa_stock_id: -r.rank for r in ratings if r.date == as_of}
+
+
+@register
+@dataclass(frozen=True)
+class DecayedScore(Strategy):
+    """sum((101 - rank) * factors[i]) over the last len(factors) months, i = months back from as_of."""
+    key = "decay_curve"
+    label = "Decayed score"
+    factors: tuple = (1.0, 0.5, 0.25)
+
+    # Production curve: weight for month i back = base ** i. base 0.5 over 3 months => [1.0, 0.5, 0.25]
+    @classmethod
+    def exponential(cls, base, months):
+        return cls(tuple(base ** i for i in range(months)))
+
+    # Old linear curve: 3 months => [1.0, 0.667, 0.333]
+    @classmethod
+    def linear(cls, months):
+        return cls(tuple(1.0 - (i / months) for i in range(months)))
+
+    @property
+    def window(self):
+        return len(self.factors)
+
+    def scores(self, ratings, as_of):
+        scores = defaultdict(float)
+        for r in ratings:
+            scores[r.sa_stock_id] += int((101 - r.rank) * self.factors[get_distance_in_months(r.date, as_of)])
+        return scores
+
+
+@register
+@dataclass(frozen=True)
+class MomentumScore(Strategy):
+    """"Rising stars": base + weight * momentum over the last `months` months.
+    base = position-decayed average of (101 - rank), recent months counting more.
+    momentum = decayed average of the month-over-month rank improvements, recent ones counting more.
+    A month the stock wasn't ranked counts as 0, which is what "not in the top 100" should produce."""
+    key = "momentum"
+    label = "Momentum score"
+    months: int = 5
+    weight: float = 2.0
+
+    @property
+    def window(self):
+        return self.months
+
+    def scores(self, ratings, as_of):
+        # window=5 => position decay [1.0, 0.8, 0.6, 0.4, 0.2], slope decay [1.0, 0.75, 0.5, 0.25]
+        pos_decay = [(self.months - i) / self.months for i in range(self.months)]
+        pos_sum = sum(pos_decay)
+        slope_decay = [(self.months - 1 - i) / (self.months - 1) for i in range(self.months - 1)]
+        slope_sum = sum(slope_decay)
+
+        # Per stock: (101 - rank) indexed by months back from as_of (index 0 = newest)
+        values = {}
+        for r in ratings:
+            values.setdefault(r.sa_stock_id, [0] * self.months)[get_distance_in_months(r.date, as_of)] = max(0, 101 - r.rank)
+
+        scores = {}
+        for sid, vals in values.items():
+            base = sum(v * w for v, w in zip(vals, pos_decay)) / pos_sum
+            slopes = [vals[i] - vals[i + 1] for i in range(self.months - 1)]
+            momentum = sum(s * w for s, w in zip(slopes, slope_decay)) / slope_sum
+            scores[sid] = base + self.weight * momentum
+        return scores
@@ -0,0 +1,287 @@
+"""
+Synthetic Seeking Alpha data, for measuring the quant pipeline on a dataset of
+any size (the real dumps in data_dumps/seeking_alpha are only a few hundred
+stocks over a few years).
+
+A dataset is a list of companies, each with a CIK (a few have none, like some
+foreign listings) and a ticker, which some of them change once along the way.
+Every month, each rating type ranks the companies by a drifting "quality" per
+company and type, so stocks stay in the rankings for a while and climb or fall
+like real ones instead of being reshuffled every month. Prices are a daily
+random walk per company. Everything comes from `seed`, so the same arguments
+always give the same dataset, whichever way it's written:
+
+- create_dataset() writes it to the database: SAStocks (current ticker, CIK in
+  external_id), SARatings, and a linked watcher Stock with daily Prices each,
+  inserted like fetch_prices does (prices_inserted signal) so the compact price
+  store and the monthly prices are built too.
+- write_dumps() writes it as monthly dump CSVs in the format import_sa_ratings
+  reads, ticker changes included, plus a _prices.csv (skipped by the importer).
+"""
+import csv
+import os
+import random
+from collections import namedtuple
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+
+from apps.quant.models import SARating, SAStock
+from apps.quant.rating_dates import update_first_seen_dates
+from apps.quant.symbols.dumps import write_dump
+from apps.watcher.models import Price, Stock
+from apps.watcher.signals import prices_inserted
+from utils.quant import Columns
+
+# Letter grades of the valuation/growth/profitability/momentum columns
+GRADES = ["A+", "A", "A-", "B+", "B", "B-", "C+", "C", "C-", "D+", "D", "D-", "F"]
+
+# Share of the companies without a CIK, and of those changing ticker once
+WITHOUT_CIK = 0.05
+TICKER_CHANGES = 0.02
+
+DUMP_COLUMNS = [
+    Columns.DATE, Columns.TYPE, Columns.RANK, Columns.SEEKINGALPHA_SYMBOL, Columns.COMPANY_NAME, Columns.QUANT,
+    Columns.RATING_SEEKING_ALPHA, Columns.RATING_WALL_STREET, Columns.MARKET_CAP_MILLIONS, Columns.DIVIDEND_YIELD,
+    Columns.VALUATION, Columns.GROWTH, Columns.PROFITABILITY, Columns.MOMENTUM, Columns.EPS_REVISION, Columns.CIK,
+]
+PRICES_FILE = "_prices.csv"
+MARKET_CAP_SUFFIXES = [("T", 1_000_000), ("B", 1000), ("M", 1)]
+
+# names/symbols = [(first month, value)], oldest first: more than one entry after a ticker change
+Company = namedtuple("Company", ["cik", "names", "symbols"])
+# One rating of a company, with the plain values of the dump columns
+Rating = namedtuple("Rating", [
+    "date", "type", "rank", "company", "quant", "rating_seeking_alpha", "rating_wall_street",
+    "market_cap_millions", "dividend_yield", "valuation", "growth", "profitability", "momentum", "eps_revision",
+])
+
+
+# `count` months ending with `end` (first day of each month), oldest first
+def month_range(end: date, count: int) -> list[date]:
+    months = []
+    year, month = end.year, end.month
+    for _ in range(count):
+        months.append(date(year, month, 1))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return months[::-1]
+
+
+# Value of a company's names/symbols history on a month
+def value_on(history, month: date):
+    return [value for first_month, value in history if first_month <= month][-1]
+
+
+def _trading_days(first: date, last: date):
+    day = first
+    while day <= last:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+
+# Market caps as precise as a dump shows them (two decimals of M/B/T), so both outputs hold the same value
+def _round_market_cap(millions: float) -> float:
+    size = next(size for _, size in MARKET_CAP_SUFFIXES if millions >= size)
+    return float(f"{millions / size:.2f}") * size
+
+
+def _grade(quality: float) -> str:
+    return GRADES[min(len(GRADES) - 1, max(0, int(6 - quality * 3)))]
+
+
+def make_companies(count: int, months: list[date], seed: int = 0, ticker_changes=TICKER_CHANGES) -> list[Company]:
+    rng = random.Random(f"{seed}-companies")
+    ciks = rng.sample(range(1_000_000, 2_000_000), count)
+    companies = []
+    for index, cik in enumerate(ciks):
+        names = [(months[0], f"Synthetic {index} Inc.")]
+        symbols = [(months[0], f"SYN{index:05d}")]
+        if len(months) > 1 and rng.random() < ticker_changes:
+            changed = rng.choice(months[1:])
+            names.append((changed, f"Synthetic {index} Holdings Inc."))
+            # Not a share-class variant of the old ticker, so the importer follows it as a rename
+            symbols.append((changed, f"SYR{index:05d}"))
+        companies.append(Company("" if rng.random() < WITHOUT_CIK else str(cik), names, symbols))
+    return companies
+
+
+def make_ratings(companies: list[Company], months: list[date], ranks: int = 100, types=None, skip_months=(),
+                 seed: int = 0):
+    """Yields the Ratings of every month of `months` but the `skip_months` (months a real dump is
+    missing), type after type (every type if not passed), `ranks` deep."""
+    rng = random.Random(f"{seed}-ratings")
+    ranks = min(ranks, len(companies))
+    for rating_type in types or list(SARating.TYPES):
+        quality = [rng.gauss(0, 1) for _ in companies]
+        for month in months:
+            quality = [q * 0.95 + rng.gauss(0, 0.3) for q in quality]
+            if month in skip_months:
+                continue
+            ranked = sorted(range(len(companies)), key=lambda i: -quality[i])[:ranks]
+            for rank, index in enumerate(ranked, 1):
+                q = quality[index]
+                yield Rating(
+                    date=month,
+                    type=rating_type,
+                    rank=rank,
+                    company=companies[index],
+                    quant=min(4.99, max(3.5, 4.5 + q / 4)),
+                    rating_seeking_alpha=min(5.0, max(1.0, 3.5 + q / 2)),
+                    rating_wall_street=min(5.0, max(1.0, 3.5 + rng.gauss(0, 0.5))),
+                    market_cap_millions=_round_market_cap(10 ** rng.uniform(2, 6)),
+                    # About a third of the stocks pay no dividend
+                    dividend_yield=max(0.0, rng.gauss(1.5, 1.5)) or None,
+                    valuation=_grade(rng.gauss(0, 1)),
+                    growth=_grade(q),
+                    profitability=_grade(q + rng.gauss(0, 1)),
+                    momentum=_grade(q + rng.gauss(0, 1)),
+                    eps_revision=_grade(rng.gauss(0, 1)),
+                )
+
+
+def make_prices(months: list[date], rng: random.Random) -> list[tuple]:
+    """One company's (date, open, high, low, close, volume) for every trading day from the first
+    month to the end of the last one."""
+    last = months[-1]
+    next_month = date(last.year + last.month // 12, last.month % 12 + 1, 1)
+    close = rng.uniform(10, 200)
+    drift = rng.gauss(0.0004, 0.0005)
+    prices = []
+    for day in _trading_days(months[0], next_month - timedelta(days=1)):
+        open_ = close
+        close = min(9999.0, max(1.0, close * (1 + drift + rng.gauss(0, 0.02))))
+        high = max(open_, close) * (1 + abs(rng.gauss(0, 0.005)))
+        low = min(open_, close) * (1 - abs(rng.gauss(0, 0.005)))
+        prices.append((day, round(open_, 2), round(high, 2), round(low, 2), round(close, 2),
+                       rng.randint(10_000, 5_000_000)))
+    return prices
+
+
+def create_dataset(stocks: int, months: list[date], ranks: int = 100, types=None, skip_months=(),
+                   with_prices=True, seed: int = 0, ticker_changes=TICKER_CHANGES, write=print):
+    """Writes the dataset to the database the way import_sa_ratings leaves it: a company that changed
+    ticker has its whole history under its latest ticker, unless it has no CIK to follow the rename
+    (then its old ticker stays a separate stock). Returns the created SAStocks."""
+    companies = make_companies(stocks, months, seed, ticker_changes)
+
+    # Ticker a company's rating or price of that day is stored under
+    def stored_symbol(company, day):
+        return value_on(company.symbols, day) if not company.cik else company.symbols[-1][1]
+
+    # ticker -> SAStock
+    sa_stock_of = {}
+    for company in companies:
+        for (first_month, symbol), (_, name) in zip(company.symbols, company.names):
+            if stored_symbol(company, first_month) == symbol:
+                sa_stock_of[symbol] = SAStock(symbol=symbol, name=name, external_id=company.cik)
+    sa_stocks = SAStock.objects.bulk_create(sa_stock_of.values())
+
+    count = 0
+    batch = []
+    for rating in make_ratings(companies, months, ranks, types, skip_months, seed):
+        batch.append(SARating(
+            sa_stock=sa_stock_of[stored_symbol(rating.company, rating.date)],
+            date=rating.date,
+            type=rating.type,
+            rank=rating.rank,
+            quant=Decimal(f"{rating.quant:.2f}"),
+            rating_seeking_alpha=Decimal(f"{rating.rating_seeking_alpha:.2f}"),
+            rating_wall_street=Decimal(f"{rating.rating_wall_street:.2f}"),
+            market_cap_millions=rating.market_cap_millions,
+            dividend_yield=None if rating.dividend_yield is None else Decimal(f"{rating.dividend_yield:.2f}"),
+            valuation=rating.valuation,
+            growth=rating.growth,
+            profitability=rating.profitability,
+            momentum=rating.momentum,
+            eps_revision=rating.eps_revision,
+        ))
+        if len(batch) == 5000:
+            SARating.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    SARating.objects.bulk_create(batch)
+    count += len(batch)
+    update_first_seen_dates([sa_stock.pk for sa_stock in sa_stocks])
+    write(f"{len(sa_stocks)} SA stocks, {count} ratings")
+
+    if with_prices:
+        rng = random.Random(f"{seed}-prices")
+        for company in companies:
+            rows_by_symbol = {}
+            for row in make_prices(months, rng):
+                rows_by_symbol.setdefault(stored_symbol(company, row[0]), []).append(row)
+            for symbol, rows in rows_by_symbol.items():
+                _create_prices(sa_stock_of[symbol], rows)
+        write(f"{len(sa_stocks)} stocks with daily prices")
+    return sa_stocks
+
+
+# A watched Stock linked to the SAStock, with its daily prices
+def _create_prices(sa_stock: SAStock, rows: list[tuple]):
+    with transaction.atomic():
+        stock = Stock.objects.create(name=sa_stock.name, symbol=sa_stock.symbol)
+        sa_stock.stock = stock
+        sa_stock.save(update_fields=["stock"])
+        prices = [
+            Price(stock=stock, date=day, open=Decimal(f"{open_:.2f}"), high=Decimal(f"{high:.2f}"),
+                  low=Decimal(f"{low:.2f}"), close=Decimal(f"{close:.2f}"), volume=volume)
+            for day, open_, high, low, close, volume in rows
+        ]
+        Price.objects.bulk_create(prices)
+    prices_inserted.send(sender=Price, stock=stock, prices=prices)
+
+
+def _market_cap(millions: float) -> str:
+    for suffix, size in MARKET_CAP_SUFFIXES:
+        if millions >= size:
+            return f"{millions / size:.2f}{suffix}"
+
+
+def write_dumps(folder, stocks: int, months: list[date], ranks: int = 100, types=None, skip_months=(),
+                with_prices=True, seed: int = 0, ticker_changes=TICKER_CHANGES, write=print) -> list[str]:
+    """Writes the dataset as one YYYY-MM-DD.csv dump per month into `folder`, each row under the ticker
+    the company had that month, and the daily prices of every ticker into folder/_prices.csv.
+    Returns the dump paths."""
+    os.makedirs(folder, exist_ok=True)
+    companies = make_companies(stocks, months, seed, ticker_changes)
+
+    rows_by_month = {}
+    for rating in make_ratings(companies, months, ranks, types, skip_months, seed):
+        rows_by_month.setdefault(rating.date, []).append({
+            Columns.DATE: rating.date.isoformat(),
+            Columns.TYPE: rating.type,
+            Columns.RANK: rating.rank,
+            Columns.SEEKINGALPHA_SYMBOL: value_on(rating.company.symbols, rating.date),
+            Columns.COMPANY_NAME: value_on(rating.company.names, rating.date),
+            Columns.QUANT: f"{rating.quant:.2f}",
+            Columns.RATING_SEEKING_ALPHA: f"{rating.rating_seeking_alpha:.2f}",
+            Columns.RATING_WALL_STREET: f"{rating.rating_wall_street:.2f}",
+            Columns.MARKET_CAP_MILLIONS: _market_cap(rating.market_cap_millions),
+            Columns.DIVIDEND_YIELD: "-" if rating.dividend_yield is None else f"{rating.dividend_yield:.2f}%",
+            Columns.VALUATION: rating.valuation,
+            Columns.GROWTH: rating.growth,
+            Columns.PROFITABILITY: rating.profitability,
+            Columns.MOMENTUM: rating.momentum,
+            Columns.EPS_REVISION: rating.eps_revision,
+            Columns.CIK: rating.company.cik,
+        })
+    paths = []
+    for month, rows in rows_by_month.items():
+        path = os.path.join(folder, f"{month.isoformat()}.csv")
+        write_dump(path, DUMP_COLUMNS, rows)
+        paths.append(path)
+    write(f"{len(paths)} monthly dumps, {sum(len(rows) for rows in rows_by_month.values())} ratings")
+
+    if with_prices:
+        rng = random.Random(f"{seed}-prices")
+        with open(os.path.join(folder, PRICES_FILE), "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file, lineterminator="\n")
+            writer.writerow(["Symbol", "Date", "Open", "High", "Low", "Close", "Volume"])
+            for company in companies:
+                for day, open_, high, low, close, volume in make_prices(months, rng):
+                    writer.writerow([value_on(company.symbols, day), day.isoformat(),
+                                     f"{open_:.2f}", f"{high:.2f}", f"{low:.2f}", f"{close:.2f}", volume])
+        write(f"{len(companies)} stocks' daily prices in {PRICES_FILE}")
+    return paths
@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from apps.quant import month_snapshots, rank_matrix
+from apps.quant.models import CompiledSAScore, SAMonthSnapshot, SARankMatrix, SARating, SAStock
+from apps.quant.rating_dates import rating_months
+from apps.quant.strategies import (AllTimeScore, Rating, STRATEGIES, Strategy, all_time_scores, get_strategy,
+                                   register, top_n)
+
+TYPES = list(SARating.TYPES)
+JANUARY, FEBRUARY, MARCH = date(2024, 1, 1), date(2024, 2, 1), date(2024, 3, 1)
+
+
+def create_rating(sa_stock, month, rank, rating_type=TYPES[0], quant=Decimal("4.50")):
+    return SARating.objects.create(sa_stock=sa_stock, date=month, type=rating_type, rank=rank, quant=quant,
+                                   valuation="A", growth="B", profitability="A", momentum="C")
+
+
+class RankMatrixTests(TestCase):
+    def test_pack_unpack_round_trip(self):
+        months = [JANUARY, FEBRUARY]
+        cells = {(JANUARY, TYPES[0]): (1, Decimal("4.99")), (FEBRUARY, TYPES[1]): (300, None)}
+
+        matrix = rank_matrix.unpack(rank_matrix.pack(months, TYPES, cells), TYPES)
+
+        self.assertEqual(matrix.months, months)
+        self.assertEqual(len(matrix.ranks), len(months) * len(TYPES))
+        self.assertEqual(matrix.ranks[0], 1)
+        self.assertEqual(rank_matrix.quant_value(matrix.quants[0]), Decimal("4.99"))
+        self.assertEqual(matrix.ranks[1], rank_matrix.NOT_RANKED)
+        # Ranks above 255 fit
+        self.assertEqual(matrix.ranks[len(TYPES) + 1], 300)
+        self.assertIsNone(rank_matrix.quant_value(matrix.quants[len(TYPES) + 1]))
+
+    def test_rating_edit_drops_matrix(self):
+        sa_stock = SAStock.objects.create(symbol="AAA", name="A")
+        create_rating(sa_stock, JANUARY, 46)
+        self.assertEqual(rank_matrix.load(sa_stock.pk).ranks[0], 46)
+
+        rating = SARating.objects.get()
+        rating.rank += 7
+        rating.save()
+
+        self.assertFalse(SARankMatrix.objects.exists())
+        self.assertEqual(rank_matrix.load(sa_stock.pk).ranks[0], 53)
+
+    def test_old_format_rebuilt(self):
+        sa_stock = SAStock.objects.create(symbol="AAA", name="A")
+        create_rating(sa_stock, JANUARY, 12)
+        rank_matrix.load(sa_stock.pk)
+        SARankMatrix.objects.update(version=1, data=b"")
+
+        self.assertEqual(rank_matrix.load(sa_stock.pk).ranks[0], 12)
+        self.assertEqual(SARankMatrix.objects.get().version, rank_matrix.FORMAT_VERSION)
+
+
+class MonthSnapshotTests(TestCase):
+    def setUp(self):
+        self.sa_stock = SAStock.objects.create(symbol="AAA", name="A")
+        create_rating(self.sa_stock, JANUARY, 5)
+        create_rating(self.sa_stock, FEBRUARY, 7)
+        CompiledSAScore.objects.create(sa_stock=self.sa_stock, type=TYPES[0], score=190, count=2,
+                                       latest_sa_ratings_date=FEBRUARY)
+
+    def test_load(self):
+        data = month_snapshots.load(JANUARY)
+
+        self.assertEqual(data["types"], TYPES)
+        [(symbol, name, ranks, counts)] = data["rows"]
+        self.assertEqual((symbol, name, ranks[0], counts[0]), ("AAA", "A", 5, 2))
+        self.assertEqual(ranks[1:], [0] * (len(TYPES) - 1))
+
+    def test_month_without_ratings(self):
+        self.assertIsNone(month_snapshots.load(MARCH))
+        self.assertFalse(SAMonthSnapshot.objects.filter(date=MARCH).exists())
+
+    def test_rename_drops_snapshots(self):
+        month_snapshots.rebuild()
+        self.sa_stock.symbol = "BBB"
+        self.sa_stock.save()
+
+        self.assertFalse(SAMonthSnapshot.objects.exists())
+        self.assertEqual(month_snapshots.load(FEBRUARY)["rows"][0][0], "BBB")
+
+    def test_moved_rating_drops_both_months(self):
+        month_snapshots.rebuild()
+        rating = SARating.objects.get(date=JANUARY)
+        rating.date = MARCH
+        rating.save()
+
+        self.assertEqual(list(SAMonthSnapshot.objects.values_list("date", flat=True)), [FEBRUARY])
+        self.assertIsNone(month_snapshots.load(JANUARY))
+        self.assertEqual(month_snapshots.load(MARCH)["rows"][0][2][0], 5)
+
+
+class RatingDatesTests(TestCase):
+    def test_rating_months_follow_edits(self):
+        sa_stock = SAStock.objects.create(symbol="AAA", name="A")
+        create_rating(sa_stock, JANUARY, 1)
+        create_rating(sa_stock, FEBRUARY, 1)
+        self.assertEqual(rating_months(), [JANUARY, FEBRUARY])
+
+        # Not the newest rating, so MAX(id) doesn't change
+        rating = SARating.objects.get(date=JANUARY)
+        rating.date = MARCH
+        rating.save()
+
+        self.assertEqual(rating_months(), [FEBRUARY, MARCH])
+        self.assertEqual(SAStock.objects.get().first_seen_date, FEBRUARY)
+
+
+class StrategyTests(TestCase):
+    def test_all_time_scores_match_strategy(self):
+        first, second = SAStock.objects.create(symbol="AAA", name="A"), SAStock.objects.create(symbol="BBB", name="B")
+        create_rating(first, JANUARY, 1)
+        create_rating(first, FEBRUARY, 10)
+        create_rating(second, FEBRUARY, 2)
+
+        scores = AllTimeScore().scores([Rating(rating.sa_stock_id, rating.date, rating.rank)
+                                        for rating in SARating.objects.all()])
+
+        self.assertEqual(dict(scores), {first.pk: 191, second.pk: 99})
+        self.assertEqual({sa_stock_id: (score, count) for sa_stock_id, score, count in all_time_scores(TYPES[0])},
+                         {first.pk: (191, 2), second.pk: (99, 1)})
+
+    def test_top_n_ties_go_to_lowest_id(self):
+        self.assertEqual(top_n({3: 10, 1: 10, 2: 5}, 2), [1, 3])
+
+    def test_registry(self):
+        self.assertEqual(get_strategy("alltime"), AllTimeScore())
+        with self.assertRaises(TypeError):
+            Strategy()
+
+    def test_incomplete_strategy_refused(self):
+        with self.assertRaises(TypeError):
+            @register
+            @dataclass(frozen=True)
+            class Incomplete(Strategy):
+                key = "incomplete"
+
+        self.assertNotIn("incomplete", STRATEGIES)
@@ -1,14 +1,14 @@
 # Drill-down views showing raw SA ranks for a single slice: one month across
 # all stocks, or one stock across all months. The compiled-score grids live in
 # score.py.
-import copy
 from datetime import date as date_cls
 
-from django.db.models import Max
 from django.http import Http404, HttpResponse
 from django.template import loader
 
-from apps.quant.models import SAStock, SARating, CompiledSAScore
+from apps.quant.models import SAStock, SARating
+from apps.quant import month_snapshots, rank_matrix
+from apps.quant.rating_dates import rating_months
 from apps.quant.views.shared import carry_context
 
 
@@ -27,32 +27,37 @@ def stock(request, symbol: str):
     except SAStock.DoesNotExist:
         raise Http404(f"Unknown stock symbol: {symbol}")
 
-    # Default cell shape per category (rank blank if the stock wasn't ranked).
-    default_types = {slug: {"rank": "", "quant": None} for slug in SARating.TYPES}
+    matrix = rank_matrix.load(sa_stock.pk)
+    width = len(matrix.types)
 
-    # Group the stock's ratings into one row per month. Dict insertion order
-    # follows the query order, so rows come out newest first.
+    # One row per month, newest first, one cell per category (rank blank if the stock wasn't ranked)
     months = {}
-    for rating in SARating.objects.filter(sa_stock=sa_stock).order_by("-date"):
-        if rating.date not in months:
-            months[rating.date] = copy.deepcopy(default_types)
-        months[rating.date][rating.type] = {"rank": rating.rank, "quant": rating.quant}
+    for row in reversed(range(len(matrix.months))):
+        months[matrix.months[row]] = {
+            rating_type: {
+                "rank": matrix.ranks[row * width + column] or "",
+                "quant": rank_matrix.quant_value(matrix.quants[row * width + column]),
+            }
+            for column, rating_type in enumerate(matrix.types)
+        }
 
     # Chart data: one line per category the stock has ever been ranked in,
     # oldest month first. The X axis covers every month a dump exists (not just
     # months this stock appears in), so a stock that vanished for a year shows
     # a real hole in its lines instead of the line connecting across the absence.
-    chart_dates = list(
-        SARating.objects.values_list("date", flat=True).distinct().order_by("date")
-    )
+    chart_dates = rating_months()
+    position = {month: index for index, month in enumerate(chart_dates)}
     chart_series = []
-    for slug, type_name in SARating.TYPES.items():
-        ranks = [
-            (months[d][slug]["rank"] or None) if d in months else None
-            for d in chart_dates
-        ]
-        if any(ranks):
-            chart_series.append({"label": type_name, "data": ranks})
+    for column, rating_type in enumerate(matrix.types):
+        # The category's column of the matrix
+        column_ranks = matrix.ranks[column::width]
+        if not any(column_ranks):
+            continue
+        ranks = [None] * len(chart_dates)
+        for month, rank in zip(matrix.months, column_ranks):
+            if rank and month in position:
+                ranks[position[month]] = rank
+        chart_series.append({"label": SARating.TYPES[rating_type], "data": ranks})
 
     template = loader.get_template("stock_details.html")
     context = {
@@ -78,43 +83,25 @@ def month_view(request, date_str=None):
         except (ValueError, AttributeError):
             raise Http404(f"Bad month format (expected YYYY-MM): {date_str}")
     else:
-        chosen_date = SARating.objects.aggregate(Max("date"))["date__max"]
-        if not chosen_date:
+        if not rating_months():
             raise Http404("No SA ratings imported yet")
+        chosen_date = rating_months()[-1]
 
     # All distinct months for the top navigation, newest first.
-    available_dates = list(
-        SARating.objects.values_list("date", flat=True).distinct().order_by("-date")
-    )
-
-    # Ratings for the chosen month, with stock pulled in via JOIN (no N+1).
-    ratings = list(
-        SARating.objects.filter(date=chosen_date).select_related("sa_stock")
-    )
-
-    # Counts per (sa_stock_id, type) for stocks present in the chosen month,
-    # so each cell can show "rank (count-historical)".
-    stock_ids = {r.sa_stock_id for r in ratings}
-    counts = {
-        (c.sa_stock_id, c.type): c.count
-        for c in CompiledSAScore.objects.filter(sa_stock_id__in=stock_ids)
-    }
-
-    # Default cell shape per type (rank blank if the stock isn't in that type this month).
-    default_types = {slug: {"rank": "", "count": 0} for slug in SARating.TYPES}
+    available_dates = list(reversed(rating_months()))
 
+    # The month's ratings, pivoted at import/compile time (apps/quant/month_snapshots.py).
+    # Each cell shows "rank (count-historical)"; blank rank = not in that type this month.
+    snapshot = month_snapshots.load(chosen_date) or {"types": list(SARating.TYPES), "rows": []}
     quant_list = {}
-    for r in ratings:
-        sym = r.sa_stock.symbol
-        if sym not in quant_list:
-            quant_list[sym] = {
-                "name": r.sa_stock.name,
-                "types": copy.deepcopy(default_types),
-                "row_class": "",  # gating not meaningful in a per-month view
-            }
-        quant_list[sym]["types"][r.type] = {
-            "rank": r.rank,
-            "count": counts.get((r.sa_stock_id, r.type), 0),
+    for symbol, name, ranks, counts in snapshot["rows"]:
+        quant_list[symbol] = {
+            "name": name,
+            "types": {
+                rating_type: {"rank": rank or "", "count": count}
+                for rating_type, rank, count in zip(snapshot["types"], ranks, counts)
+            },
+            "row_class": "",  # gating not meaningful in a per-month view
         }
 
     template = loader.get_template("month_view.html")
@@ -9,6 +9,7 @@ from django.template import loader
 from apps.quant.models import (
     SARating, CompiledSAScore, CompiledSAScoreDecayed, CompiledSAScoreMomentum,
 )
+from apps.quant.rating_dates import rating_months
 from apps.quant.views.shared import carry_context
 
 SA_MODEL_BY_DISPLAY = {
@@ -77,9 +78,7 @@ def score_or_count(request, value_to_display="score"):
     # month's SA ratings. Applied to every view -- most useful on the all-time score (corpse risk)
     # and the count view, but informative on decayed/momentum too (gated rows naturally sink there).
     latest_stock_ids, prev_stock_ids = set(), set()
-    recent_dates = list(
-        SARating.objects.values_list("date", flat=True).distinct().order_by("-date")[:2]
-    )
+    recent_dates = rating_months()[-2:][::-1]
     if recent_dates:
         latest_stock_ids = set(
             SARating.objects.filter(date=recent_dates[0]).values_list("sa_stock_id", flat=True)
@@ -1,14 +1,19 @@
+import io
 import re
-from datetime import datetime
 
 from django import forms
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
 from django.db import models
+from django.shortcuts import redirect, render
 from django.template.loader import render_to_string
+from django.urls import path
 from django.utils.safestring import mark_safe
 
-from apps.transaction_adjuster.admin_filters import CustomFiltersGroup, TransactionYearFilter
-from apps.transaction_adjuster.models import StockTransaction, StockSplit
+from apps.transaction_adjuster.admin_filters import CustomFiltersGroup, OpenPositionFilter, TransactionYearFilter
+from apps.transaction_adjuster.forms import StockTransactionAdminForm, TransactionImportForm
+from apps.transaction_adjuster.importer import TransactionImportError, import_transactions
+from apps.transaction_adjuster.models import Position, StockTransaction, StockSplit, deferred_split_recalculation
 from utils.helpers import get_currency_symbol
 
 
@@ -28,102 +33,6 @@ def format_price(value: float):
     return f"{formatted_integer}.{decimal_part}"
 
 
-class FrenchAwareDateField(forms.DateField):
-    """
-    Date field that recognizes French date formats (DD/MM/YYYY or DD/MM/YY),
-    and falls back to Django's standard date parsing for other formats.
-    """
-
-    def to_python(self, value):
-        if value in self.empty_values:
-            return None
-
-        if not isinstance(value, str):
-            return super().to_python(value)
-
-        # Check for French date patterns
-        # Pattern 1: DD/MM/YYYY
-        pattern1 = r'^\d{2}/\d{2}/\d{4}$'
-        # Pattern 2: DD/MM/YY where MM <= 12
-        pattern2 = r'^\d{2}/\d{2}/\d{2}$'
-
-        #Remove all empty white spaces from value and renames it
-        value_without_spaces = value.replace(" ", "")
-
-        if re.match(pattern1, value_without_spaces):
-            # Handle DD/MM/YYYY
-            try:
-                day, month, year = value_without_spaces.split('/')
-                # Convert to Django date format (YYYY-MM-DD)
-                date_obj = datetime.strptime(f"{year}-{month}-{day}", "%Y-%m-%d").date()
-                return date_obj
-            except (ValueError, IndexError):
-                # If parsing fails, fall back to Django's parser
-                pass
-
-        elif re.match(pattern2, value_without_spaces):
-            # Handle DD/MM/YY (if MM <= 12)
-            try:
-                day, month, year = value_without_spaces.split('/')
-                if int(month) <= 12:  # Only treat as French date if month is valid
-                    # Assume 20xx for two-digit years
-                    full_year = f"20{year}"
-                    # Convert to Django date format
-                    date_obj = datetime.strptime(f"{full_year}-{month}-{day}", "%Y-%m-%d").date()
-                    return date_obj
-            except (ValueError, IndexError):
-                # If parsing fails, fall back to Django's parser
-                pass
-
-        # Fall back to Django's standard date parsing for all other cases
-        return super().to_python(value)
-
-
-class SmartDecimalField(forms.CharField):
-    def to_python(self, value):
-        if value in self.empty_values:
-            return None
-
-        # Handle input format based on presence of comma or period
-        if isinstance(value, str):
-            value = value.replace(' ', '')
-            # If there's a comma and no period, treat as French format
-            if ',' in value and '.' not in value:
-                value = value.replace(',', '.')
-
-        try:
-            return super().to_python(value)
-        except forms.ValidationError:
-            raise forms.ValidationError(
-                "Please enter a valid number. Use either '.' (English) or ',' (French) as decimal separator."
-            )
-
-
-class StockTransactionAdminForm(forms.ModelForm):
-    # Override date field with a custom field that supports French date formats
-    date = FrenchAwareDateField(
-        help_text="Accepts both standard dates and French formats (DD/MM/YYYY or DD/MM/YY)"
-    )
-
-    # Override decimal fields with a custom field that supports comma as decimal separator
-    price_per_share = SmartDecimalField(
-        required=False,
-        help_text="Use either '.' (English) or ',' (French) as decimal separator"
-    )
-    total_cost = SmartDecimalField(
-        required=False,
-        help_text="Use either '.' (English) or ',' (French) as decimal separator"
-    )
-
-    class Meta:
-        model = StockTransaction
-        fields = ["date", "symbol", "currency", "type", "quantity", "price_per_share", "total_cost", "notes"]
-        widgets = {
-            'currency': forms.RadioSelect(),
-            'type': forms.RadioSelect(),
-        }
-
-
 class StockTransactionAdmin(admin.ModelAdmin):
     def formatted_date(self, obj):
         return obj.date.strftime('%Y-%m-%d')
@@ -176,6 +85,48 @@ class StockTransactionAdmin(admin.ModelAdmin):
     notes_hint.admin_order_field = "notes"
     formatted_date.admin_order_field = 'date'
 
+    # Bulk delete action: each symbol's position is refreshed once, not once per deleted transaction
+    def delete_queryset(self, request, queryset):
+        with deferred_split_recalculation():
+            super().delete_queryset(request, queryset)
+
+    # "Import CSV" page, linked from the list's top right buttons
+    def get_urls(self):
+        return [
+            path("import/", self.admin_site.admin_view(self.import_view), name="transaction_adjuster_stocktransaction_import"),
+        ] + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        form = TransactionImportForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            dry_run = form.cleaned_data["dry_run"]
+            csv_file = io.TextIOWrapper(form.cleaned_data["csv_file"].file, encoding="utf-8-sig", newline="")
+            try:
+                imported = import_transactions(csv_file, dry_run=dry_run, write=lambda message: None)
+            except TransactionImportError as e:
+                # Enough lines to fix the file, without flooding the page
+                self.message_user(request, f"{e}: " + "; ".join(e.errors[:20]) + ("..." if len(e.errors) > 20 else ""),
+                                  messages.ERROR)
+            except UnicodeDecodeError:
+                self.message_user(request, "The file isn't UTF-8 text, export it as CSV UTF-8", messages.ERROR)
+            else:
+                if dry_run:
+                    self.message_user(request, f"{imported} valid transactions, nothing was imported")
+                else:
+                    self.message_user(request, f"{imported} transactions imported", messages.SUCCESS)
+                    return redirect("admin:transaction_adjuster_stocktransaction_changelist")
+
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Import transactions",
+            "opts": self.model._meta,
+            "form": form,
+        }
+        return render(request, "admin/transaction_adjuster/stocktransaction/import.html", context)
+
 
 class StockSplitAdmin(admin.ModelAdmin):
     def notes_hint(self, stock_split: StockSplit) -> str:
@@ -202,6 +153,53 @@ class StockSplitAdmin(admin.ModelAdmin):
     # Model fields to use for custom columns ordering
     notes_hint.admin_order_field = "notes"
 
+    # Bulk delete action: each symbol is recalculated once, not once per deleted split
+    def delete_queryset(self, request, queryset):
+        with deferred_split_recalculation():
+            super().delete_queryset(request, queryset)
+
+
+class PositionAdmin(admin.ModelAdmin):
+    def formatted_average_cost(self, obj):
+        return f"{format_price(obj.average_cost)} {get_currency_symbol(obj.currency)}" if obj.average_cost else "-"
+
+    def formatted_cost_basis(self, obj):
+        return f"{format_price(obj.cost_basis)} {get_currency_symbol(obj.currency)}"
+
+    def formatted_realized_pnl(self, obj):
+        return f"{format_price(obj.realized_pnl)} {get_currency_symbol(obj.currency)}"
+
+    # Columns to display
+    list_display = ["symbol", "currency", "quantity", "formatted_average_cost", "formatted_cost_basis",
+                    "formatted_realized_pnl", "transaction_count", "first_date", "last_date"]
+
+    # Fields to search for "All words" (Default search behavior)
+    search_fields = ["symbol"]
+
+    # Side filters
+    list_filter = [OpenPositionFilter, "currency"]
+
+    # Custom descriptions for columns
+    formatted_average_cost.short_description = "Average Cost"
+    formatted_cost_basis.short_description = "Cost Basis"
+    formatted_realized_pnl.short_description = "Realized P/L"
+
+    # Model fields to use for custom columns ordering
+    formatted_average_cost.admin_order_field = "average_cost"
+    formatted_cost_basis.admin_order_field = "cost_basis"
+    formatted_realized_pnl.admin_order_field = "realized_pnl"
+
+    # Maintained from the transactions, read only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 admin.site.register(StockTransaction, StockTransactionAdmin)
 admin.site.register(StockSplit, StockSplitAdmin)
+admin.site.register(Position, PositionAdmin)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from django.db.models import Count, Q
+from django.db.models import Exists, OuterRef
 
 from apps.transaction_adjuster.models import StockTransaction, StockSplit
 
@@ -16,21 +16,14 @@ class CustomFiltersGroup(admin.SimpleListFilter):
 
     def queryset(self, request, queryset):
         if self.value() == 'duplicates':
-            # Find transactions with the same symbol, date, and quantity
-            duplicates = StockTransaction.objects.values('symbol', 'date', 'quantity') \
-                .annotate(count=Count('id')) \
-                .filter(count__gt=1)
-
-            if duplicates:
-                q_objects = Q()
-                for duplicate in duplicates:
-                    q_objects |= Q(
-                        symbol=duplicate['symbol'],
-                        date=duplicate['date'],
-                        quantity=duplicate['quantity']
-                    )
-                return queryset.filter(q_objects)
-            return queryset.none()
+            # Transactions with another one of the same symbol, date, and quantity, as a correlated
+            # EXISTS on the (symbol, date, quantity) index instead of one OR'd condition per group
+            same_transaction = StockTransaction.objects.filter(
+                symbol=OuterRef('symbol'),
+                date=OuterRef('date'),
+                quantity=OuterRef('quantity'),
+            ).exclude(pk=OuterRef('pk'))
+            return queryset.filter(Exists(same_transaction))
         
         elif self.value() == 'no_splits':
             # Get all symbols that have splits
@@ -54,3 +47,21 @@ class TransactionYearFilter(admin.SimpleListFilter):
         if self.value():
             return queryset.filter(date__year=self.value())
         return queryset
+
+
+class OpenPositionFilter(admin.SimpleListFilter):
+    title = 'Position'
+    parameter_name = 'position'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('open', 'Open'),
+            ('closed', 'Closed'),
+        )
+
+    def queryset(self, request, queryset):
+        if self.value() == 'open':
+            return queryset.exclude(quantity=0)
+        elif self.value() == 'closed':
+            return queryset.filter(quantity=0)
+        return queryset
@@ -0,0 +1,110 @@
+import re
+from datetime import datetime
+
+from django import forms
+
+from apps.transaction_adjuster.models import StockTransaction
+
+
+class FrenchAwareDateField(forms.DateField):
+    """
+    Date field that recognizes French date formats (DD/MM/YYYY or DD/MM/YY),
+    and falls back to Django's standard date parsing for other formats.
+    """
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+
+        if not isinstance(value, str):
+            return super().to_python(value)
+
+        # Check for French date patterns
+        # Pattern 1: DD/MM/YYYY
+        pattern1 = r'^\d{2}/\d{2}/\d{4}$'
+        # Pattern 2: DD/MM/YY where MM <= 12
+        pattern2 = r'^\d{2}/\d{2}/\d{2}$'
+
+        #Remove all empty white spaces from value and renames it
+        value_without_spaces = value.replace(" ", "")
+
+        if re.match(pattern1, value_without_spaces):
+            # Handle DD/MM/YYYY
+            try:
+                day, month, year = value_without_spaces.split('/')
+                # Convert to Django date format (YYYY-MM-DD)
+                date_obj = datetime.strptime(f"{year}-{month}-{day}", "%Y-%m-%d").date()
+                return date_obj
+            except (ValueError, IndexError):
+                # If parsing fails, fall back to Django's parser
+                pass
+
+        elif re.match(pattern2, value_without_spaces):
+            # Handle DD/MM/YY (if MM <= 12)
+            try:
+                day, month, year = value_without_spaces.split('/')
+                if int(month) <= 12:  # Only treat as French date if month is valid
+                    # Assume 20xx for two-digit years
+                    full_year = f"20{year}"
+                    # Convert to Django date format
+                    date_obj = datetime.strptime(f"{full_year}-{month}-{day}", "%Y-%m-%d").date()
+                    return date_obj
+            except (ValueError, IndexError):
+                # If parsing fails, fall back to Django's parser
+                pass
+
+        # Fall back to Django's standard date parsing for all other cases
+        return super().to_python(value)
+
+
+class SmartDecimalField(forms.CharField):
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+
+        # Handle input format based on presence of comma or period
+        if isinstance(value, str):
+            value = value.replace(' ', '')
+            # If there's a comma and no period, treat as French format
+            if ',' in value and '.' not in value:
+                value = value.replace(',', '.')
+
+        try:
+            return super().to_python(value)
+        except forms.ValidationError:
+            raise forms.ValidationError(
+                "Please enter a valid number. Use either '.' (English) or ',' (French) as decimal separator."
+            )
+
+
+class StockTransactionAdminForm(forms.ModelForm):
+    # Override date field with a custom field that supports French date formats
+    date = FrenchAwareDateField(
+        help_text="Accepts both standard dates and French formats (DD/MM/YYYY or DD/MM/YY)"
+    )
+
+    # Override decimal fields with a custom field that supports comma as decimal separator
+    price_per_share = SmartDecimalField(
+        required=False,
+        help_text="Use either '.' (English) or ',' (French) as decimal separator"
+    )
+    total_cost = SmartDecimalField(
+        required=False,
+        help_text="Use either '.' (English) or ',' (French) as decimal separator"
+    )
+
+    class Meta:
+        model = StockTransaction
+        fields = ["date", "symbol", "currency", "type", "quantity", "price_per_share", "total_cost", "notes"]
+        widgets = {
+            'currency': forms.RadioSelect(),
+            'type': forms.RadioSelect(),
+        }
+
+
+class TransactionImportForm(forms.Form):
+    csv_file = forms.FileField(
+        label="CSV file",
+        help_text="Broker export with Date, Symbol, Type, Quantity and Price or Total columns (',' or ';' separated)"
+    )
+    dry_run = forms.BooleanField(required=False, help_text="Only validate the file, don't import anything")
@@ -0,0 +1,163 @@
+"""
+Bulk import of stock transactions from broker CSV exports, shared by the
+import_transactions command and the transactions admin upload.
+
+Each row goes through StockTransactionAdminForm, so dates and decimals are
+parsed exactly like in the admin (French DD/MM/YYYY dates, ',' decimals) and
+the missing price per share or total cost is filled the same way. The split
+adjustment isn't queried per row: every split is loaded once per symbol, and
+the rows are inserted with bulk_create, BATCH_SIZE at a time.
+
+The import is all or nothing: if any row is invalid, nothing is inserted and
+TransactionImportError lists every invalid line.
+"""
+import csv
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.db import transaction
+
+from apps.transaction_adjuster.forms import StockTransactionAdminForm
+from apps.transaction_adjuster.models import StockSplit, StockTransaction, refresh_positions, split_timeline
+from constants import CURRENCY_USD, TRANSACTION_BUY, TRANSACTION_SELL
+
+BATCH_SIZE = 1000
+
+# Form field -> column names seen in broker exports (compared case-insensitively)
+COLUMN_NAME_VARIANTS = {
+    "date": ["Date", "Transaction Date", "Trade Date", "Settlement Date", "Date de transaction", "Date de règlement"],
+    "symbol": ["Symbol", "Ticker", "Symbole"],
+    "type": ["Type", "Action", "Transaction Type", "Activity", "Opération"],
+    "quantity": ["Quantity", "Shares", "Qty", "Quantité"],
+    "price_per_share": ["Price Per Share", "Price", "Prix"],
+    "total_cost": ["Total Cost", "Total", "Amount", "Net Amount", "Montant"],
+    "currency": ["Currency", "Devise"],
+    "notes": ["Notes", "Description", "Memo"],
+}
+
+TYPE_VARIANTS = {
+    TRANSACTION_BUY: ["buy", "bought", "achat", "acheter"],
+    TRANSACTION_SELL: ["sell", "sold", "vente", "vendre"],
+}
+
+
+class TransactionImportError(Exception):
+    def __init__(self, errors: list[str]):
+        self.errors = errors
+        super().__init__(f"{len(errors)} invalid rows, nothing was imported")
+
+
+class _DryRun(Exception):
+    pass
+
+
+# {symbol: (split dates, splits)} of every split, see split_timeline()
+def load_split_factors() -> dict:
+    splits = defaultdict(list)
+    for symbol, split_date, split in StockSplit.objects.order_by("date").values_list("symbol", "date", "split"):
+        splits[symbol].append((split_date, split))
+    return {symbol: split_timeline(symbol_splits) for symbol, symbol_splits in splits.items()}
+
+
+def _header_mapping(fieldnames) -> dict:
+    """Form field -> CSV column, for the fields found in the header."""
+    columns = {name.strip().lower(): name for name in fieldnames if name}
+    mapping = {}
+    for field, variants in COLUMN_NAME_VARIANTS.items():
+        for variant in variants:
+            if variant.lower() in columns:
+                mapping[field] = columns[variant.lower()]
+                break
+    return mapping
+
+
+# Form data of one CSV row: the type words and the signed quantities brokers use are normalized
+def _form_data(row: dict, mapping: dict) -> dict:
+    data = {field: (row.get(column) or "").strip() for field, column in mapping.items()}
+
+    quantity = data.get("quantity", "").replace(" ", "")
+    if quantity.startswith("-"):
+        # Sold shares exported as a negative quantity
+        quantity = quantity[1:]
+        # Also when the type column is there but empty
+        if not data.get("type"):
+            data["type"] = TRANSACTION_SELL
+    data["quantity"] = quantity
+    for field in ("price_per_share", "total_cost"):
+        data[field] = data.get(field, "").lstrip("-")
+
+    action = data.get("type", "").lower()
+    data["type"] = next((transaction_type for transaction_type, words in TYPE_VARIANTS.items()
+                         if any(word in action for word in words)), action or TRANSACTION_BUY)
+    data["currency"] = data.get("currency", "").upper() or CURRENCY_USD
+    return data
+
+
+def import_transactions(csv_file, dry_run: bool = False, write=print) -> int:
+    """
+    Imports the rows of a text CSV file object, returns how many transactions were (or with dry_run,
+    would have been) inserted. Raises TransactionImportError if any row is invalid.
+    """
+    sample = csv_file.read(8192)
+    csv_file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.DictReader(csv_file, dialect=dialect)
+    mapping = _header_mapping(reader.fieldnames or [])
+    missing = [field for field in ("date", "symbol", "quantity") if field not in mapping]
+    if "price_per_share" not in mapping and "total_cost" not in mapping:
+        missing.append("price_per_share or total_cost")
+    if missing:
+        raise TransactionImportError([f"Missing columns: {', '.join(missing)} (found: {', '.join(reader.fieldnames or [])})"])
+
+    split_factors = load_split_factors()
+    no_splits = split_timeline([])
+    errors = []
+    batch = []
+    imported = 0
+    symbols = set()
+
+    def insert_batch():
+        nonlocal imported
+        # Once a row is invalid nothing gets saved, but the rest of the file is still validated
+        if not errors:
+            StockTransaction.objects.bulk_create(batch)
+            symbols.update(stock_transaction.symbol for stock_transaction in batch)
+            imported += len(batch)
+            write(f"{imported} transactions {'validated' if dry_run else 'imported'}")
+        batch.clear()
+
+    try:
+        with transaction.atomic():
+            # Line 1 is the header
+            for line, row in enumerate(reader, 2):
+                form = StockTransactionAdminForm(data=_form_data(row, mapping))
+                if not form.is_valid():
+                    errors += [f"Line {line}: {'' if field == NON_FIELD_ERRORS else f'{field}: '}{' '.join(messages)}"
+                               for field, messages in form.errors.items()]
+                    continue
+
+                stock_transaction = form.instance
+                # What save() does, as bulk_create doesn't call it
+                stock_transaction.symbol = stock_transaction.symbol.upper()
+                dates, splits = split_factors.get(stock_transaction.symbol, no_splits)
+                stock_transaction.apply_splits(splits[bisect_right(dates, stock_transaction.date):])
+                batch.append(stock_transaction)
+                if len(batch) >= BATCH_SIZE:
+                    insert_batch()
+            insert_batch()
+
+            if errors:
+                raise TransactionImportError(errors)
+            # bulk_create doesn't send the signals that keep the position ledger up to date
+            refresh_positions(symbols)
+            if dry_run:
+                raise _DryRun
+    except _DryRun:
+        write(f"Dry run: {imported} valid transactions, nothing was imported")
+
+    return imported
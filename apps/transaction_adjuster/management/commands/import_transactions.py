@@ -0,0 +1,43 @@
+import glob
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.transaction_adjuster.importer import TransactionImportError, import_transactions
+
+# Imports stock transactions from broker CSV exports (apps/transaction_adjuster/importer.py),
+# parsed like the admin form (French dates and decimals), adjusted for the known splits.
+# A file with any invalid row is not imported at all.
+# Usage
+# python manage.py import_transactions "data_dumps/transactions/2024.csv"
+# python manage.py import_transactions "data_dumps/transactions/*.csv" --dry-run
+
+
+class Command(BaseCommand):
+    help = "Import stock transactions from broker CSV exports"
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file", help="Path to the CSV file, wildcards allowed")
+        parser.add_argument("--dry-run", action="store_true", help="Only validate the files, don't import anything")
+
+    def handle(self, *args, **options):
+        files_to_import = sorted(glob.glob(options["csv_file"]))
+        if not files_to_import:
+            raise CommandError(f"No file matches {options['csv_file']}")
+
+        failed = 0
+        for path in files_to_import:
+            self.stdout.write(f"Importing {path}")
+            try:
+                with open(path, newline="", encoding="utf-8-sig") as f:
+                    imported = import_transactions(f, dry_run=options["dry_run"], write=self.stdout.write)
+            except TransactionImportError as e:
+                failed += 1
+                self.stderr.write(f"{path}: {e}")
+                for error in e.errors:
+                    self.stderr.write(f"  {error}")
+                continue
+            if not options["dry_run"]:
+                self.stdout.write(self.style.SUCCESS(f"{path}: {imported} transactions imported"))
+
+        if failed:
+            raise CommandError(f"{failed} of {len(files_to_import)} files were not imported")
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.5 on 2026-10-19 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction_adjuster', '0002_stocktransaction_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Position',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=10)),
+                ('currency', models.CharField(choices=[('USD', 'USD'), ('CAD', 'CAD')], max_length=3)),
+                ('quantity', models.IntegerField(verbose_name='Adjusted quantity')),
+                ('average_cost', models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True, verbose_name='Average cost per share')),
+                ('cost_basis', models.DecimalField(decimal_places=3, max_digits=15)),
+                ('realized_pnl', models.DecimalField(decimal_places=3, max_digits=15, verbose_name='Realized P/L')),
+                ('transaction_count', models.PositiveIntegerField()),
+                ('first_date', models.DateField(verbose_name='First transaction')),
+                ('last_date', models.DateField(verbose_name='Last transaction')),
+            ],
+            options={
+                'ordering': ['symbol', 'currency'],
+                'constraints': [models.UniqueConstraint(fields=('symbol', 'currency'), name='position__unique__symbol__currency')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.5 on 2026-10-19 20:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transaction_adjuster', '0003_position'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stocktransaction',
+            index=models.Index(fields=['symbol', 'date', 'quantity'], name='transaction__symbol_date_qty'),
+        ),
+    ]
@@ -1,4 +1,8 @@
-from django.db import models
+import threading
+from bisect import bisect_right
+from contextlib import contextmanager
+
+from django.db import connection, models, transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
@@ -6,18 +10,78 @@ from decimal import Decimal
 from constants import CURRENCY_CAD, CURRENCY_USD, TRANSACTION_BUY, TRANSACTION_SELL
 
 
+def split_timeline(splits) -> tuple[list, list]:
+    """
+    (date, split) pairs sorted by date, as (dates, splits) lists: a transaction on day d is
+    adjusted by splits[bisect_right(dates, d):], the splits that happened after it.
+    """
+    return [split_date for split_date, _ in splits], [Decimal(split) for _, split in splits]
+
+
 def update_adjusted_values_for_symbol(symbol: str):
     """
     Recalculate adjusted values for all transactions with the given symbol.
-    This takes into account all stock splits for the symbol.
+    This takes into account all stock splits for the symbol, loaded once, and writes
+    every transaction in a single bulk update.
     """
-    # Get all transactions for this symbol
-    transactions = StockTransaction.objects.filter(symbol=symbol).order_by('date')
+    splits = list(StockSplit.objects.filter(symbol=symbol).order_by('date').values_list('date', 'split'))
+    dates, split_values = split_timeline(splits)
+
+    with transaction.atomic():
+        transactions = list(StockTransaction.objects.filter(symbol=symbol).order_by('date'))
+        for stock_transaction in transactions:
+            stock_transaction.apply_splits(split_values[bisect_right(dates, stock_transaction.date):])
+        StockTransaction.objects.bulk_update(transactions, ['adjusted_quantity', 'adjusted_price_per_share'],
+                                             batch_size=500)
+        refresh_positions([symbol])
+
+
+def compute_positions(rows) -> list:
+    """
+    Positions from transaction rows (symbol, currency, date, type, adjusted_quantity, adjusted_price_per_share,
+    total_cost) sorted by symbol, currency and date, in a single pass. Average cost method: a buy adds its
+    cost to the cost basis, a sell takes out its shares at the average cost and the difference with what
+    it sold for is realized.
+    """
+    positions = []
+    position = None
+    for symbol, currency, day, transaction_type, quantity, price, total_cost in rows:
+        if position is None or (position.symbol, position.currency) != (symbol, currency):
+            position = Position(symbol=symbol, currency=currency, quantity=0, cost_basis=Decimal(0),
+                                realized_pnl=Decimal(0), transaction_count=0, first_date=day)
+            positions.append(position)
+
+        amount = total_cost if total_cost is not None else quantity * price
+        if transaction_type == TRANSACTION_SELL:
+            sold_cost = position.cost_basis * min(quantity, position.quantity) / position.quantity \
+                if position.quantity > 0 else Decimal(0)
+            position.realized_pnl += amount - sold_cost
+            position.cost_basis -= sold_cost
+            position.quantity -= quantity
+        else:
+            position.cost_basis += amount
+            position.quantity += quantity
+        position.transaction_count += 1
+        position.last_date = day
 
-    # Process each transaction
-    for transaction in transactions:
-        transaction.calculate_adjusted_values()
-        transaction.save(update_fields=['adjusted_quantity', 'adjusted_price_per_share'])
+    for position in positions:
+        position.average_cost = position.cost_basis / position.quantity if position.quantity > 0 else None
+    return positions
+
+
+def refresh_positions(symbols=None):
+    """Rebuild the positions of these symbols (all of them if None) from their transactions"""
+    rows = StockTransaction.objects.order_by('symbol', 'currency', 'date', 'type', 'pk').values_list(
+        'symbol', 'currency', 'date', 'type', 'adjusted_quantity', 'adjusted_price_per_share', 'total_cost'
+    )
+    positions = Position.objects.all()
+    if symbols is not None:
+        rows = rows.filter(symbol__in=symbols)
+        positions = positions.filter(symbol__in=symbols)
+
+    with transaction.atomic():
+        positions.delete()
+        Position.objects.bulk_create(compute_positions(rows.iterator()))
 
 
 class StockTransaction(models.Model):
@@ -55,19 +119,19 @@ class StockTransaction(models.Model):
 
     def calculate_adjusted_values(self):
         """Calculate adjusted values based on stock splits after this transaction"""
-        # Start with original values
-        self.adjusted_quantity = self.quantity
-        original_price = self.price_per_share if self.price_per_share else (self.total_cost / self.quantity)
-        self.adjusted_price_per_share = original_price
-        
-        # Apply all splits that happened after this transaction
         splits = StockSplit.objects.filter(symbol=self.symbol, date__gt=self.date).order_by('date')
-        
+        self.apply_splits([Decimal(split) for split in splits.values_list('split', flat=True)])
+
+    def apply_splits(self, splits):
+        """Set the adjusted values from the splits that happened after this transaction, oldest first"""
+        self.adjusted_quantity = self.quantity
+        self.adjusted_price_per_share = self.price_per_share if self.price_per_share else (self.total_cost / self.quantity)
         for split in splits:
             # For a 2:1 split (split=2.0), quantity doubles and price halves
             # For a 1:2 reverse split (split=0.5), quantity halves and price doubles
-            self.adjusted_quantity = int(self.adjusted_quantity * Decimal(split.split))
-            self.adjusted_price_per_share = self.adjusted_price_per_share / Decimal(split.split)
+            # Truncated at each split, not once on their product: 3 shares through 1:2 then 2:1 make 2
+            self.adjusted_quantity = int(self.adjusted_quantity * split)
+            self.adjusted_price_per_share = self.adjusted_price_per_share / split
 
     def save(self, *args, **kwargs):
         # Convert symbol to uppercase
@@ -77,10 +141,21 @@ class StockTransaction(models.Model):
         self.calculate_adjusted_values()
         super().save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Symbol as loaded, so editing it refreshes the position it leaves too
+        instance._loaded_symbol = dict(zip(field_names, values)).get('symbol')
+        return instance
+
     def __str__(self):
         return f"{self.date} - {self.symbol}: {self.quantity}"
     
     class Meta:
+        indexes = [
+            # Duplicates filter of the admin
+            models.Index(name="transaction__symbol_date_qty", fields=["symbol", "date", "quantity"]),
+        ]
         ordering = ['-date', 'symbol']
 
 
@@ -106,13 +181,108 @@ class StockSplit(models.Model):
         ordering = ['-date', 'symbol']
 
 
+class Position(models.Model):
+    """Holdings of a symbol in one currency, materialized from its transactions by refresh_positions()"""
+    symbol = models.CharField(max_length=10)
+    currency = models.CharField(max_length=3, choices=StockTransaction.CURRENCY_CHOICES)
+    quantity = models.IntegerField(verbose_name="Adjusted quantity")
+    average_cost = models.DecimalField(max_digits=10, decimal_places=4, null=True, blank=True,
+                                       verbose_name="Average cost per share")
+    cost_basis = models.DecimalField(max_digits=15, decimal_places=3)
+    realized_pnl = models.DecimalField(max_digits=15, decimal_places=3, verbose_name="Realized P/L")
+    transaction_count = models.PositiveIntegerField()
+    first_date = models.DateField(verbose_name="First transaction")
+    last_date = models.DateField(verbose_name="Last transaction")
+
+    def __str__(self):
+        return f"{self.symbol}: {self.quantity} @ {self.average_cost} {self.currency}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                name="position__unique__symbol__currency",
+                fields=["symbol", "currency"]
+            ),
+        ]
+        ordering = ['symbol', 'currency']
+
+
+# Symbols whose recalculation is deferred, per thread (None = recalculate right away): split changes
+# in _deferred.symbols, transaction changes (positions only) in _deferred.positions
+_deferred = threading.local()
+
+
+@contextmanager
+def deferred_split_recalculation():
+    """
+    Batch mode for bulk StockSplit edits and imports: the split signals only record the symbols
+    they touch, and each of them is recalculated once when the block exits.
+    The position ledger updates of changed transactions are deferred the same way.
+    Nested blocks join the outermost one.
+
+    with deferred_split_recalculation():
+        for row in rows:
+            StockSplit.objects.create(...)
+    """
+    if getattr(_deferred, "symbols", None) is not None:
+        yield
+        return
+
+    _deferred.symbols = set()
+    _deferred.positions = set()
+    try:
+        yield
+    finally:
+        symbols = sorted(_deferred.symbols)
+        # Recalculating a symbol's splits refreshes its position already
+        positions = _deferred.positions - _deferred.symbols
+        _deferred.symbols = _deferred.positions = None
+        # Nothing can be written anymore in a transaction that failed, it's rolled back anyway
+        if not connection.needs_rollback:
+            # One symbol after the other: SQLite allows a single writer, parallel updates would lock it
+            for symbol in symbols:
+                update_adjusted_values_for_symbol(symbol)
+            if positions:
+                refresh_positions(positions)
+
+
+def _split_changed(symbol: str):
+    symbols = getattr(_deferred, "symbols", None)
+    if symbols is None:
+        update_adjusted_values_for_symbol(symbol)
+    else:
+        symbols.add(symbol)
+
+
+def _transaction_changed(instance: StockTransaction):
+    symbols = {instance.symbol, getattr(instance, '_loaded_symbol', None) or instance.symbol}
+    instance._loaded_symbol = instance.symbol
+    positions = getattr(_deferred, "positions", None)
+    if positions is None:
+        refresh_positions(symbols)
+    else:
+        positions.update(symbols)
+
+
 @receiver(post_save, sender=StockSplit)
 def stock_split_saved(sender, instance, **kwargs):
     """Handler that triggers when a StockSplit is created or updated"""
-    update_adjusted_values_for_symbol(instance.symbol)
+    _split_changed(instance.symbol)
 
 
 @receiver(post_delete, sender=StockSplit)
 def stock_split_deleted(sender, instance, **kwargs):
     """Handler that triggers when a StockSplit is deleted"""
-    update_adjusted_values_for_symbol(instance.symbol)
\ No newline at end of file
+    _split_changed(instance.symbol)
+
+
+@receiver(post_save, sender=StockTransaction)
+def stock_transaction_saved(sender, instance, **kwargs):
+    """Handler that triggers when a StockTransaction is created or updated"""
+    _transaction_changed(instance)
+
+
+@receiver(post_delete, sender=StockTransaction)
+def stock_transaction_deleted(sender, instance, **kwargs):
+    """Handler that triggers when a StockTransaction is deleted"""
+    _transaction_changed(instance)
@@ -0,0 +1,120 @@
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+
+from apps.transaction_adjuster.importer import TransactionImportError, import_transactions
+from apps.transaction_adjuster.models import Position, StockSplit, StockTransaction, deferred_split_recalculation
+from constants import TRANSACTION_BUY, TRANSACTION_SELL
+
+
+def create_transaction(symbol="ABC", day=date(2020, 1, 1), transaction_type=TRANSACTION_BUY, quantity=3,
+                       price_per_share=Decimal("10")):
+    return StockTransaction.objects.create(symbol=symbol, date=day, type=transaction_type, quantity=quantity,
+                                           price_per_share=price_per_share)
+
+
+class SplitAdjustmentTests(TestCase):
+    def test_quantity_truncated_after_each_split(self):
+        stock_transaction = create_transaction()
+        StockSplit.objects.create(symbol="ABC", date=date(2021, 1, 1), split=Decimal("0.5"))
+        StockSplit.objects.create(symbol="ABC", date=date(2022, 1, 1), split=Decimal("2"))
+
+        stock_transaction.refresh_from_db()
+        # 3 -> 1 -> 2, not 3 * 0.5 * 2 = 3
+        self.assertEqual(stock_transaction.adjusted_quantity, 2)
+        self.assertEqual(stock_transaction.adjusted_price_per_share, Decimal("10"))
+
+    def test_only_later_splits_apply(self):
+        StockSplit.objects.create(symbol="ABC", date=date(2019, 1, 1), split=Decimal("4"))
+        StockSplit.objects.create(symbol="ABC", date=date(2021, 1, 1), split=Decimal("2"))
+        stock_transaction = create_transaction()
+
+        self.assertEqual(stock_transaction.adjusted_quantity, 6)
+        self.assertEqual(stock_transaction.adjusted_price_per_share, Decimal("5"))
+
+    def test_deferred_recalculation(self):
+        transactions = [create_transaction(symbol=f"S{i}") for i in range(5)]
+        with deferred_split_recalculation():
+            for i in range(5):
+                StockSplit.objects.create(symbol=f"S{i}", date=date(2021, 1, 1), split=Decimal("2"))
+            # Nothing recalculated before the block exits
+            self.assertEqual(StockTransaction.objects.get(pk=transactions[0].pk).adjusted_quantity, 3)
+
+        self.assertEqual(set(StockTransaction.objects.values_list("adjusted_quantity", flat=True)), {6})
+        self.assertEqual(set(Position.objects.values_list("quantity", flat=True)), {6})
+
+
+class PositionTests(TestCase):
+    def test_average_cost(self):
+        create_transaction(day=date(2020, 1, 1), quantity=10, price_per_share=Decimal("10"))
+        create_transaction(day=date(2020, 2, 1), quantity=10, price_per_share=Decimal("20"))
+        create_transaction(day=date(2020, 3, 1), transaction_type=TRANSACTION_SELL, quantity=5,
+                           price_per_share=Decimal("30"))
+
+        position = Position.objects.get(symbol="ABC")
+        self.assertEqual(position.quantity, 15)
+        self.assertEqual(position.average_cost, Decimal("15"))
+        self.assertEqual(position.cost_basis, Decimal("225"))
+        # Sold for 150 what cost 5 * 15
+        self.assertEqual(position.realized_pnl, Decimal("75"))
+        self.assertEqual(position.transaction_count, 3)
+
+    def test_symbol_change_refreshes_both_positions(self):
+        stock_transaction = create_transaction()
+        stock_transaction = StockTransaction.objects.get(pk=stock_transaction.pk)
+        stock_transaction.symbol = "XYZ"
+        stock_transaction.save()
+
+        self.assertEqual(list(Position.objects.values_list("symbol", "quantity")), [("XYZ", 3)])
+
+    def test_split_adjusts_position(self):
+        create_transaction(quantity=10, price_per_share=Decimal("10"))
+        StockSplit.objects.create(symbol="ABC", date=date(2021, 1, 1), split=Decimal("2"))
+
+        position = Position.objects.get(symbol="ABC")
+        self.assertEqual(position.quantity, 20)
+        self.assertEqual(position.average_cost, Decimal("5"))
+
+
+class ImportTests(TestCase):
+    def run_import(self, csv_text, **kwargs):
+        return import_transactions(io.StringIO(csv_text), write=lambda message: None, **kwargs)
+
+    def test_import(self):
+        StockSplit.objects.create(symbol="ABC", date=date(2021, 1, 1), split=Decimal("2"))
+        imported = self.run_import("Trade Date;Ticker;Action;Qty;Price\n"
+                                   "01/06/2020;abc;Bought;3;10,5\n"
+                                   "01/06/2021;ABC;;-1;12\n")
+
+        self.assertEqual(imported, 2)
+        self.assertEqual(list(StockTransaction.objects.order_by("date").values_list(
+            "symbol", "type", "quantity", "adjusted_quantity")), [
+            ("ABC", TRANSACTION_BUY, 3, 6),
+            ("ABC", TRANSACTION_SELL, 1, 1),
+        ])
+        self.assertEqual(Position.objects.get(symbol="ABC").quantity, 5)
+
+    def test_invalid_row_rejects_everything(self):
+        with self.assertRaises(TransactionImportError) as raised:
+            self.run_import("Date,Symbol,Quantity,Price\n"
+                            "2020-06-01,ABC,3,10\n"
+                            "not a date,ABC,3,10\n"
+                            "2020-06-03,ABC,2,\n")
+
+        self.assertEqual([error.split(":")[0] for error in raised.exception.errors], ["Line 3", "Line 4"])
+        self.assertFalse(StockTransaction.objects.exists())
+        self.assertFalse(Position.objects.exists())
+
+    def test_missing_columns(self):
+        with self.assertRaises(TransactionImportError) as raised:
+            self.run_import("Date,Symbol\n2020-06-01,ABC\n")
+        self.assertIn("quantity", raised.exception.errors[0])
+
+    def test_dry_run(self):
+        imported = self.run_import("Date,Symbol,Quantity,Price\n2020-06-01,ABC,3,10\n", dry_run=True)
+
+        self.assertEqual(imported, 1)
+        self.assertFalse(StockTransaction.objects.exists())
+        self.assertFalse(Position.objects.exists())
@@ -2,15 +2,19 @@ import re
 from typing import Union
 
 from django.contrib import admin, messages
-from django.db.models import QuerySet, TextField
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.db.models import Max, Min, QuerySet, TextField
 from django.forms import Textarea
 from django.http import HttpResponseRedirect, HttpRequest
 from django.shortcuts import redirect
 from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
 
-from apps.watcher.models import Stock, Price, Alert
+from apps.watcher import price_store, resampling
+from apps.watcher.models import Stock, Price, Alert, AlertFiring, MonthlyPrice
 
 
 class AlertInline(admin.TabularInline):
@@ -36,19 +40,21 @@ class AlertInline(admin.TabularInline):
 
 
 class StockAdmin(admin.ModelAdmin):
-    # Not sure this has any use, might be forgotten code, leaving it for a bit in case an issue arises
-    # def get_queryset(self, request):
-    #     qs = super().get_queryset(request)
-    #     qs = qs.annotate(prices_count=Count("price"), alerts_count=Count("alert"))
-    #     return qs
+    # Prices and alerts counts of every row in the same query, which also makes them sortable
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_counts()
 
     # Deletes all prices for the selected stocks (useful if there's a stock split and they need to be reset)
     def delete_prices_from_selected_stocks(
             self, request: HttpRequest, queryset: QuerySet[Stock]
     ) -> HttpResponseRedirect:
-        # Deletes all prices for the selected stocks
-        for stock in queryset:
-            stock.prices.all().delete()
+        # Deletes all prices for the selected stocks, in one DELETE ... WHERE stock_id IN (...).
+        # A raw delete, as QuerySet.delete() would load every price to send its post_delete signal
+        stock_ids = list(queryset.values_list("pk", flat=True))
+        prices = Price.objects.filter(stock_id__in=stock_ids)
+        prices._raw_delete(prices.db)
+        price_store.invalidate(stock_ids)
+        MonthlyPrice.objects.filter(stock_id__in=stock_ids).delete()
         messages.success(request, "Prices deleted")
         return redirect(request.get_full_path())
 
@@ -73,13 +79,13 @@ class StockAdmin(admin.ModelAdmin):
     def dividend_yield_display(self, stock: Stock) -> str:
         return f"{stock.dividend_yield}%" if stock.dividend_yield else "-"
 
-    # Prices count
-    def prices_count(self, stock: Stock) -> str:
-        return stock.prices.count()
+    # Prices count (annotated by get_queryset)
+    def prices_count(self, stock: Stock) -> int:
+        return stock.prices_count
 
-    # Alerts count
-    def alerts_count(self, stock: Stock) -> str:
-        return stock.alerts.count()
+    # Alerts count (annotated by get_queryset)
+    def alerts_count(self, stock: Stock) -> int:
+        return stock.alerts_count
 
     # Columns to display
     list_display = ["symbol", "sa_stock_link", "name", "notes_hint", "market", "currency",
@@ -94,6 +100,9 @@ class StockAdmin(admin.ModelAdmin):
     # Show alerts on the Stock edit page
     inlines = [AlertInline]
 
+    # Avoids one query per row for the Seeking Alpha link
+    list_select_related = ["sa_stock"]
+
     # Fields to search for "All words" (Default search behavior)
     search_fields = ["symbol", "name", "notes"]
 
@@ -112,11 +121,74 @@ class StockAdmin(admin.ModelAdmin):
     alerts_count.admin_order_field = "alerts_count"
 
 
+# Paginator that doesn't COUNT millions of prices: without any filter, the number of rows is
+# estimated from the id range (deleted prices leave gaps, it's only used for the page links)
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            ids = self.object_list.model.objects.aggregate(first=Min("pk"), last=Max("pk"))
+            return ids["last"] - ids["first"] + 1 if ids["last"] is not None else 0
+        return super().count
+
+
+# Stock filter as a symbol text box (autocompleted from the symbols) instead of a link per stock
+class StockSymbolFilter(admin.SimpleListFilter):
+    title = "Stock"
+    parameter_name = "symbol"
+    template = "admin/symbol_filter.html"
+
+    def lookups(self, request, model_admin):
+        return [(symbol, symbol) for symbol in Stock.objects.order_by("symbol").values_list("symbol", flat=True)]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            # stock_id IN (...) rather than a join, so the prices are searched by their stock index
+            stocks = Stock.objects.filter(symbol=self.value().strip().upper()).values("pk")
+            return queryset.filter(stock_id__in=stocks)
+        return queryset
+
+    def choices(self, changelist):
+        # A single "choice" with what the template's form needs: the other parameters to keep
+        yield {
+            "value": self.value() or "",
+            "symbols": [symbol for symbol, _ in self.lookup_choices],
+            "hidden": [(name, value) for name, values in changelist.params.items()
+                       if name not in (self.parameter_name, PAGE_VAR) for value in values],
+        }
+
+
 class PriceAdmin(admin.ModelAdmin):
     list_display = ["stock", "date", "open", "low", "high", "close"]
-    list_filter = ["stock"]
+    list_filter = [StockSymbolFilter]
     search_fields = ["stock__symbol", "stock__name", "stock__notes"]
 
+    # Follows the (stock, date) unique index, so a page only reads its own rows instead of sorting the
+    # whole table, and a stock's prices come newest first. "stock" would sort on the stock names
+    ordering = ["stock_id", "-date"]
+
+    # One query for the page rows and their stock, no full COUNT(*) of the prices
+    list_select_related = ["stock"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # Stock picked by typing its name or symbol (StockAdmin.search_fields) instead of a dropdown of every stock
+    autocomplete_fields = ["stock"]
+
+    # Deleted prices must also leave the monthly prices (the price store drops them on post_delete)
+    def delete_model(self, request, price):
+        super().delete_model(request, price)
+        resampling.rebuild_monthly_prices(price.stock_id)
+
+    # A raw set-based DELETE instead of loading every selected price to send its post_delete signal,
+    # so the compact price store is invalidated here
+    def delete_queryset(self, request, queryset):
+        stock_ids = set(queryset.values_list("stock_id", flat=True))
+        queryset._raw_delete(queryset.db)
+        price_store.invalidate(stock_ids)
+        for stock_id in stock_ids:
+            resampling.rebuild_monthly_prices(stock_id)
+
 
 class AlertAdmin(admin.ModelAdmin):
     def notes_hint(self, alert: Alert) -> str:
@@ -159,6 +231,21 @@ class AlertAdmin(admin.ModelAdmin):
     notes_hint.admin_order_field = "notes"
 
 
+class AlertFiringAdmin(admin.ModelAdmin):
+    # Columns to display
+    list_display = ["date", "alert", "price", "subject"]
+
+    # Side filters
+    list_filter = ["alert__type", "alert__stock"]
+
+    # Fields to search for "All words" (Default search behavior)
+    search_fields = ["alert__stock__symbol", "alert__stock__name", "alert__name", "subject"]
+
+    # Avoids one query per row for the alert and its stock
+    list_select_related = ["alert__stock"]
+
+
 admin.site.register(Stock, StockAdmin)
 admin.site.register(Price, PriceAdmin)
 admin.site.register(Alert, AlertAdmin)
+admin.site.register(AlertFiring, AlertFiringAdmin)
@@ -0,0 +1,199 @@
+"""
+Price alert checking, shared by the fetch_prices and send_alerts commands.
+
+fetch_prices checks a stock's alerts as soon as its new prices are inserted
+(by listening to the prices_inserted signal), so an alert goes out the moment
+its price lands. send_alerts runs the same checks over every enabled alert, as
+a catch-up for alerts that were added or edited since their stock's last fetch.
+Prices are read from the compact price store (apps/watcher/price_store.py), so
+checking a stock's alerts loads its history once instead of querying per alert.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max
+
+from apps.watcher import price_store
+from apps.watcher.models import Alert, AlertFiring, AlertState, Price, Stock
+from apps.watcher.notifications import send_email
+from apps.watcher.price_store import PriceSeries
+from constants import CURRENCY_CAD, SEEKING_ALPHA_CAD_SUFFIX, YAHOO_CAD_SUFFIX
+from settings.base import EMAIL_DEFAULT_RECIPIENT
+
+
+# The close at `index` as the Decimal the Price row holds: the price store keeps floats, and
+# a float compared with a Decimal threshold is compared exactly (float(Decimal("9.99")) < Decimal("9.99"))
+def _close(series: PriceSeries, index: int) -> Decimal:
+    return Decimal(f"{series.close[index]:.2f}")
+
+
+# Index of the most recent day before the last one whose close passes `test`, or None
+def _last_close_index(series: PriceSeries, test):
+    for index in range(len(series.close) - 2, -1, -1):
+        if test(_close(series, index)):
+            return index
+    return None
+
+
+# One alert checking run. Emails go out as soon as an alert fires, but the state
+# changes (disabled alerts, AlertState, AlertFiring) are only collected, and
+# written together by save() at the end of the run (fetch_prices saves them even
+# when the run fails partway, so the alerts already emailed aren't sent again).
+# `write` is where progress lines go (a command passes self.stdout.write so the
+# cron runner captures them; defaults to print for plain calls).
+class AlertRun:
+    def __init__(self, write=print):
+        self.write = write
+        self.sent_alerts_count = 0
+        self.skipped_alerts_count = 0
+        self.alerts_to_disable = []
+        self.firings = []
+        # alert pk -> AlertState, so an alert checked twice in one run sees its own update
+        self.updated_states = {}
+        # stock id -> PriceSeries
+        self.series = {}
+
+    # Checks every enabled alert against its stock's latest price
+    def check_all(self):
+        # Date of the newest price of every stock, in a single query
+        latest_price_dates = dict(Price.objects.values_list("stock").annotate(latest_date=Max("date")))
+        states = {state.alert_id: state for state in AlertState.objects.filter(alert__enabled=True)}
+
+        for alert in Alert.objects.filter(enabled=True).select_related("stock"):
+            last_price_date = latest_price_dates.get(alert.stock_id)
+            if last_price_date:
+                self.check(alert, states.get(alert.pk), last_price_date)
+
+    # Checks only the enabled alerts of one stock, against its latest price
+    def check_stock(self, stock: Stock):
+        last_price_date = stock.prices.aggregate(latest_date=Max("date"))["latest_date"]
+        if not last_price_date:
+            return
+
+        alerts = list(stock.alerts.filter(enabled=True))
+        states = {state.alert_id: state for state in AlertState.objects.filter(alert__in=alerts)}
+        for alert in alerts:
+            # The stock is already loaded, no need to query it again for every alert
+            alert.stock = stock
+            self.check(alert, states.get(alert.pk), last_price_date)
+
+    # Receiver for the prices_inserted signal: checks the stock's alerts right away
+    def on_prices_inserted(self, sender, stock: Stock, **kwargs):
+        self.check_stock(stock)
+
+    # Checks one alert against the price of last_price_date and emails it if it fired
+    def check(self, alert: Alert, state: AlertState | None, last_price_date):
+        state = self.updated_states.get(alert.pk, state)
+        if state is None:
+            state = AlertState(alert=alert)
+        # Nothing new since the last check, the result would be the same
+        if state.last_price_date and state.last_price_date >= last_price_date:
+            self.skipped_alerts_count += 1
+            return
+
+        series = self.load_series(alert.stock_id, last_price_date)
+        if not len(series.close):
+            return
+        last_price = _close(series, -1)
+        self.write(f"{alert.stock.symbol} last close: {last_price:.2f}")
+
+        subject = body = ""
+        # Whether the alert condition holds for this price, even if it doesn't need to be sent again
+        triggered = False
+
+        # TODO TYPE_INTERVAL_CHEAPEST and TYPE_INTERVAL_HIGHEST have a lot of duplicate code, could be refactored
+        match alert.type:
+            case Alert.TYPE_INTERVAL_CHEAPEST:
+                index = _last_close_index(series, lambda close: close <= last_price)
+                if index is not None:
+                    price_date = date.fromordinal(series.dates[index])
+                    days_diff = (last_price_date - price_date).days
+                    triggered = days_diff > alert.days
+                    # Already sent: only send again for an even lower low
+                    if triggered and (not state.triggered or last_price < state.last_fired_value):
+                        subject = f"{alert.stock.name}({alert.stock.symbol}) is the cheapest it has been in {days_diff} days"
+                        body = f"Price for {alert.stock.name} closed at {last_price:.2f}$ the cheapest in the past {days_diff} days"
+                        body += f" (Last time was on {price_date})"
+            case Alert.TYPE_INTERVAL_HIGHEST:
+                index = _last_close_index(series, lambda close: close >= last_price)
+                if index is not None:
+                    price_date = date.fromordinal(series.dates[index])
+                    days_diff = (last_price_date - price_date).days
+                    triggered = days_diff > alert.days
+                    # Already sent: only send again for an even higher high
+                    if triggered and (not state.triggered or last_price > state.last_fired_value):
+                        subject = f"{alert.stock.name}({alert.stock.symbol}) is the highest it has been in {days_diff} days"
+                        body = f"Price for {alert.stock.name} closed at {last_price:.2f}$ the highest in the past {days_diff} days"
+                        body += f" (Last time was on {price_date})"
+            case Alert.TYPE_LOWER_THAN:
+                triggered = last_price <= alert.value
+                # Only sent when the price crosses the threshold, not every day it stays below
+                if triggered and not state.triggered:
+                    subject = f"{alert.stock.name}({alert.stock.symbol}) has reached less than {alert.value}$"
+                    body = f"Price for {alert.stock.name} is lower than {alert.value}$ (closed at {last_price:.2f}$)"
+            case Alert.TYPE_HIGHER_THAN:
+                triggered = last_price >= alert.value
+                # Only sent when the price crosses the threshold, not every day it stays above
+                if triggered and not state.triggered:
+                    subject = f"{alert.stock.name}({alert.stock.symbol}) has reached more than {alert.value}$"
+                    body = f"Price for {alert.stock.name} is higher than {alert.value}$ (closed at {last_price:.2f}$)"
+            case Alert.TYPE_PERCENTAGE_PRICE_CHANGE:
+                if len(series.close) > 1:
+                    previous_close = _close(series, -2)
+                    percent_change = ((last_price - previous_close) / previous_close) * 100
+                    # Each new price is its own move, so no need to check if it was already sent
+                    triggered = abs(percent_change) >= alert.value
+                    if triggered:
+                        change_direction = "gained" if percent_change > 0 else "lost"
+                        subject = f"{alert.stock.name}({alert.stock.symbol}) has {change_direction} {percent_change:.1f}%"
+                        body = f"Price for {alert.stock.name} {change_direction} {percent_change:.1f}% (closed at {last_price:.2f}$)"
+            case _:
+                pass
+
+        state.last_price_date = last_price_date
+        state.triggered = triggered
+
+        if subject and body:
+            yahoo_symbol = f"{alert.stock.symbol}{YAHOO_CAD_SUFFIX if alert.stock.currency == CURRENCY_CAD else ''}"
+            sa_symbol = f"{alert.stock.symbol}{SEEKING_ALPHA_CAD_SUFFIX if alert.stock.currency == CURRENCY_CAD else ''}"
+            body += f"\n<a href=\"https://ca.finance.yahoo.com/quote/{yahoo_symbol}\">https://ca.finance.yahoo.com/quote/{yahoo_symbol}</a>"
+            body += f"\n<a href=\"https://seekingalpha.com/symbol/{sa_symbol}\">https://seekingalpha.com/symbol/{sa_symbol}</a>"
+            body += f"\n\n{alert.notes}"
+            self.write(subject)
+            self.write(body)
+            send_email(
+                to=alert.recipient if alert.recipient else EMAIL_DEFAULT_RECIPIENT,
+                subject=alert.name if alert.name else subject,
+                body=body,
+            )
+
+            if alert.disable_once_fired:
+                alert.enabled = False
+                self.alerts_to_disable.append(alert)
+            self.firings.append(AlertFiring(alert=alert, price=last_price, subject=subject[:255]))
+            state.last_fired_value = last_price
+            state.last_fired_date = last_price_date
+
+            self.sent_alerts_count += 1
+
+        self.updated_states[alert.pk] = state
+
+    # A stock's prices up to last_price_date from the compact price store, loaded once per run
+    def load_series(self, stock_id: int, last_price_date) -> PriceSeries:
+        if stock_id not in self.series:
+            self.series[stock_id] = price_store.load(stock_id, end=last_price_date)
+        return self.series[stock_id]
+
+    # Saves all state changes in one go instead of one write per fired alert
+    def save(self):
+        with transaction.atomic():
+            Alert.objects.bulk_update(self.alerts_to_disable, ["enabled"])
+            AlertFiring.objects.bulk_create(self.firings)
+            # New alerts get their state row, existing ones are updated
+            AlertState.objects.bulk_create(
+                self.updated_states.values(),
+                update_conflicts=True,
+                update_fields=["last_price_date", "triggered", "last_fired_value", "last_fired_date"],
+                unique_fields=["alert"],
+            )
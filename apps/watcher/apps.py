@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class WatcherConfig(AppConfig):
+    name = "apps.watcher"
+
+    # Connects the signal receivers that keep the compact price store and the
+    # monthly prices in sync with the Price table, whatever process is running
+    def ready(self):
+        from apps.watcher import price_store, resampling  # noqa: F401
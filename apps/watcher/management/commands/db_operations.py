@@ -5,9 +5,15 @@ from apps.quant.models import (
     CompiledSAScore,
     CompiledSAScoreDecayed,
     CompiledSAScoreMomentum,
+    SAMonthSnapshot,
+    SARankMatrix,
     SARating,
     SAStock,
 )
+from apps.quant import month_snapshots, rank_matrix
+from apps.transaction_adjuster.models import refresh_positions
+from apps.watcher import price_store, resampling
+from apps.watcher.models import Stock
 
 
 # Usage: python manage.py db_operations empty_sa_stocks
@@ -16,6 +22,11 @@ from apps.quant.models import (
 # Usage: python manage.py db_operations empty_compiled_scores_decayed
 # Usage: python manage.py db_operations empty_compiled_scores_momentum
 # Usage: python manage.py db_operations empty_all_quant
+# Usage: python manage.py db_operations rebuild_price_store
+# Usage: python manage.py db_operations rebuild_monthly_prices
+# Usage: python manage.py db_operations rebuild_positions
+# Usage: python manage.py db_operations rebuild_rank_matrices
+# Usage: python manage.py db_operations rebuild_month_snapshots
 
 def truncate_and_reset_auto_increment(table_name):
     with connection.cursor() as cursor:
@@ -35,9 +46,13 @@ class Command(BaseCommand):
         if operation == 'empty_sa_stocks':
             truncate_and_reset_auto_increment(SAStock._meta.db_table)
         elif operation == 'empty_sa_ratings':
+            truncate_and_reset_auto_increment(SAMonthSnapshot._meta.db_table)
+            truncate_and_reset_auto_increment(SARankMatrix._meta.db_table)
             truncate_and_reset_auto_increment(SARating._meta.db_table)
         elif operation == 'empty_compiled_scores':
             truncate_and_reset_auto_increment(CompiledSAScore._meta.db_table)
+            # The month page shows those counts
+            month_snapshots.rebuild()
         elif operation == 'empty_compiled_scores_decayed':
             truncate_and_reset_auto_increment(CompiledSAScoreDecayed._meta.db_table)
         elif operation == 'empty_compiled_scores_momentum':
@@ -47,7 +62,26 @@ class Command(BaseCommand):
             truncate_and_reset_auto_increment(CompiledSAScore._meta.db_table)
             truncate_and_reset_auto_increment(CompiledSAScoreDecayed._meta.db_table)
             truncate_and_reset_auto_increment(CompiledSAScoreMomentum._meta.db_table)
+            truncate_and_reset_auto_increment(SAMonthSnapshot._meta.db_table)
+            truncate_and_reset_auto_increment(SARankMatrix._meta.db_table)
             truncate_and_reset_auto_increment(SARating._meta.db_table)
             truncate_and_reset_auto_increment(SAStock._meta.db_table)
+        elif operation == 'rebuild_price_store':
+            # Repack every stock's prices into the compact price store
+            for stock_id in Stock.objects.values_list('pk', flat=True):
+                price_store.rebuild(stock_id)
+        elif operation == 'rebuild_monthly_prices':
+            # Recompute every stock's monthly bars from its daily prices
+            for stock_id in Stock.objects.values_list('pk', flat=True):
+                resampling.rebuild_monthly_prices(stock_id)
+        elif operation == 'rebuild_positions':
+            # Recompute the whole position ledger from the transactions
+            refresh_positions()
+        elif operation == 'rebuild_rank_matrices':
+            # Repack every SA stock's rating history
+            rank_matrix.rebuild(SAStock.objects.values_list('pk', flat=True))
+        elif operation == 'rebuild_month_snapshots':
+            # Re-pivot every month of SA ratings for the month page
+            month_snapshots.rebuild()
         else:
             self.stderr.write(self.style.ERROR(f"Unknown operation: {operation}"))
\ No newline at end of file
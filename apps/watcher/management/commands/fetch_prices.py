@@ -2,8 +2,10 @@ import time
 from datetime import datetime
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.db.models import Q
 
+from apps.watcher.alerts import AlertRun
 from apps.watcher.models import Price, Stock
 from apps.watcher.notifications import send_email
 from apps.watcher.providers.alpha_vantage_rapidapi import AlphaVantageRapidAPI
@@ -11,6 +13,7 @@ from apps.watcher.providers.eodhd import EODHD
 from apps.watcher.providers.marketstack import MarketStack
 from apps.watcher.providers.mboum import Mboum
 from apps.watcher.providers.yahoo import Yahoo
+from apps.watcher.signals import prices_inserted
 from constants import CURRENCY_USD
 from settings.base import EMAIL_DEFAULT_RECIPIENT
 
@@ -36,6 +39,11 @@ MIN_SECONDS_BETWEEN_API_CALLS = 20
 # Tries each price API in order until one succeeds, waiting a minimum gap between
 # calls to respect rate limits. Skips weekends. Emails the full report if any API
 # errored. Use --limit to cap how many stocks are queried in one run.
+# A stock's alerts are checked as soon as its new prices are inserted (see
+# apps/watcher/alerts.py), instead of waiting for the next send_alerts run.
+# Stocks' last fetch dates and alert states are saved together at the end of the
+# run, even when it fails partway, so the stocks already fetched and the alerts
+# already emailed aren't done again next time.
 # Usage
 #  python manage.py fetch_prices
 #  python manage.py fetch_prices --limit 5      -> query at most 5 stocks this run
@@ -98,37 +106,59 @@ class Command(BaseCommand):
             self.stdout.write(message)
             report_lines.append(message)
 
+        # Checks a stock's alerts every time new prices are inserted for it
+        alert_run = AlertRun(write=log)
+        prices_inserted.connect(alert_run.on_prices_inserted, sender=Price)
+
         error_triggered = False
+        fetched_stocks = []
         last_api_call_started_at = None
         due_stocks = Stock.objects.filter(
             Q(date_last_fetch__lt=datetime.today()) | Q(date_last_fetch=None)
         ).all()[:max_api_query]
-        for stock in due_stocks:
-            get_full_price_history = stock.date_last_fetch is None
-
-            log(f"******Fetching \"{stock.name}\" prices, last fetch: {stock.date_last_fetch}******")
-            for api in (usd_apis if stock.currency == CURRENCY_USD else cad_apis):
-                if last_api_call_started_at is not None:
-                    elapsed = time.monotonic() - last_api_call_started_at
-                    sleep_seconds = MIN_SECONDS_BETWEEN_API_CALLS - elapsed
-                    if sleep_seconds > 0:
-                        time.sleep(sleep_seconds)
-
-                last_api_call_started_at = time.monotonic()
-                log(f"Using {api.API_NAME}")
-                api_response = api.fetch(stock, get_full_price_history)
-                if api_response["success"]:
-                    Price.objects.bulk_create(api_response["prices"], ignore_conflicts=True)
-                    log(f"{len(api_response['prices'])} rows inserted")
-                    log("")
-                    stock.date_last_fetch = today
-                    stock.save()
-                    break
-                else:
-                    error_triggered = True
-                    log(f"Error on url {api_response['url']} ({api_response['status_code']})")
-                    log(f"{api_response['message']}")
-                    log("")
+        try:
+            for stock in due_stocks:
+                get_full_price_history = stock.date_last_fetch is None
+
+                log(f"******Fetching \"{stock.name}\" prices, last fetch: {stock.date_last_fetch}******")
+                for api in (usd_apis if stock.currency == CURRENCY_USD else cad_apis):
+                    if last_api_call_started_at is not None:
+                        elapsed = time.monotonic() - last_api_call_started_at
+                        sleep_seconds = MIN_SECONDS_BETWEEN_API_CALLS - elapsed
+                        if sleep_seconds > 0:
+                            time.sleep(sleep_seconds)
+
+                    last_api_call_started_at = time.monotonic()
+                    log(f"Using {api.API_NAME}")
+                    api_response = api.fetch(stock, get_full_price_history)
+                    if api_response["success"]:
+                        Price.objects.bulk_create(api_response["prices"], ignore_conflicts=True)
+                        log(f"{len(api_response['prices'])} rows inserted")
+                        # A failing receiver (e.g. an alert email that can't be sent) is reported, not raised,
+                        # so it doesn't stop the other stocks from being fetched
+                        for receiver, response in prices_inserted.send_robust(
+                                sender=Price, stock=stock, prices=api_response["prices"]):
+                            if isinstance(response, Exception):
+                                error_triggered = True
+                                log(f"Error in {getattr(receiver, '__qualname__', receiver)} for {stock.symbol}: {response!r}")
+                        log("")
+                        stock.date_last_fetch = today
+                        fetched_stocks.append(stock)
+                        break
+                    else:
+                        error_triggered = True
+                        log(f"Error on url {api_response['url']} ({api_response['status_code']})")
+                        log(f"{api_response['message']}")
+                        log("")
+        finally:
+            prices_inserted.disconnect(alert_run.on_prices_inserted, sender=Price)
+
+            # Mark every fetched stock and save the alert states in one go instead of one save() per row.
+            # Also done when the run fails partway, so the alerts already emailed aren't sent again next run
+            with transaction.atomic():
+                Stock.objects.bulk_update(fetched_stocks, ["date_last_fetch"])
+                alert_run.save()
+        log(f"Sent {alert_run.sent_alerts_count} alerts")
 
         if error_triggered:
             send_email(
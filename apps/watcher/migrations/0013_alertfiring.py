@@ -0,0 +1,27 @@
+# Generated by Django 6.0.5 on 2026-10-19 15:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watcher', '0012_delete_compiledquant_delete_compiledquantdecay_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertFiring',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateTimeField(auto_now_add=True)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='Price in $ when fired')),
+                ('subject', models.CharField(max_length=255)),
+                ('alert', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='firings', to='watcher.alert')),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.5 on 2026-10-19 16:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watcher', '0013_alertfiring'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_price_date', models.DateField(blank=True, null=True, verbose_name='Date of the last price checked')),
+                ('triggered', models.BooleanField(default=False, verbose_name='Alert condition held at the last check?')),
+                ('last_fired_value', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True, verbose_name='Price in $ when last fired')),
+                ('last_fired_date', models.DateField(blank=True, null=True, verbose_name='Date of the price that last fired')),
+                ('alert', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='state', to='watcher.alert')),
+            ],
+        ),
+    ]
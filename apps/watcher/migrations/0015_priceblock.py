@@ -0,0 +1,28 @@
+# Generated by Django 6.0.5 on 2026-10-19 17:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watcher', '0014_alertstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceBlock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveSmallIntegerField(verbose_name='Number of days in the block')),
+                ('data', models.BinaryField()),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_blocks', to='watcher.stock')),
+            ],
+            options={
+                'ordering': ['stock', 'year'],
+                'constraints': [models.UniqueConstraint(fields=('stock', 'year'), name='price_block__unique__stock__year')],
+            },
+        ),
+    ]
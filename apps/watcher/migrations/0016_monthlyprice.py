@@ -0,0 +1,34 @@
+# Generated by Django 6.0.5 on 2026-10-19 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('watcher', '0015_priceblock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='First day of the month')),
+                ('first_date', models.DateField(verbose_name='First trading day')),
+                ('last_date', models.DateField(verbose_name='Last trading day')),
+                ('first_close', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='Close on the first trading day')),
+                ('open', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('high', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('low', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('close', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='Close on the last trading day')),
+                ('volume', models.PositiveBigIntegerField()),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_prices', to='watcher.stock')),
+            ],
+            options={
+                'ordering': ['-month', 'stock'],
+                'constraints': [models.UniqueConstraint(fields=('stock', 'month'), name='monthly_price__unique__stock__month')],
+            },
+        ),
+    ]
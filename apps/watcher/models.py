@@ -1,10 +1,22 @@
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import Count, IntegerField, OuterRef, Subquery, UniqueConstraint
+from django.db.models.functions import Coalesce
 
 from constants import CURRENCY_USD, CURRENCY_CAD
 from settings.base import EMAIL_DEFAULT_RECIPIENT
 
 
+class StockQuerySet(models.QuerySet):
+    # Adds prices_count and alerts_count, each one a subquery: joining both tables in one COUNT would
+    # multiply the rows (prices x alerts) before counting them
+    def with_counts(self):
+        def count_of(model):
+            counts = model.objects.filter(stock=OuterRef("pk")).order_by().values("stock").annotate(count=Count("pk"))
+            return Coalesce(Subquery(counts.values("count"), output_field=IntegerField()), 0)
+
+        return self.annotate(prices_count=count_of(Price), alerts_count=count_of(Alert))
+
+
 # TODO Stock Category (optional)? Then I need a category editor? Might be uselful if others want to use it
 # TODO Find a way to update dividend yield automatically, since it can change from time to time?
 class Stock(models.Model):
@@ -21,14 +33,20 @@ class Stock(models.Model):
     date_last_fetch = models.DateField(blank=True, null=True, verbose_name="Last API call date (leave empty)")
     dividend_yield = models.DecimalField(max_digits=4, decimal_places=2, blank=True, null=False, default=0)
 
+    objects = StockQuerySet.as_manager()
+
     # Convert symbols to UPPERCASE
     def save(self, *args, **kwargs):
         self.symbol = self.symbol and self.symbol.upper()
         self.market = self.market and self.market.upper()
         super(Stock, self).save(*args, **kwargs)
 
+    # Counts only when the stock comes from Stock.objects.with_counts(), never a query per stock
     def __str__(self):
-        return f"{self.name} ({self.market}: {self.symbol}) - {self.get_currency_display()} - ({self.prices.count()} prices, {self.alerts.count()} alerts) - {self.dividend_yield}% dividend"
+        counts = ""
+        if hasattr(self, "prices_count") and hasattr(self, "alerts_count"):
+            counts = f" - ({self.prices_count} prices, {self.alerts_count} alerts)"
+        return f"{self.name} ({self.market}: {self.symbol}) - {self.get_currency_display()}{counts} - {self.dividend_yield}% dividend"
 
     class Meta:
         ordering = ["name"]
@@ -56,6 +74,28 @@ class Price(models.Model):
         return f"{self.stock.name} - {self.date} - Open:{self.open}$ - Low:{self.low}$ - High:{self.high}$ - Close:{self.close}$"
 
 
+# Compact copy of one year of a stock's prices, packed as plain numbers in a single
+# blob so years of history load without one Decimal per value. Price stays the
+# source of truth; see apps/watcher/price_store.py for the format and the API.
+class PriceBlock(models.Model):
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, db_index=True, related_name="price_blocks")
+    year = models.PositiveSmallIntegerField()
+    count = models.PositiveSmallIntegerField(verbose_name="Number of days in the block")
+    data = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                name="price_block__unique__stock__year",
+                fields=["stock", "year"]
+            ),
+        ]
+        ordering = ["stock", "year"]
+
+    def __str__(self):
+        return f"{self.stock.symbol} - {self.year} ({self.count} prices)"
+
+
 # TODO Only one field "value" instead of "days" AND "value", who cares if an integer is stored in a decimal field, we can always convert it
 #  Will need in migration to move all the values from "days" to "value"
 # TODO Change "lowest in X" days alert, to activate "secondary" alert when stock goes up X% after a low.
@@ -89,6 +129,11 @@ class Alert(models.Model):
     enabled = models.BooleanField(default=True)
     disable_once_fired = models.BooleanField(default=False, verbose_name="Disable alert after it was fired?")
 
+    # An edited alert starts over: forget what send_alerts remembered about it so it gets checked again
+    def save(self, *args, **kwargs):
+        super(Alert, self).save(*args, **kwargs)
+        AlertState.objects.filter(alert=self).delete()
+
     def __str__(self):
         value = f"{self.value}$" if self.value else f"({self.days} days)"
         recipient = self.recipient if self.recipient else EMAIL_DEFAULT_RECIPIENT
@@ -96,3 +141,62 @@ class Alert(models.Model):
 
     class Meta:
         ordering = ["stock", "type"]
+
+
+# A stock's prices summed up per month: first/last trading day, the close on each,
+# and open/high/low/volume over the month. Materialized from Price by
+# apps/watcher/resampling.py, so the backtest can reuse them instead of
+# downloading the same prices again.
+class MonthlyPrice(models.Model):
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, db_index=True, related_name="monthly_prices")
+    month = models.DateField(verbose_name="First day of the month")
+    first_date = models.DateField(verbose_name="First trading day")
+    last_date = models.DateField(verbose_name="Last trading day")
+    first_close = models.DecimalField(max_digits=8, decimal_places=2, verbose_name="Close on the first trading day")
+    open = models.DecimalField(max_digits=8, decimal_places=2)
+    high = models.DecimalField(max_digits=8, decimal_places=2)
+    low = models.DecimalField(max_digits=8, decimal_places=2)
+    close = models.DecimalField(max_digits=8, decimal_places=2, verbose_name="Close on the last trading day")
+    volume = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                name="monthly_price__unique__stock__month",
+                fields=["stock", "month"]
+            ),
+        ]
+        ordering = ["-month", "stock"]
+
+    def __str__(self):
+        return f"{self.stock.name} - {self.month:%Y-%m} - Open:{self.open}$ - Close:{self.close}$"
+
+
+# What send_alerts remembers about an alert between runs: the date of the last
+# price it was checked against (no need to check again until a newer price
+# exists) and whether it was already firing (so it isn't sent again every day).
+class AlertState(models.Model):
+    alert = models.OneToOneField(Alert, on_delete=models.CASCADE, related_name="state")
+    last_price_date = models.DateField(blank=True, null=True, verbose_name="Date of the last price checked")
+    triggered = models.BooleanField(default=False, verbose_name="Alert condition held at the last check?")
+    last_fired_value = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True,
+                                           verbose_name="Price in $ when last fired")
+    last_fired_date = models.DateField(blank=True, null=True, verbose_name="Date of the price that last fired")
+
+    def __str__(self):
+        return f"{self.alert} - last checked {self.last_price_date}"
+
+
+# One row per alert that fired (email sent), so there's a history of what
+# triggered and at which price. Rows are written in bulk at the end of a run.
+class AlertFiring(models.Model):
+    alert = models.ForeignKey(Alert, on_delete=models.CASCADE, db_index=True, related_name="firings")
+    date = models.DateTimeField(auto_now_add=True)
+    price = models.DecimalField(max_digits=8, decimal_places=2, verbose_name="Price in $ when fired")
+    subject = models.CharField(max_length=255)
+
+    def __str__(self):
+        return f"{self.date:%Y-%m-%d %H:%M} - {self.subject}"
+
+    class Meta:
+        ordering = ["-date"]
@@ -0,0 +1,143 @@
+"""
+Compact copy of the Price history, for code that reads a lot of prices at once.
+
+Price keeps one ORM row and five Decimal objects per day, which gets slow once
+years of history are loaded. This store keeps the same values in a PriceBlock
+per stock per year: each column (dates, open, high, low, close, volume) packed
+one after the other as plain numbers in one blob. Loading a stock is then one
+small query and no per-day Python objects.
+
+Price stays the source of truth. Blocks are rebuilt from it when new prices are
+inserted (prices_inserted signal) or saved one by one (admin), dropped when
+prices are deleted (admin, shell, commands), and rebuilt on the next load() of
+a stock that has none.
+
+load() returns memoryview slices of array columns, so taking a date range
+doesn't copy anything. numpy.frombuffer() can wrap them without a copy too.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
+from datetime import date
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.watcher.models import Price, PriceBlock, Stock
+from apps.watcher.signals import prices_inserted
+
+# Columns of a PriceBlock blob, in the order they are packed: (name, array typecode).
+# Dates are stored as date.toordinal() numbers.
+COLUMNS = [("dates", "i"), ("open", "d"), ("high", "d"), ("low", "d"), ("close", "d"), ("volume", "q")]
+ROW_SIZE = sum(array(typecode).itemsize for _, typecode in COLUMNS)
+
+PriceSeries = namedtuple("PriceSeries", [name for name, _ in COLUMNS])
+
+
+def pack(rows) -> bytes:
+    """Pack (date, open, high, low, close, volume) rows, sorted by date, into one blob."""
+    columns = [array(typecode) for _, typecode in COLUMNS]
+    for row in rows:
+        columns[0].append(row[0].toordinal())
+        for column, value in zip(columns[1:], row[1:]):
+            column.append(value)
+    return b"".join(column.tobytes() for column in columns)
+
+
+def unpack(blob: bytes) -> PriceSeries:
+    """Turn a PriceBlock blob back into one array per column."""
+    count = len(blob) // ROW_SIZE
+    columns = []
+    offset = 0
+    for _, typecode in COLUMNS:
+        column = array(typecode)
+        size = count * column.itemsize
+        column.frombytes(blob[offset:offset + size])
+        columns.append(column)
+        offset += size
+    return PriceSeries(*columns)
+
+
+def load(stock_id: int, start: date = None, end: date = None) -> PriceSeries:
+    """A stock's daily prices between start and end (both included, both optional),
+    oldest first. Builds the stock's blocks first if it doesn't have any yet."""
+    blocks = PriceBlock.objects.filter(stock_id=stock_id).order_by("year")
+    if start:
+        blocks = blocks.filter(year__gte=start.year)
+    if end:
+        blocks = blocks.filter(year__lte=end.year)
+    blobs = list(blocks.values_list("data", flat=True))
+    if not blobs and not PriceBlock.objects.filter(stock_id=stock_id).exists() and rebuild(stock_id):
+        blobs = list(blocks.values_list("data", flat=True))
+
+    columns = [array(typecode) for _, typecode in COLUMNS]
+    for blob in blobs:
+        for column, part in zip(columns, unpack(bytes(blob))):
+            column.extend(part)
+
+    # Both ends of the date range, found by binary search on the sorted dates
+    low = bisect_left(columns[0], start.toordinal()) if start else 0
+    high = bisect_right(columns[0], end.toordinal()) if end else len(columns[0])
+    return PriceSeries(*(memoryview(column)[low:high] for column in columns))
+
+
+def rebuild(stock_id: int, years=None) -> int:
+    """Rebuild a stock's blocks from its Price rows, for the given years only if
+    passed. Returns the number of blocks written."""
+    prices = Price.objects.filter(stock_id=stock_id).order_by("date")
+    if years:
+        prices = prices.filter(date__year__in=years)
+
+    rows_by_year = defaultdict(list)
+    for row in prices.values_list("date", "open", "high", "low", "close", "volume"):
+        rows_by_year[row[0].year].append(row)
+
+    blocks = [
+        PriceBlock(stock_id=stock_id, year=year, count=len(rows), data=pack(rows))
+        for year, rows in rows_by_year.items()
+    ]
+    with transaction.atomic():
+        # Years that have no prices anymore lose their block
+        stale_blocks = PriceBlock.objects.filter(stock_id=stock_id).exclude(year__in=rows_by_year.keys())
+        if years:
+            stale_blocks = stale_blocks.filter(year__in=years)
+        stale_blocks.delete()
+        PriceBlock.objects.bulk_create(
+            blocks,
+            update_conflicts=True,
+            update_fields=["count", "data"],
+            unique_fields=["stock", "year"],
+        )
+    return len(blocks)
+
+
+def invalidate(stock_ids):
+    """Drop the blocks of stocks whose prices were deleted. They are rebuilt on their next load()."""
+    PriceBlock.objects.filter(stock_id__in=stock_ids).delete()
+
+
+# Price providers set the date as a "YYYY-MM-DD" string, saved rows have a real date
+def _year_of(price: Price) -> int:
+    return int(str(price.date)[:4])
+
+
+# Connected at startup (WatcherConfig.ready), so it runs before the receivers
+# connected later (monthly prices, alert checks) and they read up-to-date blocks.
+@receiver(prices_inserted, sender=Price)
+def prices_inserted_handler(sender, stock, prices, **kwargs):
+    if prices:
+        rebuild(stock.pk, {_year_of(price) for price in prices})
+
+
+@receiver(post_save, sender=Price)
+def price_saved(sender, instance, **kwargs):
+    rebuild(instance.stock_id, {_year_of(instance)})
+
+
+# The stock's blocks are dropped rather than the year's, as load() only rebuilds a stock without any.
+# Not when the whole stock is deleted: its blocks are deleted with it
+@receiver(post_delete, sender=Price)
+def price_deleted(sender, instance, origin=None, **kwargs):
+    if not isinstance(origin, Stock):
+        invalidate([instance.stock_id])
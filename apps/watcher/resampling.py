@@ -0,0 +1,126 @@
+"""
+Daily prices -> weekly / monthly bars, shared by the watcher and the backtest.
+
+resample() works on any daily PriceSeries (from the compact price store, or
+built from another source like the backtest's Yahoo downloads). Each bar keeps
+the first and last trading day of the period, the close on both of them, and
+the open/high/low/volume over the period.
+
+The monthly bars of every watched stock are also saved in MonthlyPrice, kept
+current when fetch_prices inserts new prices, so the backtest can reuse them
+instead of downloading the same Yahoo prices again (backtest_scores
+--local-prices: the closes aren't re-adjusted for later splits or dividends).
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.watcher import price_store
+from apps.watcher.models import MonthlyPrice, Price, Stock
+from apps.watcher.price_store import PriceSeries
+from apps.watcher.signals import prices_inserted
+
+WEEK = "week"
+MONTH = "month"
+
+# period = first day of the month, or the Monday of the week
+Bar = namedtuple("Bar", ["period", "first_date", "last_date", "first_close", "open", "high", "low", "close", "volume"])
+
+
+def period_start(day: date, period: str) -> date:
+    """First day of the week (Monday) or month that `day` is in."""
+    if period == MONTH:
+        return day.replace(day=1)
+    if period == WEEK:
+        return day - timedelta(days=day.weekday())
+    raise ValueError(f"Unknown resampling period: {period}")
+
+
+def resample(series: PriceSeries, period: str = MONTH) -> list[Bar]:
+    """One bar per week or month of a daily series (dates as date ordinals, oldest first)."""
+    # Index of the first day of each period; the last entry closes the final period
+    boundaries = []
+    current_period = None
+    for index, ordinal in enumerate(series.dates):
+        start = period_start(date.fromordinal(ordinal), period)
+        if start != current_period:
+            boundaries.append((start, index))
+            current_period = start
+    boundaries.append((None, len(series.dates)))
+
+    bars = []
+    for (start, first), (_, end) in zip(boundaries, boundaries[1:]):
+        last = end - 1
+        bars.append(Bar(
+            period=start,
+            first_date=date.fromordinal(series.dates[first]),
+            last_date=date.fromordinal(series.dates[last]),
+            first_close=series.close[first],
+            open=series.open[first],
+            high=max(series.high[first:end]),
+            low=min(series.low[first:end]),
+            close=series.close[last],
+            volume=sum(series.volume[first:end]),
+        ))
+    return bars
+
+
+def resample_all(period: str = MONTH, stock_ids=None) -> dict:
+    """{stock id: bars} for every stock (or only the given ones)."""
+    if stock_ids is None:
+        stock_ids = Stock.objects.values_list("pk", flat=True)
+    return {stock_id: resample(price_store.load(stock_id), period) for stock_id in stock_ids}
+
+
+def rebuild_monthly_prices(stock_id: int, start: date = None) -> int:
+    """Recompute a stock's MonthlyPrice rows from the month of `start` onward
+    (all of them if not passed). Returns the number of months written."""
+    if start:
+        start = period_start(start, MONTH)
+    bars = resample(price_store.load(stock_id, start=start), MONTH)
+
+    with transaction.atomic():
+        # Months that have no prices anymore lose their row
+        stale_months = MonthlyPrice.objects.filter(stock_id=stock_id).exclude(month__in=[bar.period for bar in bars])
+        if start:
+            stale_months = stale_months.filter(month__gte=start)
+        stale_months.delete()
+        MonthlyPrice.objects.bulk_create(
+            [
+                MonthlyPrice(
+                    stock_id=stock_id,
+                    month=bar.period,
+                    first_date=bar.first_date,
+                    last_date=bar.last_date,
+                    first_close=bar.first_close,
+                    open=bar.open,
+                    high=bar.high,
+                    low=bar.low,
+                    close=bar.close,
+                    volume=bar.volume,
+                )
+                for bar in bars
+            ],
+            update_conflicts=True,
+            update_fields=["first_date", "last_date", "first_close", "open", "high", "low", "close", "volume"],
+            unique_fields=["stock", "month"],
+        )
+    return len(bars)
+
+
+# Connected after the price store's own receiver (this module imports it first),
+# so the months are rebuilt from up-to-date blocks.
+@receiver(prices_inserted, sender=Price)
+def prices_inserted_handler(sender, stock, prices, **kwargs):
+    if prices:
+        # Price providers set the date as a "YYYY-MM-DD" string
+        earliest = min(date.fromisoformat(str(price.date)[:10]) for price in prices)
+        rebuild_monthly_prices(stock.pk, start=earliest)
+
+
+@receiver(post_save, sender=Price)
+def price_saved(sender, instance, **kwargs):
+    rebuild_monthly_prices(instance.stock_id, start=date.fromisoformat(str(instance.date)[:10]))
@@ -0,0 +1,12 @@
+"""
+Custom signals sent by the watcher app.
+
+bulk_create() skips post_save, so code that inserts prices in bulk sends
+prices_inserted itself to tell listeners (like the alert checker in
+apps/watcher/alerts.py) that new prices landed for a stock.
+"""
+from django.dispatch import Signal
+
+# Sent after new daily prices are inserted for one stock.
+# Arguments: stock (the Stock), prices (the list of Price objects that were inserted)
+prices_inserted = Signal()
@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from apps.watcher import price_store
+from apps.watcher.alerts import AlertRun
+from apps.watcher.models import Alert, AlertFiring, AlertState, Price, PriceBlock, Stock
+from apps.watcher.signals import prices_inserted
+
+
+def insert_prices(stock, closes, first_day=date(2024, 12, 30)):
+    """Daily prices from first_day, one per close, inserted like fetch_prices does"""
+    prices = [
+        Price(stock=stock, date=first_day + timedelta(days=i), open=close, high=close, low=close, close=close,
+              volume=1000 + i)
+        for i, close in enumerate(closes)
+    ]
+    Price.objects.bulk_create(prices)
+    prices_inserted.send(sender=Price, stock=stock, prices=prices)
+    return prices
+
+
+class PriceStoreTests(TestCase):
+    def setUp(self):
+        self.stock = Stock.objects.create(name="Test", symbol="TST")
+
+    def test_pack_unpack_round_trip(self):
+        rows = [(date(2024, 1, 2), 1.5, 2.25, 1.0, 2.0, 100), (date(2024, 1, 3), 2.0, 3.0, 1.75, 2.5, 2 ** 40)]
+
+        series = price_store.unpack(price_store.pack(rows))
+
+        self.assertEqual([date.fromordinal(ordinal) for ordinal in series.dates], [row[0] for row in rows])
+        self.assertEqual(list(series.close), [2.0, 2.5])
+        self.assertEqual(list(series.volume), [100, 2 ** 40])
+
+    def test_load_range_across_years(self):
+        insert_prices(self.stock, [Decimal(i) for i in range(1, 6)])
+
+        self.assertEqual(PriceBlock.objects.filter(stock=self.stock).count(), 2)
+        series = price_store.load(self.stock.pk, start=date(2024, 12, 31), end=date(2025, 1, 2))
+        self.assertEqual(list(series.close), [2.0, 3.0, 4.0])
+
+    def test_deleted_price_leaves_the_store(self):
+        insert_prices(self.stock, [Decimal(i) for i in range(1, 6)])
+
+        Price.objects.get(date=date(2025, 1, 1)).delete()
+
+        self.assertEqual(list(price_store.load(self.stock.pk).close), [1.0, 2.0, 4.0, 5.0])
+
+
+@patch("apps.watcher.alerts.send_email")
+class AlertTests(TestCase):
+    def setUp(self):
+        self.stock = Stock.objects.create(name="Test", symbol="TST")
+
+    def check(self):
+        alert_run = AlertRun(write=lambda message: None)
+        alert_run.check_all()
+        alert_run.save()
+        return alert_run
+
+    def test_threshold_reached_exactly(self, send_email):
+        Alert.objects.create(stock=self.stock, type=Alert.TYPE_LOWER_THAN, value=Decimal("9.99"))
+        insert_prices(self.stock, [Decimal("10.50"), Decimal("9.99")])
+
+        self.assertEqual(self.check().sent_alerts_count, 1)
+        send_email.assert_called_once()
+        self.assertEqual(AlertFiring.objects.get().price, Decimal("9.99"))
+        self.assertEqual(AlertState.objects.get().last_fired_value, Decimal("9.99"))
+
+    def test_sent_once_while_above(self, send_email):
+        Alert.objects.create(stock=self.stock, type=Alert.TYPE_HIGHER_THAN, value=Decimal("12.34"))
+        insert_prices(self.stock, [Decimal("12.00"), Decimal("12.34")])
+        self.check()
+        insert_prices(self.stock, [Decimal("13.00")], first_day=date(2025, 1, 1))
+
+        self.assertEqual(self.check().sent_alerts_count, 0)
+        self.assertEqual(send_email.call_count, 1)
+
+    def test_percentage_change(self, send_email):
+        Alert.objects.create(stock=self.stock, type=Alert.TYPE_PERCENTAGE_PRICE_CHANGE, value=Decimal("10"))
+        insert_prices(self.stock, [Decimal("10.00"), Decimal("11.00")])
+
+        self.assertEqual(self.check().sent_alerts_count, 1)
+        self.assertIn("gained 10.0%", send_email.call_args.kwargs["subject"])
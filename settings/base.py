@@ -126,6 +126,10 @@ EMAIL_HOST_PASSWORD = getenv("EMAIL_HOST_PASSWORD", "")
 
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
 
+# Extra SA scoring strategies for apps/quant/strategies.py (backtest_scores --strategies):
+# dotted paths of Strategy classes, or of modules registering theirs with @register
+QUANT_STRATEGIES = []
+
 # LOGGING = {
 #     'version': 1,
 #     'disable_existing_loggers': False,